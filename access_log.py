@@ -0,0 +1,223 @@
+import os
+import re
+import sys
+import json
+import time
+import queue
+import atexit
+import random
+import logging
+import threading
+import logging.handlers
+
+#access log terstruktur: satu baris per request (client, method, path, status,
+#bytes, durasi). Thread yang melayani request hanya menaruh tuple nilai mentah
+#ke antrean; pemformatan dan penulisan ke stderr/file dikerjakan thread
+#QueueListener.
+
+STYLES = ('logfmt', 'json')
+#awal body response yang ikut dicatat dalam mode debug
+DEBUG_BODY_BYTES = 256
+#nilai logfmt yang harus dikutip
+NEEDS_QUOTE = re.compile(r'[^\x21-\x7e]|["=\\]')
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler yang tidak memformat di thread pemanggil dan tidak pernah memblok.
+
+    QueueHandler bawaan memformat pesan di prepare(), yaitu di thread
+    request; di sini entry (tuple nilai mentah, bukan LogRecord) diteruskan
+    apa adanya. Saat antrean melebihi max_size entry dibuang dan dihitung,
+    agar log yang lambat tidak ikut memperlambat request atau menghabiskan
+    memori.
+    """
+    def __init__(self, q, max_size):
+        logging.handlers.QueueHandler.__init__(self, q)
+        self.max_size = max_size
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        if self.queue.qsize() >= self.max_size:
+            self.dropped += 1
+        else:
+            self.queue.put(record)
+
+
+class AccessListener(logging.handlers.QueueListener):
+    """QueueListener yang memformat entry dan menulisnya secara batch ke handler tujuan.
+
+    Baris dikumpulkan selama antrean masih berisi dan ditulis dengan satu
+    write() + flush() saat antrean kosong (atau batch penuh), bukan satu
+    syscall per request.
+    """
+    BATCH = 256
+
+    def __init__(self, q, target, formatter):
+        logging.handlers.QueueListener.__init__(self, q, target)
+        self.target = target
+        self.formatter = formatter
+        self.lines = []
+
+    def handle(self, entry):
+        self.lines.append(self.formatter.format(entry))
+        if len(self.lines) >= self.BATCH or self.queue.empty():
+            self.write()
+
+    def write(self):
+        lines, self.lines = self.lines, []
+        if not lines:
+            return
+        lines.append('')
+        target = self.target
+        target.acquire()
+        try:
+            if isinstance(target, logging.handlers.WatchedFileHandler):
+                #file dipindah logrotate: buka ulang sebelum menulis
+                target.reopenIfNeeded()
+            target.stream.write('\n'.join(lines))
+            target.flush()
+        except Exception:
+            target.handleError(None)
+        finally:
+            target.release()
+
+    def stop(self):
+        logging.handlers.QueueListener.stop(self)
+        self.write()
+
+
+class AccessFormatter:
+    """Format entry access log sebagai logfmt (key=value) atau satu objek JSON per baris."""
+
+    def __init__(self, style='logfmt'):
+        self.style = style
+        #awalan timestamp di-cache per detik
+        self.second = None
+        self.stamp = ''
+
+    def timestamp(self, created):
+        second = int(created)
+        if second != self.second:
+            self.second = second
+            self.stamp = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(second))
+        return f"{self.stamp}.{int((created - second) * 1000):03d}Z"
+
+    def format(self, entry):
+        created, client, method, path, status, nbytes, duration, extra = entry
+        if isinstance(client, tuple):
+            client = f"{client[0]}:{client[1]}"
+        stamp = self.timestamp(created)
+        duration_ms = round(duration * 1000, 3)
+        if self.style == 'json':
+            fields = {'time': stamp, 'client': client, 'method': method, 'path': path,
+                      'status': status, 'bytes': nbytes, 'duration_ms': duration_ms}
+            if extra:
+                fields.update((name, text(value)) for name, value in extra.items())
+            return json.dumps(fields, default=str)
+        line = (f"time={stamp} client={logfmt_value(client or '-')} method={method or '-'} "
+                f"path={logfmt_value(path or '-')} status={status} bytes={nbytes} duration_ms={duration_ms}")
+        if extra:
+            line += ''.join(f" {name}={logfmt_value(plain(value))}" for name, value in extra.items())
+        return line
+
+
+def text(value):
+    """bytes (mis. awal body) didekode agar bisa ditulis ke log."""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value).decode('utf-8', 'backslashreplace')
+    return value
+
+
+def plain(value):
+    """Nilai extra untuk logfmt: str/angka apa adanya, selain itu JSON."""
+    value = text(value)
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    return json.dumps(value, default=str)
+
+
+def logfmt_value(value):
+    if not isinstance(value, str):
+        return str(value)
+    if not value or NEEDS_QUOTE.search(value):
+        return json.dumps(value)
+    return value
+
+
+class AccessLog:
+    """Access log per request lewat QueueHandler/QueueListener.
+
+    target '-' menulis ke stderr, path lain ke file (WatchedFileHandler, aman
+    untuk logrotate dan untuk banyak proses yang menulis file yang sama),
+    None atau 'off' mematikan log. sample (0..1) adalah peluang sebuah
+    request dicatat; response 5xx selalu dicatat. debug menambahkan extra
+    seperti header request dan awal body response. Thread listener tidak
+    ikut ter-fork, jadi setiap proses menjalankan listener sendiri saat
+    pertama kali mencatat; proses yang keluar lewat os._exit (worker
+    multiprocessing) memanggil stop() dulu agar antreannya tertulis.
+    """
+    def __init__(self, target='-', sample=1.0, debug=False, style='logfmt', queue_size=10000):
+        if style not in STYLES:
+            raise ValueError(f"unknown access log style '{style}'")
+        self.enabled = target not in (None, '', 'off')
+        self.sample = sample
+        self.debug = debug and self.enabled
+        self.style = style
+        self.queue_size = queue_size
+        self.handler = None
+        self.listener = None
+        self.lock = threading.Lock()
+        #entry yang dibuang oleh handler yang sudah dihentikan
+        self.dropped_before = 0
+        if not self.enabled:
+            return
+        if target == '-':
+            self.target = logging.StreamHandler(sys.stderr)
+        else:
+            self.target = logging.handlers.WatchedFileHandler(target)
+        os.register_at_fork(after_in_child=self._reset)
+        atexit.register(self.stop)
+
+    def _reset(self):
+        #antrean dan listener milik induk tidak berlaku di proses anak
+        self.handler = None
+        self.listener = None
+        self.lock = threading.Lock()
+        self.dropped_before = 0
+
+    def _start(self):
+        with self.lock:
+            if self.handler is None:
+                #SimpleQueue (C) jauh lebih murah per put() daripada queue.Queue
+                handler = DroppingQueueHandler(queue.SimpleQueue(), self.queue_size)
+                self.listener = AccessListener(handler.queue, self.target, AccessFormatter(self.style))
+                self.listener.start()
+                self.handler = handler
+            return self.handler
+
+    @property
+    def dropped(self):
+        handler = self.handler
+        return self.dropped_before + (handler.dropped if handler is not None else 0)
+
+    def log(self, client, method, path, status, nbytes, duration, extra=None):
+        """Catat satu request; dipanggil di thread request, jadi tidak memformat apa pun."""
+        if not self.enabled:
+            return
+        if status < 500 and self.sample < 1.0 and random.random() >= self.sample:
+            return
+        handler = self.handler or self._start()
+        handler.emit((time.time(), client, method, path, status, nbytes, duration, extra))
+
+    def stop(self):
+        """Tulis sisa antrean dan hentikan listener (dipanggil juga saat exit)."""
+        with self.lock:
+            handler, listener = self.handler, self.listener
+            self.handler = self.listener = None
+            if handler is not None:
+                self.dropped_before += handler.dropped
+        if listener is not None:
+            listener.stop()
@@ -0,0 +1,141 @@
+import time
+import bisect
+import socket
+import hashlib
+import logging
+import threading
+
+STRATEGIES = ('round-robin', 'least-connections', 'consistent-hash')
+
+
+class Backend:
+    """Satu HttpServer di belakang proxy, dengan status sehat dan counter koneksinya.
+
+    fails, passes dan healthy diubah oleh thread reactor (hasil connect) dan
+    thread HealthChecker sekaligus, jadi record_failure/record_success
+    memegang lock milik backend. Counter koneksi ditulis thread reactor saja.
+    """
+    def __init__(self, address):
+        self.address = address
+        self.name = f"{address[0]}:{address[1]}"
+        self.healthy = True
+        #koneksi yang sedang diteruskan ke backend ini
+        self.active = 0
+        self.total = 0
+        self.connect_failures = 0
+        #hasil health check / connect berturut-turut yang sama
+        self.fails = 0
+        self.passes = 0
+        self.lock = threading.Lock()
+
+    def record_failure(self, fall):
+        with self.lock:
+            self.passes = 0
+            self.fails += 1
+            ejected = self.healthy and self.fails >= fall
+            if ejected:
+                self.healthy = False
+        if ejected:
+            logging.warning(f"backend {self.name} ejected")
+
+    def record_success(self, rise):
+        with self.lock:
+            self.fails = 0
+            self.passes += 1
+            admitted = not self.healthy and self.passes >= rise
+            if admitted:
+                self.healthy = True
+        if admitted:
+            logging.warning(f"backend {self.name} re-admitted")
+
+    def stats(self):
+        return {'backend': self.name, 'healthy': self.healthy, 'active': self.active,
+                'total': self.total, 'connect_failures': self.connect_failures}
+
+
+class Balancer:
+    """Pilih backend untuk koneksi baru dengan salah satu STRATEGIES.
+
+    Hanya backend sehat yang dipilih; bila semuanya sedang dikeluarkan,
+    semua backend dicoba lagi daripada menolak client. consistent-hash
+    memakai ring dengan VNODES titik per backend, jadi backend yang keluar
+    hanya memindahkan key miliknya sendiri.
+    """
+    VNODES = 100
+
+    def __init__(self, backends, strategy='round-robin', fall=2, rise=2):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"unknown strategy '{strategy}'")
+        self.backends = backends
+        self.strategy = strategy
+        self.fall = fall
+        self.rise = rise
+        self.counter = 0
+        self.ring = sorted((hash_key(f"{b.name}#{i}"), b) for b in backends for i in range(self.VNODES))
+        self.ring_keys = [h for h, _ in self.ring]
+
+    @property
+    def needs_key(self):
+        return self.strategy == 'consistent-hash'
+
+    def choose(self, key=None, exclude=()):
+        """Backend berikutnya, atau None bila semua sudah ada di exclude."""
+        candidates = [b for b in self.backends if b.healthy and b not in exclude]
+        if not candidates:
+            candidates = [b for b in self.backends if b not in exclude]
+            if not candidates:
+                return None
+        if self.strategy == 'consistent-hash':
+            start = bisect.bisect(self.ring_keys, hash_key(key or ''))
+            for i in range(len(self.ring)):
+                backend = self.ring[(start + i) % len(self.ring)][1]
+                if backend in candidates:
+                    return backend
+        self.counter += 1
+        if self.strategy == 'least-connections':
+            #mulai dari posisi bergilir agar backend dengan jumlah sama bergantian
+            offset = self.counter % len(candidates)
+            return min(candidates[offset:] + candidates[:offset], key=lambda b: b.active)
+        return candidates[self.counter % len(candidates)]
+
+    def stats(self):
+        return [b.stats() for b in self.backends]
+
+
+def hash_key(text):
+    return int.from_bytes(hashlib.md5(text.encode('utf-8', 'surrogateescape')).digest()[:8], 'big')
+
+
+class HealthChecker(threading.Thread):
+    """Health check aktif: GET path ke setiap backend setiap interval detik.
+
+    Status < 500 dihitung sehat. Backend dikeluarkan setelah fall kegagalan
+    berturut-turut (termasuk connect gagal yang dicatat proxy) dan diterima
+    lagi setelah rise keberhasilan berturut-turut.
+    """
+    def __init__(self, balancer, path='/', interval=2.0, timeout=1.0):
+        self.balancer = balancer
+        self.path = path
+        self.interval = interval
+        self.timeout = timeout
+        threading.Thread.__init__(self, daemon=True)
+
+    def check(self, backend):
+        try:
+            with socket.create_connection(backend.address, timeout=self.timeout) as sock:
+                sock.sendall(f"GET {self.path} HTTP/1.1\r\nHost: {backend.name}\r\n"
+                             "User-Agent: socket_proxy-health\r\nConnection: close\r\n\r\n".encode())
+                status_line = sock.recv(64).split(b"\r\n", 1)[0].split(b" ")
+            return len(status_line) >= 2 and status_line[1].isdigit() and int(status_line[1]) < 500
+        except OSError:
+            return False
+
+    def run(self):
+        while True:
+            started = time.monotonic()
+            for backend in self.balancer.backends:
+                if self.check(backend):
+                    backend.record_success(self.balancer.rise)
+                else:
+                    backend.record_failure(self.balancer.fall)
+            time.sleep(max(0.0, self.interval - (time.monotonic() - started)))
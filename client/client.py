@@ -1,95 +1,570 @@
 import sys
 import socket
+import select
 import logging
 import os
+import hashlib
+import threading
+import contextlib
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
-def make_socket(destination_address, port):
-    try:
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        server_addr = (destination_address, port)
-        logging.warning(f"Connecting to {server_addr}")
-        sock.connect(server_addr)
-        return sock
-    except Exception as ee:
-        logging.warning(f"Error connecting: {str(ee)}")
-        return None
 
-def send_http_request(method, path, server_host, server_port, custom_headers=None, body_bytes=None):
-    sock = make_socket(server_host, server_port)
-    if sock is None:
-        print(f"Could not connect to {server_host}:{server_port}. Ensure server is running.")
-        return b""
+READ_SIZE = 64 * 1024
+MAX_LINE = 64 * 1024
+SENDFILE_CHUNK = 1024 * 1024
+#range terkecil yang layak diunduh terpisah
+MIN_SEGMENT = 1024 * 1024
 
-    try:
-        headers_dict = custom_headers if custom_headers else {}
-        headers_dict['Host'] = f"{server_host}:{server_port}"
-        headers_dict['User-Agent'] = 'MyCustomClient/1.0'
-        
-        if body_bytes:
-            headers_dict['Content-Length'] = str(len(body_bytes))
-        
-        request_line = f"{method} {path} HTTP/1.1\r\n"
-        headers_str = "".join([f"{k}: {v}\r\n" for k, v in headers_dict.items()])
-        
-        full_request_bytes = request_line.encode('utf-8')
-        full_request_bytes += headers_str.encode('utf-8')
-        full_request_bytes += b"\r\n"
-        if body_bytes:
-            full_request_bytes += body_bytes
-
-        logging.warning(f"Sending request: \n{full_request_bytes.decode('utf-8', errors='ignore').strip()}")
-        sock.sendall(full_request_bytes)
-        
-        received_data = b""
-        eoh_marker = b"\r\n\r\n"
-        headers_parsed = False
-        content_length = 0
-        current_header_bytes_len = 0
 
-        while True:
-            data = sock.recv(4096)
-            if not data:
-                break
+class ClientError(Exception):
+    """Request gagal di level koneksi atau response tidak bisa diparse."""
+
+
+class ConnectionClosed(ClientError):
+    """Server menutup koneksi sebelum mengirim satu byte pun response."""
+
 
-            received_data += data
+class Response:
+    """Response HTTP. Dari request() body sudah dibaca lengkap (chunked sudah
+    digabung); dari stream() body dibaca bertahap lewat iter_content()."""
+    __slots__ = ('status', 'reason', 'version', 'headers', 'body', 'head', 'chunks', 'digest')
 
-            if not headers_parsed:
-                eoh_pos = received_data.find(eoh_marker)
-                if eoh_pos != -1:
-                    headers_part_bytes = received_data[:eoh_pos]
-                    current_header_bytes_len = eoh_pos + len(eoh_marker)
-                    
+    def __init__(self, status, reason, version, headers, body, head):
+        self.status = status
+        self.reason = reason
+        self.version = version
+        #nama header huruf kecil
+        self.headers = headers
+        self.body = body
+        #status line dan header persis seperti diterima
+        self.head = head
+        self.chunks = iter(())
+        #hex digest body untuk download_file(checksum=...)
+        self.digest = None
+
+    @property
+    def status_line(self):
+        return f"{self.version} {self.status} {self.reason}"
+
+    @property
+    def ok(self):
+        return 200 <= self.status < 300
+
+    def iter_content(self):
+        return self.chunks
+
+    def text(self):
+        return self.body.decode('utf-8', errors='replace')
+
+    def raw(self):
+        return self.head + b"\r\n\r\n" + self.body
+
+    def __repr__(self):
+        return f"<Response {self.status} {self.reason} ({len(self.body)} bytes)>"
+
+
+class Connection:
+    """Satu koneksi keep-alive ke server; dipakai satu thread dalam satu waktu."""
+
+    def __init__(self, host, port, connect_timeout, timeout, ssl_context=None):
+        self.host = host
+        self.port = port
+        try:
+            sock = socket.create_connection((host, port), timeout=connect_timeout)
+        except OSError as e:
+            raise ClientError(f"cannot connect to {host}:{port}: {e}") from e
+        #request dikirim sebagai header lalu body; tanpa NODELAY segmen header
+        #kecil bisa tertahan Nagle menunggu ACK yang ditunda server
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if ssl_context is not None:
+            try:
+                sock = ssl_context.wrap_socket(sock, server_hostname=host)
+            except OSError as e:
+                sock.close()
+                raise ClientError(f"TLS handshake with {host}:{port} failed: {e}") from e
+        sock.settimeout(timeout)
+        self.sock = sock
+        self.rfile = sock.makefile('rb', buffering=READ_SIZE)
+        self.requests = 0
+        #framing body response yang sedang dibaca
+        self.remaining = 0
+        self.chunked = False
+        self.until_close = False
+        self.body_done = True
+
+    def stale(self):
+        """Koneksi idle yang sudah ditutup server (atau berisi data liar) tidak dipakai lagi."""
+        if getattr(self.sock, 'pending', lambda: 0)():
+            return True
+        try:
+            readable, _, _ = select.select([self.sock], [], [], 0)
+        except (OSError, ValueError):
+            return True
+        return bool(readable)
+
+    def send(self, method, path, headers, body=None, length=0, progress=None):
+        """Kirim request; body berupa bytes atau file biner (length byte dari posisinya)."""
+        lines = [f"{method} {path} HTTP/1.1\r\n"]
+        lines.extend(f"{name}: {value}\r\n" for name, value in headers.items())
+        lines.append("\r\n")
+        try:
+            self.sock.sendall(''.join(lines).encode('utf-8'))
+            if hasattr(body, 'read'):
+                self.send_file(body, length, progress)
+            elif body:
+                self.sock.sendall(body)
+        except socket.timeout as e:
+            raise ClientError(f"send timed out: {e}") from e
+        except OSError as e:
+            #EPIPE/ECONNRESET: server sudah menutup koneksi ini
+            raise ConnectionClosed(f"send failed: {e}") from e
+        self.requests += 1
+
+    def send_file(self, f, length, progress):
+        """Body dari file lewat socket.sendfile (zero-copy; socket TLS memakai send biasa)."""
+        offset = f.tell()
+        sent = 0
+        while sent < length:
+            #dipotong per SENDFILE_CHUNK agar progress bisa dilaporkan
+            count = min(SENDFILE_CHUNK, length - sent)
+            n = self.sock.sendfile(f, offset + sent, count)
+            sent += n
+            if n < count:
+                raise ClientError(f"file shrank during upload ({sent} of {length} bytes)")
+            if progress:
+                progress(sent, length)
+
+    def readline(self):
+        line = self.rfile.readline(MAX_LINE + 1)
+        if len(line) > MAX_LINE:
+            raise ClientError("response line too long")
+        return line
+
+    def read_head(self, method):
+        """Baca status line dan header; body dibaca sesudahnya lewat iter_body()."""
+        try:
+            status_line = self.readline()
+        except ConnectionResetError as e:
+            raise ConnectionClosed(f"connection reset by server: {e}") from e
+        except OSError as e:
+            raise ClientError(f"receive failed: {e}") from e
+        if not status_line:
+            raise ConnectionClosed("connection closed by server")
+        try:
+            head = [status_line.rstrip(b"\r\n")]
+            while True:
+                line = self.readline()
+                if not line:
+                    raise ClientError("connection closed inside response headers")
+                if line in (b"\r\n", b"\n"):
+                    break
+                head.append(line.rstrip(b"\r\n"))
+        except OSError as e:
+            raise ClientError(f"receive failed: {e}") from e
+        parts = head[0].decode('latin-1').split(' ', 2)
+        if len(parts) < 2 or not parts[1].isdigit():
+            raise ClientError(f"malformed status line {head[0]!r}")
+        version, status = parts[0], int(parts[1])
+        reason = parts[2] if len(parts) > 2 else ''
+        headers = {}
+        for line in head[1:]:
+            name, sep, value = line.decode('latin-1').partition(':')
+            if sep:
+                headers[name.strip().lower()] = value.strip()
+        keep_alive = self.keep_alive(version, headers)
+        self.remaining = 0
+        self.chunked = self.until_close = False
+        if method == 'HEAD' or status in (204, 304) or 100 <= status < 200:
+            pass
+        elif 'chunked' in headers.get('transfer-encoding', '').lower():
+            self.chunked = True
+        elif 'content-length' in headers:
+            try:
+                self.remaining = int(headers['content-length'])
+            except ValueError:
+                raise ClientError("malformed Content-Length in response")
+        else:
+            #body diakhiri penutupan koneksi
+            self.until_close = True
+            keep_alive = False
+        self.body_done = False
+        return Response(status, reason, version, headers, b"", b"\r\n".join(head)), keep_alive
+
+    def iter_body(self, size=READ_SIZE):
+        """Body response per potongan paling banyak size byte; memori tetap berapa pun besar body."""
+        try:
+            if self.until_close:
+                while True:
+                    data = self.rfile.read1(size)
+                    if not data:
+                        break
+                    yield data
+            elif self.chunked:
+                while True:
+                    size_line = self.readline()
                     try:
-                        headers_str_response = headers_part_bytes.decode('utf-8', errors='ignore')
-                        for line in headers_str_response.split('\r\n'):
-                            if line.lower().startswith('content-length:'):
-                                try:
-                                    content_length = int(line.split(':', 1)[1].strip())
-                                    break
-                                except ValueError:
-                                    logging.warning("Malformed Content-Length header received in response. Will read until connection closes.")
-                                    content_length = -1
-                                    break
-                        headers_parsed = True
-                    except UnicodeDecodeError:
-                        logging.warning("Could not decode headers from server response.")
+                        chunk_size = int(size_line.split(b";", 1)[0].strip(), 16)
+                    except ValueError:
+                        raise ClientError(f"malformed chunk size {size_line!r}")
+                    if chunk_size == 0:
+                        #trailer sampai baris kosong
+                        while self.readline() not in (b"\r\n", b"\n", b""):
+                            pass
                         break
-
-            if headers_parsed:
-                if content_length != -1:
-                    expected_total_len = current_header_bytes_len + content_length
-                    if len(received_data) >= expected_total_len:
+                    self.remaining = chunk_size
+                    yield from self.iter_remaining(size)
+                    self.readline()
+            else:
+                yield from self.iter_remaining(size)
+        except OSError as e:
+            raise ClientError(f"receive failed: {e}") from e
+        self.body_done = True
+
+    def iter_remaining(self, size):
+        while self.remaining:
+            data = self.rfile.read1(min(size, self.remaining))
+            if not data:
+                raise ClientError(f"connection closed with {self.remaining} body bytes missing")
+            self.remaining -= len(data)
+            yield data
+
+    @staticmethod
+    def keep_alive(version, headers):
+        connection = headers.get('connection', '').lower()
+        if version == 'HTTP/1.0':
+            return 'keep-alive' in connection
+        return 'close' not in connection
+
+    def close(self):
+        try:
+            self.rfile.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class HttpClient:
+    """Client HTTP dengan pool koneksi keep-alive per host.
+
+    Koneksi dipakai ulang antar request dan antar thread; paling banyak
+    max_per_host koneksi terbuka ke satu host, request berikutnya menunggu
+    koneksi dilepas. Request yang gagal karena server sudah menutup koneksi
+    idle (tidak ada satu byte response pun) diulang otomatis di koneksi baru,
+    sampai retries kali. connect_timeout berlaku saat connect, timeout untuk
+    setiap operasi baca/tulis setelahnya.
+
+    Upload dari file memakai socket.sendfile dan download_file menulis body
+    langsung ke file tujuan, jadi memori client tidak bergantung pada
+    ukuran file.
+    """
+    def __init__(self, host='localhost', port=8885, connect_timeout=5.0, timeout=30.0,
+                 max_per_host=8, retries=1, ssl_context=None, user_agent='MyCustomClient/1.0'):
+        self.host = host
+        self.port = port
+        self.connect_timeout = connect_timeout
+        self.timeout = timeout
+        self.max_per_host = max_per_host
+        self.retries = retries
+        self.ssl_context = ssl_context
+        self.user_agent = user_agent
+        #(host, port) -> list koneksi idle, dan semaphore jatah koneksinya
+        self.idle = {}
+        self.slots = {}
+        self.lock = threading.Lock()
+        self.connects = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _slot(self, address):
+        with self.lock:
+            slot = self.slots.get(address)
+            if slot is None:
+                slot = self.slots[address] = threading.BoundedSemaphore(self.max_per_host)
+                self.idle[address] = []
+            return slot
+
+    def _acquire(self, address, fresh):
+        if not fresh:
+            while True:
+                with self.lock:
+                    if not self.idle[address]:
                         break
+                    conn = self.idle[address].pop()
+                if not conn.stale():
+                    return conn, True
+                conn.close()
+        conn = Connection(address[0], address[1], self.connect_timeout, self.timeout, self.ssl_context)
+        with self.lock:
+            self.connects += 1
+        logging.debug(f"Connected to {address}")
+        return conn, False
+
+    def _release(self, address, conn, reusable):
+        if reusable:
+            with self.lock:
+                self.idle[address].append(conn)
+        else:
+            conn.close()
+
+    @contextlib.contextmanager
+    def stream(self, method, path, headers=None, body=None, host=None, port=None, progress=None):
+        """Kirim request; di dalam blok with body response dibaca lewat iter_content().
+
+        body boleh bytes atau file biner yang terbuka (dikirim mulai posisinya
+        sampai akhir file, progress(terkirim, total) dipanggil selama upload).
+        Koneksi kembali ke pool hanya bila body response habis dibaca di dalam
+        blok; bila tidak, koneksi ditutup.
+        """
+        address = (host or self.host, port or self.port)
+        all_headers = {'Host': f"{address[0]}:{address[1]}", 'User-Agent': self.user_agent}
+        if headers:
+            all_headers.update(headers)
+        if hasattr(body, 'read'):
+            start = body.tell()
+            length = os.fstat(body.fileno()).st_size - start
+        else:
+            start = None
+            length = len(body or b"")
+        if length or method in ('POST', 'PUT'):
+            all_headers['Content-Length'] = str(length)
+        with self._slot(address):
+            attempt = 0
+            fresh = False
+            while True:
+                conn, reused = self._acquire(address, fresh)
+                try:
+                    conn.send(method, path, all_headers, body, length, progress)
+                    response, keep_alive = conn.read_head(method)
+                    break
+                except ClientError as e:
+                    conn.close()
+                    #server menutup koneksi idle tepat saat request dikirim
+                    if reused and isinstance(e, ConnectionClosed) and attempt < self.retries:
+                        attempt += 1
+                        fresh = True
+                        if start is not None:
+                            body.seek(start)
+                        continue
+                    raise
+                except BaseException:
+                    conn.close()
+                    raise
+            response.chunks = conn.iter_body()
+            try:
+                yield response
+            except BaseException:
+                conn.close()
+                raise
+            self._release(address, conn, keep_alive and conn.body_done)
+
+    def request(self, method, path, headers=None, body=None, host=None, port=None):
+        """Kirim satu request dan kembalikan Response dengan body lengkap; melempar ClientError bila gagal."""
+        with self.stream(method, path, headers, body, host, port) as response:
+            response.body = b"".join(response.iter_content())
+        return response
+
+    def list_files(self, **kw):
+        return self.request('GET', '/list_files', **kw)
+
+    def upload(self, remote_name, data, **kw):
+        """Upload bytes, atau file biner yang terbuka (dikirim dengan sendfile)."""
+        return self.request('POST', '/upload_file', {'X-Filename': urllib.parse.quote(remote_name)}, data, **kw)
+
+    def upload_file(self, local_path, remote_name=None, progress=None, **kw):
+        with open(local_path, 'rb') as f:
+            headers = {'X-Filename': urllib.parse.quote(remote_name or os.path.basename(local_path))}
+            with self.stream('POST', '/upload_file', headers, f, progress=progress, **kw) as response:
+                response.body = b"".join(response.iter_content())
+        return response
+
+    def download(self, remote_name, **kw):
+        return self.request('GET', f"/download/{urllib.parse.quote(remote_name)}", **kw)
+
+    def download_file(self, remote_name, local_path=None, progress=None, checksum='sha256', segments=1, **kw):
+        """Unduh langsung ke file lokal tanpa menahan body di memori.
+
+        Body ditulis ke local_path + '.part' lalu di-rename, jadi file tujuan
+        hanya muncul bila download lengkap dan response 200. progress(diterima,
+        total) dipanggil setiap potongan; response.digest berisi hex digest
+        checksum (nama algoritma hashlib, None mematikan) yang dihitung sambil
+        menerima. segments > 1 membagi file besar menjadi beberapa range yang
+        diunduh paralel bila server mengiklankan Accept-Ranges: bytes.
+        """
+        local_path = local_path or os.path.basename(remote_name)
+        path = f"/download/{urllib.parse.quote(remote_name)}"
+        if segments > 1:
+            #probe satu byte: 206 memberi ukuran file dan validatornya, server
+            #yang mengabaikan Range langsung mengirim seluruh file (200)
+            with self.stream('GET', path, {'Range': 'bytes=0-0'}, **kw) as response:
+                if response.status == 200:
+                    return self._save(response, local_path, progress, checksum)
+                response.body = b"".join(response.iter_content())
+                if response.status != 206:
+                    return response
+            size = content_range_size(response.headers.get('content-range'))
+            if size is not None and size >= segments * MIN_SEGMENT:
+                validator = response.headers.get('etag') or response.headers.get('last-modified')
+                return self._download_segmented(path, local_path, progress, checksum, segments,
+                                                size, validator, response, **kw)
+        with self.stream('GET', path, **kw) as response:
+            if response.status != 200:
+                response.body = b"".join(response.iter_content())
+                return response
+            return self._save(response, local_path, progress, checksum)
+
+    def _save(self, response, local_path, progress, checksum):
+        """Tulis body response ke local_path (lewat file .part) sambil menghitung checksum."""
+        tmp = local_path + '.part'
+        digest = hashlib.new(checksum) if checksum else None
+        total = int(response.headers.get('content-length', 0)) or None
+        received = 0
+        try:
+            with open(tmp, 'wb') as f:
+                for data in response.iter_content():
+                    f.write(data)
+                    if digest is not None:
+                        digest.update(data)
+                    received += len(data)
+                    if progress:
+                        progress(received, total)
+        except BaseException:
+            remove_quietly(tmp)
+            raise
+        os.replace(tmp, local_path)
+        response.digest = digest.hexdigest() if digest is not None else None
+        return response
+
+    def _download_segmented(self, path, local_path, progress, checksum, segments, size, validator, response, **kw):
+        """Download paralel per range, ditulis dengan os.pwrite ke offset masing-masing.
+
+        Setiap range dikirim dengan If-Range validator dari probe, jadi file
+        yang berubah di tengah jalan dijawab 200 dan download dibatalkan.
+        Potongan tiba tidak berurutan, jadi checksum dihitung dengan membaca
+        ulang file setelah selesai.
+        """
+        step = -(-size // segments)
+        ranges = [(start, min(start + step, size) - 1) for start in range(0, size, step)]
+        tmp = local_path + '.part'
+        lock = threading.Lock()
+        received = [0]
+
+        def fetch(start, end):
+            headers = {'Range': f"bytes={start}-{end}"}
+            if validator:
+                headers['If-Range'] = validator
+            with self.stream('GET', path, headers, **kw) as part:
+                if part.status != 206 or part.headers.get('content-range') != f"bytes {start}-{end}/{size}":
+                    raise ClientError(f"range {start}-{end} answered with {part.status_line}; file changed?")
+                offset = start
+                for data in part.iter_content():
+                    os.pwrite(fd, data, offset)
+                    offset += len(data)
+                    if progress:
+                        with lock:
+                            received[0] += len(data)
+                            progress(received[0], size)
+
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.ftruncate(fd, size)
+            with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+                futures = [executor.submit(fetch, start, end) for start, end in ranges]
+                try:
+                    for future in as_completed(futures):
+                        future.result()
+                except BaseException:
+                    for future in futures:
+                        future.cancel()
+                    raise
+        except BaseException:
+            os.close(fd)
+            remove_quietly(tmp)
+            raise
+        os.close(fd)
+        if checksum:
+            response.digest = file_digest(tmp, checksum)
+        os.replace(tmp, local_path)
+        #response probe mewakili download: status 200 dan ukuran file utuh
+        response.status, response.reason, response.body = 200, 'OK', b""
+        response.headers['content-length'] = str(size)
+        response.headers.pop('content-range', None)
+        return response
+
+    def delete(self, remote_name, **kw):
+        return self.request('DELETE', f"/delete_file/{urllib.parse.quote(remote_name)}", **kw)
+
+    def batch(self, jobs, workers=None):
+        """Jalankan banyak operasi bersamaan di thread pool.
+
+        jobs adalah iterable tuple (nama method, argumen...), mis.
+        ('upload_file', 'a.txt') atau ('delete', 'b.txt'). Menghasilkan
+        (job, response, error) sesuai urutan selesai; tepat satu dari response
+        dan error bernilai None. Jumlah koneksi tetap dibatasi max_per_host,
+        jadi workers di atas itu hanya menambah antrean.
+        """
+        with ThreadPoolExecutor(max_workers=workers or self.max_per_host) as executor:
+            futures = {executor.submit(getattr(self, job[0]), *job[1:]): job for job in jobs}
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result(), None
+                except (ClientError, OSError) as e:
+                    yield futures[future], None, e
+
+    def close(self):
+        with self.lock:
+            conns = [conn for idle in self.idle.values() for conn in idle]
+            for idle in self.idle.values():
+                idle.clear()
+        for conn in conns:
+            conn.close()
+
+
+def content_range_size(value):
+    """Ukuran total dari header Content-Range 'bytes a-b/total'."""
+    _, _, total = (value or '').rpartition('/')
+    return int(total) if total.isdigit() else None
+
+
+def file_digest(path, algorithm):
+    digest = hashlib.new(algorithm)
+    buf = bytearray(READ_SIZE)
+    view = memoryview(buf)
+    with open(path, 'rb') as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            digest.update(view[:n])
+    return digest.hexdigest()
+
+
+def remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
 
-        logging.warning("Data received from server:")
-        return received_data
-    except Exception as ee:
+
+_clients = {}
+
+
+def send_http_request(method, path, server_host, server_port, custom_headers=None, body_bytes=None):
+    """Kompatibilitas: request lewat HttpClient bersama, kembalikan response mentah (b"" bila gagal)."""
+    client = _clients.get((server_host, server_port))
+    if client is None:
+        client = _clients.setdefault((server_host, server_port), HttpClient(server_host, server_port))
+    try:
+        return client.request(method, path, custom_headers, body_bytes).raw()
+    except ClientError as ee:
         logging.error(f"Error during request: {str(ee)}")
         return b""
-    finally:
-        sock.close()
+
 
 def parse_http_response(raw_response_bytes):
     """Parses raw HTTP response bytes into status line, headers, and body."""
@@ -114,13 +589,13 @@ def parse_http_response(raw_response_bytes):
 
     lines = headers_str.split('\r\n')
     status_line = lines[0] if lines else ""
-    
+
     headers_dict = {}
     for line in lines[1:]:
         if ':' in line:
             key, value = line.split(':', 1)
             headers_dict[key.strip().lower()] = value.strip()
-            
+
     return status_line, headers_dict, body_content
 
 
@@ -129,9 +604,20 @@ def pause_for_next_step():
     input("\nTekan Enter untuk melanjutkan...")
     print("\n" + "="*40 + "\n")
 
+
+def print_response(response, show_headers=True):
+    print(f"Status: {response.status_line}")
+    if show_headers:
+        print("Headers:")
+        for k, v in response.headers.items():
+            print(f"  {k}: {v}")
+    print("\nBody:")
+    print(response.text())
+
+
 def run_all_tests(server_host, server_port, server_type_name):
     print(f"\n\n--- Testing with {server_type_name.upper()} Server (Port {server_port}) ---")
-    
+
     input(f"\nPress Enter to begin {server_type_name} Server tests...")
 
     local_test_file = "test_client_upload.txt"
@@ -141,135 +627,125 @@ def run_all_tests(server_host, server_port, server_type_name):
     with open(local_another_file, "w") as f:
         f.write(f"This is another {server_type_name} test file.")
 
-    print("--- 1. Melihat daftar file awal ---")
-    raw_response = send_http_request('GET', '/list_files', server_host, server_port)
-    status_line, headers, body = parse_http_response(raw_response)
-    print(f"Status: {status_line}")
-    print("Headers:")
-    for k, v in headers.items():
-        print(f"  {k}: {v}")
-    print("\nBody:")
-    try:
-        print(body.decode('utf-8', errors='replace'))
-    except UnicodeDecodeError:
-        print(f"Binary content (first 100 bytes): {body[:100]}...") # Print a snippet for binary
-    pause_for_next_step()
-
+    #satu client untuk semua langkah: koneksi keep-alive dipakai ulang
+    client = HttpClient(server_host, server_port)
     remote_uploaded_file = f"remote_{server_type_name}_client_upload.txt"
-    print(f"--- 2. Mengunggah file '{local_test_file}' sebagai '{remote_uploaded_file}' ---")
-    with open(local_test_file, 'rb') as f:
-        file_content_bytes = f.read()
-    
-    upload_headers = {'X-Filename': urllib.parse.quote(remote_uploaded_file)}
-    raw_response = send_http_request('POST', '/upload_file', server_host, server_port, custom_headers=upload_headers, body_bytes=file_content_bytes)
-    status_line, headers, body = parse_http_response(raw_response)
-    print(f"Status: {status_line}")
-    print("Headers:")
-    for k, v in headers.items():
-        print(f"  {k}: {v}")
-    print("\nBody:")
-    try:
-        print(body.decode('utf-8', errors='replace'))
-    except UnicodeDecodeError:
-        print(f"Binary content (first 100 bytes): {body[:100]}...")
-    pause_for_next_step()
-
-    print("--- 3. Melihat daftar file setelah diunggah ---")
-    raw_response = send_http_request('GET', '/list_files', server_host, server_port)
-    status_line, headers, body = parse_http_response(raw_response)
-    print(f"Status: {status_line}")
-    print("Headers:")
-    for k, v in headers.items():
-        print(f"  {k}: {v}")
-    print("\nBody:")
-    try:
-        print(body.decode('utf-8', errors='replace'))
-    except UnicodeDecodeError:
-        print(f"Binary content (first 100 bytes): {body[:100]}...")
-    pause_for_next_step()
-
-    remote_file_to_delete = f"delete_me_{server_type_name}_client.txt"
-    with open(local_another_file, 'rb') as f:
-        another_file_content_bytes = f.read()
-    upload_headers_delete = {'X-Filename': urllib.parse.quote(remote_file_to_delete)}
-    print(f"--- Uploading '{local_another_file}' as '{remote_file_to_delete}' for deletion test ---")
-    raw_response_upload_delete_test = send_http_request('POST', '/upload_file', server_host, server_port, custom_headers=upload_headers_delete, body_bytes=another_file_content_bytes)
-    status_line_upload, _, body_upload = parse_http_response(raw_response_upload_delete_test)
-    if "200 OK" not in status_line_upload:
-        logging.error(f"Failed to upload file for deletion test: {status_line_upload} - {body_upload.decode('utf-8', errors='ignore')}")
-
-    raw_response = send_http_request('GET', '/list_files', server_host, server_port)
-    print("\nList Files (before deletion confirmation):")
-    _, _, body_list_before_delete = parse_http_response(raw_response)
-    try:
-        print(body_list_before_delete.decode('utf-8', errors='replace'))
-    except UnicodeDecodeError:
-        print(f"Binary content (first 100 bytes): {body_list_before_delete[:100]}...")
-    pause_for_next_step()
-
-    print(f"--- 4. Menghapus file '{remote_file_to_delete}' ---")
-    raw_response = send_http_request('DELETE', f'/delete_file/{urllib.parse.quote(remote_file_to_delete)}', server_host, server_port)
-    status_line, headers, body = parse_http_response(raw_response)
-    print(f"Status: {status_line}")
-    print("Headers:")
-    for k, v in headers.items():
-        print(f"  {k}: {v}")
-    print("\nBody:")
-    try:
-        print(body.decode('utf-8', errors='replace'))
-    except UnicodeDecodeError:
-        print(f"Binary content (first 100 bytes): {body[:100]}...")
-    pause_for_next_step()
-
-    print("--- 5. Melihat daftar file setelah dihapus ---")
-    raw_response = send_http_request('GET', '/list_files', server_host, server_port)
-    status_line, headers, body = parse_http_response(raw_response)
-    print(f"Status: {status_line}")
-    print("Headers:")
-    for k, v in headers.items():
-        print(f"  {k}: {v}")
-    print("\nBody:")
-    try:
-        print(body.decode('utf-8', errors='replace'))
-    except UnicodeDecodeError:
-        print(f"Binary content (first 100 bytes): {body[:100]}...")
-    pause_for_next_step()
-
-    print(f"--- 6. Mengunduh file '{remote_uploaded_file}' ---")
     download_save_path = f"downloaded_{server_type_name}_{remote_uploaded_file}"
-    raw_response = send_http_request('GET', f'/download/{urllib.parse.quote(remote_uploaded_file)}', server_host, server_port)
-    status_line, headers, body = parse_http_response(raw_response)
-    
-    print(f"Status: {status_line}")
-    print("Headers:")
-    for k, v in headers.items():
-        print(f"  {k}: {v}")
-    
-    if "200 OK" in status_line:
-        try:
-            with open(download_save_path, 'wb') as f:
-                f.write(body)
+    try:
+        print("--- 1. Melihat daftar file awal ---")
+        print_response(client.list_files())
+        pause_for_next_step()
+
+        print(f"--- 2. Mengunggah file '{local_test_file}' sebagai '{remote_uploaded_file}' ---")
+        print_response(client.upload_file(local_test_file, remote_uploaded_file))
+        pause_for_next_step()
+
+        print("--- 3. Melihat daftar file setelah diunggah ---")
+        print_response(client.list_files())
+        pause_for_next_step()
+
+        remote_file_to_delete = f"delete_me_{server_type_name}_client.txt"
+        print(f"--- Uploading '{local_another_file}' as '{remote_file_to_delete}' for deletion test ---")
+        response = client.upload_file(local_another_file, remote_file_to_delete)
+        if response.status != 200:
+            logging.error(f"Failed to upload file for deletion test: {response.status_line} - {response.text()}")
+
+        print("\nList Files (before deletion confirmation):")
+        print(client.list_files().text())
+        pause_for_next_step()
+
+        print(f"--- 4. Menghapus file '{remote_file_to_delete}' ---")
+        print_response(client.delete(remote_file_to_delete))
+        pause_for_next_step()
+
+        print("--- 5. Melihat daftar file setelah dihapus ---")
+        print_response(client.list_files())
+        pause_for_next_step()
+
+        print(f"--- 6. Mengunduh file '{remote_uploaded_file}' ---")
+        response = client.download_file(remote_uploaded_file, download_save_path)
+        print(f"Status: {response.status_line}")
+        print("Headers:")
+        for k, v in response.headers.items():
+            print(f"  {k}: {v}")
+        if response.status == 200:
             print(f"\nSuccessfully downloaded '{remote_uploaded_file}' to '{download_save_path}'.")
             try:
                 with open(download_save_path, 'r') as f_read:
                     print(f"Content of downloaded file: {f_read.read()}")
             except UnicodeDecodeError:
                 print(f"Downloaded file '{download_save_path}' is binary, cannot print content directly.")
-        except Exception as e:
-            print(f"Error saving downloaded file: {e}")
-    else:
-        print(f"\nFailed to download. Server response body:\n{body.decode('utf-8', errors='replace')}")
-    pause_for_next_step()
-
-    if os.path.exists(local_test_file):
-        os.remove(local_test_file)
-    if os.path.exists(local_another_file):
-        os.remove(local_another_file)
-    if os.path.exists(download_save_path):
-        os.remove(download_save_path)
+        else:
+            print(f"\nFailed to download. Server response body:\n{response.text()}")
+        pause_for_next_step()
+    except ClientError as e:
+        print(f"Request to {server_host}:{server_port} failed: {e}. Ensure server is running.")
+    finally:
+        client.close()
+
+    for path in (local_test_file, local_another_file, download_save_path):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def progress_printer(name):
+    """Callback progress yang mencetak persentase ke stderr setiap naik 10%."""
+    last = [-1]
+
+    def progress(done, total):
+        step = done * 10 // total if total else 0
+        if step != last[0]:
+            last[0] = step
+            print(f"{name}: {done}/{total or '?'} bytes", file=sys.stderr)
+    return progress
+
+
+def run_batch(argv):
+    """python client.py upload|download|delete host:port nama... [-j N] [--segments N]
+
+    Semua file diproses bersamaan lewat HttpClient.batch; hasil dicetak
+    sesuai urutan selesai, download beserta sha256-nya.
+    """
+    import argparse
+    import time
+    parser = argparse.ArgumentParser(prog='client.py')
+    parser.add_argument('operation', choices=['upload', 'download', 'delete'])
+    parser.add_argument('server', help="host:port")
+    parser.add_argument('names', nargs='+', help="file lokal (upload) atau nama file di server")
+    parser.add_argument('-j', '--jobs', type=int, default=8, help="koneksi/thread bersamaan")
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--segments', type=int, default=1, help="range paralel per file untuk download besar")
+    parser.add_argument('--progress', action='store_true', help="cetak kemajuan transfer ke stderr")
+    args = parser.parse_args(argv)
+    host, _, port = args.server.rpartition(':')
+    jobs = []
+    for name in args.names:
+        progress = progress_printer(name) if args.progress else None
+        if args.operation == 'upload':
+            jobs.append(('upload_file', name, None, progress))
+        elif args.operation == 'download':
+            jobs.append(('download_file', name, None, progress, 'sha256', args.segments))
+        else:
+            jobs.append(('delete', name))
+    failed = 0
+    start = time.perf_counter()
+    with HttpClient(host or 'localhost', int(port), timeout=args.timeout, max_per_host=args.jobs) as client:
+        for job, response, error in client.batch(jobs, args.jobs):
+            if error is not None or response.status >= 400:
+                failed += 1
+            result = error or response.status_line
+            if error is None and response.digest:
+                result = f"{result} sha256={response.digest}"
+            print(f"{args.operation} {job[1]}: {result}")
+        print(f"{len(args.names)} files in {time.perf_counter() - start:.2f}s, {failed} failed, "
+              f"{client.connects} connections")
+    return 1 if failed else 0
 
 
 if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        sys.exit(run_batch(sys.argv[1:]))
+
     thread_pool_config = ('172.16.16.101', 8885, 'thread_pool')
     process_pool_config = ('172.16.16.101', 8889, 'process_pool')
 
@@ -277,4 +753,4 @@ if __name__ == '__main__':
 
     run_all_tests(*process_pool_config)
 
-    print("\n--- Selesai Menjalankan Semua Tes ---")
\ No newline at end of file
+    print("\n--- Selesai Menjalankan Semua Tes ---")
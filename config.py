@@ -0,0 +1,75 @@
+import os
+import json
+
+
+class ServerConfig:
+    """Pengaturan bersama HttpServer dan semua front-end.
+
+    Nilai default di DEFAULTS sama dengan perilaku lama setiap script server.
+    server.py mengisinya dari argumen baris perintah lalu memanggil export(),
+    sehingga HttpServer di proses mana pun (termasuk worker forkserver yang
+    mengimpor ulang modul server) membaca nilai yang sama lewat from_env().
+    """
+    ENV = 'HTTP_SERVER_CONFIG'
+    DEFAULTS = {
+        'host': '0.0.0.0',
+        'port': 8080,
+        'model': 'thread-pool',
+        'tls': False,
+        'certfile': os.path.join('certs', 'domain.crt'),
+        'keyfile': os.path.join('certs', 'domain.key'),
+        #handshake TLS dilakukan di worker dan dibatasi waktu ini (detik)
+        'tls_handshake_timeout': 10,
+        #suite TLS 1.2: hanya ECDHE (forward secrecy) dengan AEAD; suite
+        #TLS 1.3 diatur OpenSSL sendiri dan semuanya sudah AEAD
+        'tls_ciphers': 'ECDHE+AESGCM:ECDHE+CHACHA20:!aNULL:!eNULL:!MD5:!DSS',
+        #None: daftar grup ECDH default OpenSSL
+        'tls_ecdh_curve': None,
+        #jumlah session ticket TLS 1.3 per handshake; 0 mematikan ticket
+        'tls_session_tickets': 2,
+        #ukuran pool thread/proses per server (per worker untuk pre-fork)
+        'workers': 20,
+        #jumlah proses worker mode pre-fork
+        'processes': os.cpu_count() or 1,
+        'listen_backlog': 1024,
+        'max_connections': 1000,
+        'max_pending': 64,
+        'retry_after': 1,
+        'recv_size': 64 * 1024,
+        'upload_chunk_size': 64 * 1024,
+        'max_header_size': 16 * 1024,
+        'base_dir': 'server_files',
+        'cache_max_bytes': 64 * 1024 * 1024,
+        'cache_max_file_size': 256 * 1024,
+        'keepalive_timeout': 15,
+        'keepalive_max_requests': 100,
+        #access log per request: '-' ke stderr, path file, atau 'off'
+        'access_log': '-',
+        #logfmt (key=value) atau json, satu baris per request
+        'access_log_format': 'logfmt',
+        #peluang sebuah request dicatat; response 5xx selalu dicatat
+        'access_log_sample': 1.0,
+        #tambahkan header request dan awal body response ke setiap baris
+        'access_log_debug': False,
+    }
+
+    def __init__(self, **settings):
+        for name, default in self.DEFAULTS.items():
+            setattr(self, name, settings.pop(name, default))
+        if settings:
+            raise TypeError(f"unknown server settings: {', '.join(sorted(settings))}")
+
+    @classmethod
+    def from_env(cls):
+        """Config yang diekspor proses induk, atau default bila tidak ada."""
+        data = os.environ.get(cls.ENV)
+        if not data:
+            return cls()
+        settings = json.loads(data)
+        return cls(**{name: value for name, value in settings.items() if name in cls.DEFAULTS})
+
+    def export(self):
+        os.environ[self.ENV] = json.dumps(vars(self))
+
+    def __repr__(self):
+        return f"ServerConfig({', '.join(f'{k}={v!r}' for k, v in vars(self).items())})"
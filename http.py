@@ -1,13 +1,497 @@
 import sys
 import os.path
+import stat
+import time
 import uuid
 from glob import glob
-from datetime import datetime
 import urllib.parse
 import traceback
+import ssl
+import mmap
+import tempfile
+import gzip
+import zlib
+import threading
+import socket
+import logging
+import bisect
+import json
+import base64
+import html
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from http_parser import HttpParser, HttpParseError, BodyReader
+from metrics import Metrics
+from config import ServerConfig
+from access_log import AccessLog, DEBUG_BODY_BYTES
+import tls
+
+#batas jumlah buffer per sendmsg (IOV_MAX di Linux)
+IOV_MAX = 1024
+#response TLS sampai sebesar ini digabung agar muat dalam satu record TLS
+TLS_JOIN_SIZE = 16 * 1024
+TCP_CORK = getattr(socket, 'TCP_CORK', None)
+#(detik, baris header Date) terakhir; diganti utuh sehingga aman dibaca antar thread
+date_cache = (None, b'')
+
+
+def http_date():
+    """Baris header Date format RFC 7231 (IMF-fixdate), diformat ulang paling sering sekali per detik."""
+    global date_cache
+    now = int(time.time())
+    second, line = date_cache
+    if second != now:
+        line = f"Date: {formatdate(now, usegmt=True)}\r\n".encode()
+        date_cache = (now, line)
+    return line
+
+
+def send_buffers(sock, buffers):
+    """Kirim semua buffer berurutan dengan sendmsg (writev), tanpa menggabungkannya.
+
+    sendmsg boleh mengirim sebagian; buffer yang sudah terkirim dibuang dan
+    sisanya dikirim lagi. SSLSocket tidak punya sendmsg: response kecil
+    digabung menjadi satu record TLS, yang besar dikirim per buffer.
+    """
+    buffers = [buf for buf in buffers if len(buf)]
+    if not buffers:
+        return
+    if len(buffers) == 1:
+        sock.sendall(buffers[0])
+        return
+    if isinstance(sock, ssl.SSLSocket):
+        if sum(len(buf) for buf in buffers) <= TLS_JOIN_SIZE:
+            sock.sendall(b''.join(buffers))
+        else:
+            for buf in buffers:
+                sock.sendall(buf)
+        return
+    views = [memoryview(buf).cast('B') for buf in buffers]
+    while views:
+        sent = sock.sendmsg(views[:IOV_MAX])
+        while sent and sent >= len(views[0]):
+            sent -= len(views[0])
+            del views[0]
+        if sent:
+            views[0] = views[0][sent:]
+
+
+def cork(sock, on):
+    """Pasang/lepas TCP_CORK; False bila tidak didukung (bukan Linux, bukan TCP)."""
+    if TCP_CORK is None:
+        return False
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, TCP_CORK, 1 if on else 0)
+    except OSError:
+        return False
+    return True
+
+
+class HttpResponse:
+    """Response yang belum diserialisasi: status line, header, dan body.
+
+    Body bisa berupa bytes biasa, atau potongan-potongan (parts) yang masing-
+    masing berupa bytes atau tuple (offset, count) di file yang sudah dibuka
+    (fileobj). Potongan file baru dibaca saat dikirim, sehingga file besar
+    tidak pernah dimuat utuh ke memori. Body yang panjangnya tidak diketahui
+    di awal diberikan sebagai iterable bytes (stream) dan dikirim dengan
+    Transfer-Encoding: chunked, atau diakhiri penutupan koneksi untuk client
+    HTTP/1.0. Front-end memanggil send() untuk mengirimkannya ke socket.
+    """
+    SEND_CHUNK = 256 * 1024
+
+    def __init__(self, server, kode, message, headers, body=b'', fileobj=None, parts=None, stream=None):
+        self.server = server
+        self.kode = kode
+        self.message = message
+        self.headers = dict(headers)
+        self.body = body
+        self.fileobj = fileobj
+        self.stream = stream
+        self.chunked = stream is not None
+        if stream is not None:
+            self.parts = []
+            self.length = None
+        else:
+            self.parts = [body] if parts is None else parts
+            self.length = sum(p[1] if isinstance(p, tuple) else len(p) for p in self.parts)
+        #None: diputuskan front-end; handler boleh memaksa False
+        self.keep_alive = None
+        #diisi proses() untuk metrics dan access log; response error parser
+        #tidak punya request
+        self.method = ''
+        self.route = ''
+        self.path = ''
+        self.client = None
+        self.request_headers = None
+        self.started = None
+        self.head_length = 0
+        self.streamed = 0
+        self.finished = False
+
+    def head(self):
+        server = self.server
+        resp = [server.status_line(self.kode, self.message), http_date(),
+                server.connection_block(self.keep_alive)]
+        if self.chunked:
+            resp.append(b"Transfer-Encoding: chunked\r\n")
+        elif self.length is not None and self.kode != 304:
+            resp.append(b"Content-Length: %d\r\n" % self.length)
+        header_line = server.header_line
+        for kk, vv in self.headers.items():
+            resp.append(header_line(kk, vv))
+        resp.append(b"\r\n")
+        head = b''.join(resp)
+        self.head_length = len(head)
+        return head
+
+    def body_chunks(self):
+        """Potongan body stream yang siap dikirim, sudah diberi framing chunked bila perlu."""
+        for chunk in self.stream:
+            if not chunk:
+                #chunk kosong berarti akhir body dalam encoding chunked
+                continue
+            self.streamed += len(chunk)
+            if self.chunked:
+                yield b"%x\r\n%s\r\n" % (len(chunk), chunk)
+            else:
+                yield chunk
+        if self.chunked:
+            yield b"0\r\n\r\n"
+
+    def send(self, sock):
+        """Kirim response ke sock.
+
+        Header dan body bytes dikirim bersama dengan sendmsg (writev) tanpa
+        digabung dulu; potongan file dikirim dengan sendfile (TCP) atau mmap
+        (TLS). Selama header dan potongan file dikirim dengan beberapa syscall,
+        socket di-TCP_CORK agar header tidak keluar sebagai segmen kecil
+        tersendiri; cork dilepas di akhir sehingga ekor response langsung
+        terkirim (koneksi memakai TCP_NODELAY).
+        """
+        mm = view = None
+        corked = False
+        try:
+            if self.stream is not None:
+                sock.sendall(self.head())
+                for chunk in self.body_chunks():
+                    sock.sendall(chunk)
+                return
+            if self.fileobj is None:
+                send_buffers(sock, [self.head()] + self.parts)
+                return
+            if isinstance(sock, ssl.SSLSocket):
+                if self.length:
+                    #sendfile tidak bisa dipakai lewat TLS, data harus dienkripsi di
+                    #userspace; mmap menghindari salinan ke buffer python per chunk
+                    mm = mmap.mmap(self.fileobj.fileno(), 0, access=mmap.ACCESS_READ)
+                    view = memoryview(mm)
+            else:
+                corked = cork(sock, True)
+            pending = [self.head()]
+            for part in self.parts:
+                if not isinstance(part, tuple):
+                    pending.append(part)
+                    continue
+                offset, count = part
+                if count == 0:
+                    continue
+                send_buffers(sock, pending)
+                pending = []
+                if view is not None:
+                    end = offset + count
+                    for start in range(offset, end, self.SEND_CHUNK):
+                        sock.sendall(view[start:min(start + self.SEND_CHUNK, end)])
+                else:
+                    #socket.sendfile memakai os.sendfile (zero-copy di kernel) dan
+                    #tetap menghormati timeout socket
+                    sock.sendfile(self.fileobj, offset, count)
+            send_buffers(sock, pending)
+        finally:
+            if corked:
+                cork(sock, False)
+            if view is not None:
+                view.release()
+                mm.close()
+            self.close()
+
+    def close(self):
+        if self.fileobj is not None:
+            self.fileobj.close()
+        if not self.finished:
+            self.finished = True
+            self.server.record_response(self)
+
+    def __bytes__(self):
+        """Serialisasi penuh ke memori, hanya untuk front-end yang belum streaming."""
+        try:
+            hasil = [self.head()]
+            if self.stream is not None:
+                hasil.extend(self.body_chunks())
+            for part in self.parts:
+                if isinstance(part, tuple):
+                    self.fileobj.seek(part[0])
+                    part = self.fileobj.read(part[1])
+                hasil.append(part)
+            return b''.join(hasil)
+        finally:
+            self.close()
+
+
+class CacheEntry:
+    """Hasil stat satu file beserta header yang sudah jadi.
+
+    body berisi isi file bila file cukup kecil untuk di-cache, atau None bila
+    hanya stat-nya yang di-cache (file besar tetap dialirkan dari disk).
+    ETag dan Last-Modified dihitung sekali dari inode/size/mtime. variants
+    menyimpan body yang sudah dikompres per Content-Encoding; karena entry
+    diganti setiap kali file berubah, variant otomatis terikat ke versi file.
+    """
+    __slots__ = ('body', 'headers', 'validators', 'variants', 'size', 'mtime_ns', 'ino', 'checked')
+
+    def __init__(self, body, content_type, st):
+        self.body = body
+        self.variants = {}
+        self.size = st.st_size
+        self.mtime_ns = st.st_mtime_ns
+        self.ino = st.st_ino
+        self.checked = time.monotonic()
+        self.validators = {
+            'ETag': f'"{st.st_ino:x}-{st.st_size:x}-{st.st_mtime_ns:x}"',
+            'Last-Modified': formatdate(st.st_mtime, usegmt=True),
+        }
+        self.headers = {'Content-type': content_type, 'Accept-Ranges': 'bytes', **self.validators}
+
+    @property
+    def cost(self):
+        if self.body is None:
+            return 0
+        return len(self.body) + sum(len(v) for v in self.variants.values())
+
+    def matches(self, st):
+        return (st.st_size == self.size and st.st_mtime_ns == self.mtime_ns
+                and st.st_ino == self.ino)
+
+
+class FileCache:
+    """Cache stat dan isi file kecil di memori, LRU dengan batas total byte.
+
+    Entry divalidasi ulang dengan os.stat paling sering sekali per
+    revalidate detik; jika mtime, ukuran atau inode berubah entry dibuang.
+    Aman dipakai bersama oleh banyak thread.
+    """
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_file_size=256 * 1024, revalidate=1.0, max_entries=10000):
+        self.max_bytes = max_bytes
+        self.max_file_size = max_file_size
+        self.revalidate = revalidate
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, path):
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(path)
+            now = time.monotonic()
+            if now - entry.checked < self.revalidate:
+                self.hits += 1
+                return entry
+        try:
+            fresh = entry.matches(os.stat(path))
+        except OSError:
+            fresh = False
+        with self.lock:
+            if not fresh:
+                self._remove(path, entry)
+                self.misses += 1
+                return None
+            entry.checked = now
+            self.hits += 1
+            return entry
+
+    def put(self, path, entry):
+        if entry.cost > self.max_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(path, None)
+            if old is not None:
+                self.total_bytes -= old.cost
+            self.entries[path] = entry
+            self.total_bytes += entry.cost
+            while self.total_bytes > self.max_bytes or len(self.entries) > self.max_entries:
+                _, evicted = self.entries.popitem(last=False)
+                self.total_bytes -= evicted.cost
+
+    def add_variant(self, path, entry, coding, data):
+        with self.lock:
+            if self.entries.get(path) is not entry or coding in entry.variants:
+                return
+            entry.variants[coding] = data
+            self.total_bytes += len(data)
+            while self.total_bytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.total_bytes -= evicted.cost
+
+    def invalidate(self, path):
+        with self.lock:
+            self._remove(path, self.entries.get(path))
+
+    def _remove(self, path, entry):
+        if entry is not None and self.entries.get(path) is entry:
+            del self.entries[path]
+            self.total_bytes -= entry.cost
+
+    def stats(self):
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.entries),
+                    'bytes': self.total_bytes, 'max_bytes': self.max_bytes}
+
+
+class DirectoryIndex:
+    """Daftar file di satu direktori (nama, ukuran, mtime) yang disimpan di memori.
+
+    Dibangun dengan os.scandir lalu diperbarui per file oleh replace() dan
+    remove(), yang juga melakukan operasi filesystem-nya. Perubahan dari luar
+    (worker lain, file yang disalin langsung) dideteksi lewat mtime direktori,
+    diperiksa paling sering sekali per revalidate detik. Urutan per kunci sort
+    disimpan dan dipelihara dengan bisect, sehingga satu halaman diambil
+    tanpa mengurutkan ulang seluruh direktori.
+    """
+    SORT_KEYS = ('name', 'size', 'mtime')
+
+    def __init__(self, path, revalidate=1.0):
+        self.path = path
+        self.revalidate = revalidate
+        #nama -> (size, mtime_ns)
+        self.files = {}
+        #kunci sort -> list kunci terurut; elemen terakhir setiap kunci adalah nama
+        self.sorted = {}
+        self.dir_mtime_ns = None
+        self.checked = 0.0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def visible(name):
+        return not name.startswith('.upload-')
+
+    @staticmethod
+    def sort_key(sort, name, info):
+        if sort == 'name':
+            return (name,)
+        if sort == 'size':
+            return (info[0], name)
+        return (info[1], name)
+
+    def refresh(self):
+        now = time.monotonic()
+        with self.lock:
+            if self.dir_mtime_ns is not None and now - self.checked < self.revalidate:
+                return
+            self.checked = now
+        #stat direktori sebelum scan: perubahan selama scan akan terlihat
+        #sebagai mtime baru pada pemeriksaan berikutnya
+        st = os.stat(self.path)
+        with self.lock:
+            if st.st_mtime_ns == self.dir_mtime_ns:
+                return
+        files = {}
+        with os.scandir(self.path) as it:
+            for entry in it:
+                if not self.visible(entry.name):
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    est = entry.stat()
+                except OSError:
+                    #file dihapus di tengah scan
+                    continue
+                files[entry.name] = (est.st_size, est.st_mtime_ns)
+        with self.lock:
+            self.files = files
+            self.sorted = {}
+            self.dir_mtime_ns = st.st_mtime_ns
+
+    def replace(self, src, name):
+        """os.replace src ke name di direktori ini dan catat hasilnya di index."""
+        self._change(name, os.replace, src, os.path.join(self.path, name))
+
+    def remove(self, name):
+        self._change(name, os.remove, os.path.join(self.path, name))
+
+    def _change(self, name, op, *args):
+        tracked = not os.path.dirname(name) and self.visible(name)
+        before = os.stat(self.path).st_mtime_ns if tracked else None
+        op(*args)
+        if not tracked:
+            return
+        try:
+            st = os.stat(os.path.join(self.path, name))
+            info = (st.st_size, st.st_mtime_ns)
+        except FileNotFoundError:
+            info = None
+        after = os.stat(self.path).st_mtime_ns
+        with self.lock:
+            self._discard(name)
+            if info is not None:
+                self.files[name] = info
+                for sort, keys in self.sorted.items():
+                    bisect.insort(keys, self.sort_key(sort, name, info))
+            #mtime baru direktori hanya diterima bila sebelumnya index sudah
+            #sinkron; jika tidak, perubahan dari luar akan di-scan ulang
+            if before == self.dir_mtime_ns:
+                self.dir_mtime_ns = after
+
+    def _discard(self, name):
+        info = self.files.pop(name, None)
+        if info is None:
+            return
+        for sort, keys in self.sorted.items():
+            key = self.sort_key(sort, name, info)
+            i = bisect.bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                del keys[i]
+
+    def page(self, sort='name', reverse=False, offset=0, limit=100, cursor=None):
+        """Satu halaman entry (name, size, mtime_ns), total file, dan cursor berikutnya.
+
+        cursor adalah kunci sort entry terakhir halaman sebelumnya; offset
+        dihitung dari posisi setelah cursor. Cursor berikutnya None bila
+        halaman ini yang terakhir.
+        """
+        self.refresh()
+        with self.lock:
+            keys = self.sorted.get(sort)
+            if keys is None:
+                keys = sorted(self.sort_key(sort, name, info) for name, info in self.files.items())
+                self.sorted[sort] = keys
+            total = len(keys)
+            if reverse:
+                stop = total if cursor is None else bisect.bisect_left(keys, cursor)
+                stop = max(stop - offset, 0)
+                start = max(stop - limit, 0)
+                selected = keys[start:stop][::-1]
+                more = start > 0
+            else:
+                start = 0 if cursor is None else bisect.bisect_right(keys, cursor)
+                start += offset
+                selected = keys[start:start + limit]
+                more = start + limit < total
+            entries = [(key[-1],) + self.files[key[-1]] for key in selected]
+        next_cursor = selected[-1] if more and selected else None
+        return entries, total, next_cursor
+
 
 class HttpServer:
-    def __init__(self):
+    def __init__(self, config=None):
+        #tanpa config eksplisit, pakai config yang diekspor server.py (atau default)
+        self.config = config = config or ServerConfig.from_env()
         self.sessions={}
         self.types={}
         self.types['.pdf']='application/pdf'
@@ -15,115 +499,622 @@ class HttpServer:
         self.types['.jpeg']='image/jpeg'
         self.types['.txt']='text/plain'
         self.types['.html']='text/html'
-        self.base_dir = "server_files"
-        os.makedirs(self.base_dir, exist_ok=True)
+        self.base_dir = config.base_dir
+        #file upload sementara; subdirektori base_dir (filesystem sama, jadi
+        #os.replace atomik). Membuat/menulis file di sini hanya mengubah mtime
+        #.uploads, bukan base_dir, jadi index tidak di-scan ulang; direktorinya
+        #sendiri tidak muncul di listing karena index hanya memuat file
+        self.upload_dir = os.path.join(self.base_dir, '.uploads')
+        os.makedirs(self.upload_dir, exist_ok=True)
+        self.keepalive_timeout = config.keepalive_timeout
+        self.keepalive_max_requests = config.keepalive_max_requests
+        self.upload_chunk_size = config.upload_chunk_size
+        self.recv_size = config.recv_size
+        self.max_header_size = config.max_header_size
+        self.cache = FileCache(config.cache_max_bytes, config.cache_max_file_size)
+        self.max_ranges = 32
+        #content type yang dikompres: semua text/* dari self.types ditambah ini
+        self.compressible_types = {'application/json', 'image/svg+xml'}
+        self.compress_min_size = 512
+        self.compress_level = 6
+        self.index = DirectoryIndex(self.base_dir)
+        self.list_default_limit = 100
+        self.list_max_limit = 1000
+        #admission control: backlog listen(), batas koneksi aktif dan antrian
+        #koneksi yang menunggu worker pool; kelebihannya dijawab 503 oleh reject()
+        self.listen_backlog = config.listen_backlog
+        self.max_connections = config.max_connections
+        self.max_pending = config.max_pending
+        self.retry_after = config.retry_after
+        #HTTPS: handshake dilakukan worker lewat secure(), bukan accept loop
+        self.ssl_context = tls.server_context(config) if config.tls else None
+        self.tls_handshake_timeout = config.tls_handshake_timeout
+        #satu baris per request, diformat dan ditulis di thread listener
+        self.access_log = AccessLog(config.access_log, config.access_log_sample,
+                                    config.access_log_debug, config.access_log_format)
+        #potongan header yang sudah di-encode: status line per (kode, pesan),
+        #blok Connection/Keep-Alive/Server per mode koneksi, dan baris header
+        #yang nilainya sering berulang (Content-type, ETag file yang di-cache, ...)
+        self.status_lines = {}
+        self.connection_blocks = {
+            True: (f"Connection: keep-alive\r\n"
+                   f"Keep-Alive: timeout={self.keepalive_timeout}, max={self.keepalive_max_requests}\r\n"
+                   f"Server: myserver/1.0\r\n").encode(),
+            False: b"Connection: close\r\nServer: myserver/1.0\r\n",
+        }
+        self.header_lines = {}
+        self.max_header_lines = 4096
+        self.metrics = Metrics()
+        self.describe_metrics()
+
+    def describe_metrics(self):
+        m = self.metrics
+        m.describe('http_requests_total', 'counter', 'Requests served, by method, route and status.')
+        m.describe('http_request_duration_seconds', 'histogram', 'Time from parsed request to response fully sent.')
+        m.describe('http_requests_in_flight', 'gauge', 'Requests being processed or sent.')
+        m.describe('http_received_bytes_total', 'counter', 'Bytes received from clients, counted when a connection closes.')
+        m.describe('http_sent_bytes_total', 'counter', 'Response bytes (head and body) sent to clients.')
+        m.describe('http_connections_total', 'counter', 'Client connections accepted.')
+        m.describe('http_connections_active', 'gauge', 'Client connections being served.')
+        m.describe('http_connections_queued', 'gauge', 'Accepted connections waiting for a pool worker.')
+        m.describe('http_connections_rejected_total', 'counter', 'Connections or requests shed with 503 because of overload.')
+        m.describe('http_pool_workers', 'gauge', 'Worker pool size.')
+        m.describe('http_pool_busy_workers', 'gauge', 'Pool workers currently serving a connection or request.')
+        m.describe('http_tls_handshakes_total', 'counter', 'Completed TLS handshakes, by whether the session was resumed.')
+        m.describe('http_tls_handshake_failures_total', 'counter', 'TLS handshakes that failed or timed out.')
+        m.describe('http_cache_hits_total', 'counter', 'File cache hits.')
+        m.describe('http_cache_misses_total', 'counter', 'File cache misses.')
+        m.describe('http_cache_entries', 'gauge', 'Entries in the file cache.')
+        m.describe('http_cache_bytes', 'gauge', 'Bytes held by the file cache.')
+        m.describe('http_access_log_dropped_total', 'counter', 'Access log lines dropped because the log queue was full.')
+        m.add_collector(self.cache_metrics)
+        m.add_collector(lambda: [('http_access_log_dropped_total', {}, self.access_log.dropped)])
+
+    def cache_metrics(self):
+        stats = self.cache.stats()
+        return [('http_cache_hits_total', {}, stats['hits']),
+                ('http_cache_misses_total', {}, stats['misses']),
+                ('http_cache_entries', {}, stats['entries']),
+                ('http_cache_bytes', {}, stats['bytes'])]
+
+    @staticmethod
+    def route_of(path):
+        """Label route dengan kardinalitas terbatas untuk metrics."""
+        if path in ('/', '/list_files', '/upload_file', '/metrics'):
+            return path
+        for prefix in ('/download/', '/delete_file/'):
+            if path.startswith(prefix):
+                return prefix + '*'
+        return 'other'
+
+    def record_response(self, hasil):
+        """Dipanggil sekali per response saat selesai dikirim (HttpResponse.close)."""
+        m = self.metrics
+        sent = hasil.head_length + (hasil.streamed if hasil.length is None else hasil.length)
+        duration = 0.0
+        m.inc('http_requests_total', method=hasil.method, route=hasil.route, status=str(hasil.kode))
+        m.inc('http_sent_bytes_total', sent)
+        if hasil.started is not None:
+            duration = time.perf_counter() - hasil.started
+            m.inc('http_requests_in_flight', -1)
+            m.observe('http_request_duration_seconds', duration, route=hasil.route)
+        m.flush(force=False)
+        extra = None
+        if self.access_log.debug:
+            extra = {'request_headers': hasil.request_headers}
+            if hasil.parts and not isinstance(hasil.parts[0], tuple):
+                extra['body'] = hasil.parts[0][:DEBUG_BODY_BYTES]
+        self.access_log.log(hasil.client, hasil.method, hasil.path, hasil.kode, sent, duration, extra)
+
+    def status_line(self, kode, message):
+        line = self.status_lines.get((kode, message))
+        if line is None:
+            line = f"HTTP/1.1 {kode} {message}\r\n".encode()
+            if len(self.status_lines) < self.max_header_lines:
+                self.status_lines[(kode, message)] = line
+        return line
+
+    def connection_block(self, keep_alive):
+        return self.connection_blocks[bool(keep_alive)]
+
+    def header_line(self, name, value):
+        """Baris header yang sudah di-encode; di-cache sampai max_header_lines nilai berbeda."""
+        key = (name, value)
+        line = self.header_lines.get(key)
+        if line is None:
+            line = f"{name}:{value}\r\n".encode()
+            if len(self.header_lines) < self.max_header_lines:
+                self.header_lines[key] = line
+        return line
+
+    def connection_opened(self):
+        self.metrics.inc('http_connections_total')
+        self.metrics.inc('http_connections_active')
+
+    def connection_closed(self, parser):
+        self.metrics.inc('http_connections_active', -1)
+        self.metrics.inc('http_received_bytes_total', parser.bytes_received)
+
+    def overload_response(self):
+        hasil = self.response(503, 'Service Unavailable', 'Server is overloaded, please retry later.',
+                              {'Retry-After': str(self.retry_after)})
+        self.metrics.inc('http_connections_rejected_total')
+        return hasil
+
+    def reject(self, connection):
+        """Tolak koneksi baru saat overload dengan 503, tanpa memblok accept loop."""
+        if self.ssl_context is not None:
+            #503 baru bisa dikirim setelah handshake, dan handshake di accept
+            #loop justru yang dihindari; koneksi langsung ditutup
+            self.metrics.inc('http_connections_rejected_total')
+            connection.close()
+            return
+        try:
+            connection.setblocking(False)
+            try:
+                #request yang sudah tiba dibuang agar close() tidak mengirim RST
+                #yang bisa membuat client kehilangan response 503
+                connection.recv(self.recv_size)
+            except BlockingIOError:
+                pass
+            connection.send(bytes(self.overload_response()))
+            connection.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass
+        finally:
+            connection.close()
 
     def response(self, kode=404, message='Not Found', messagebody=bytes(), headers={}):
-        tanggal = datetime.now().strftime('%c')
-        resp = []
-        resp.append(f"HTTP/1.0 {kode} {message}\r\n")
-        resp.append(f"Date: {tanggal}\r\n")
-        resp.append("Connection: close\r\n")
-        resp.append("Server: myserver/1.0\r\n")
-        resp.append(f"Content-Length: {len(messagebody)}\r\n")
-        for kk in headers:
-            resp.append(f"{kk}:{headers[kk]}\r\n")
-        resp.append("\r\n")
-
-        response_headers = ''.join(resp)
-        
         if not isinstance(messagebody, bytes):
             messagebody = messagebody.encode()
+        return HttpResponse(self, kode, message, headers, body=messagebody)
+
+    def file_response(self, filepath, headers={}):
+        """Response 200 yang body-nya langsung dialirkan dari file, tanpa fp.read()."""
+        fp = open(filepath, 'rb')
+        try:
+            size = os.fstat(fp.fileno()).st_size
+        except OSError:
+            fp.close()
+            raise
+        return HttpResponse(self, 200, 'OK', headers, fileobj=fp, parts=[(0, size)])
+
+    def content_type(self, filepath):
+        fext = os.path.splitext(filepath)[1]
+        return self.types.get(fext, 'application/octet-stream')
+
+    def serve_file(self, filepath, headers={}):
+        """Response untuk file statis, None jika file tidak ada.
+
+        Stat dan header file diambil dari self.cache; file kecil dilayani
+        langsung dari memori, file besar dialirkan lewat file_response().
+        Request bersyarat yang validator-nya cocok dijawab 304 tanpa body,
+        header Range dijawab 206 dengan potongan file yang diminta, dan file
+        teks yang ada di cache dikirim terkompres sesuai Accept-Encoding.
+        """
+        filepath = os.path.normpath(filepath)
+        entry = self.cache.get(filepath)
+        if entry is None:
+            entry = self.load_file(filepath)
+            if entry is None:
+                return None
+
+        #None: tidak ada Range, atau Range diabaikan (tidak valid, If-Range
+        #tidak cocok) sehingga dijawab seperti request biasa
+        ranges = None
+        range_header = headers.get('range')
+        if range_header is not None and self.if_range_matches(entry, headers):
+            ranges = self.parse_range(range_header, entry.size)
+        coding = None
+        validators = entry.validators
+        if self.is_compressible(entry.headers['Content-type']):
+            validators = {**validators, 'Vary': 'Accept-Encoding'}
+            #range selalu dihitung terhadap representasi asli (identity)
+            if entry.body is not None and ranges is None and entry.size >= self.compress_min_size:
+                coding = self.accepted_encoding(headers)
+            if coding is not None:
+                validators['ETag'] = validators['ETag'][:-1] + '-' + coding + '"'
+
+        if self.not_modified(entry, headers, validators['ETag']):
+            return self.response(304, 'Not Modified', b'', validators)
+
+        if coding is not None:
+            data = entry.variants.get(coding)
+            if data is None:
+                data = self.compress(entry.body, coding)
+                self.cache.add_variant(filepath, entry, coding, data)
+            return self.response(200, 'OK', data, {**entry.headers, **validators, 'Content-Encoding': coding})
+
+        if ranges == []:
+            return self.response(416, 'Range Not Satisfiable', b'',
+                                 {'Content-Range': f"bytes */{entry.size}", **validators})
+        if ranges:
+            return self.range_response(filepath, entry, ranges, headers)
+
+        if entry.body is not None:
+            return self.response(200, 'OK', entry.body, {**entry.headers, **validators})
+        return self.file_response(filepath, {**entry.headers, **validators})
+
+    def is_compressible(self, content_type):
+        content_type = content_type.split(';', 1)[0].strip()
+        return content_type.startswith('text/') or content_type in self.compressible_types
+
+    def accepted_encoding(self, headers):
+        """Pilih gzip atau deflate dari Accept-Encoding (dengan q-value), None jika tidak ada."""
+        accept = headers.get('accept-encoding')
+        if not accept:
+            return None
+        qvalues = {}
+        for item in accept.split(','):
+            name, _, params = item.partition(';')
+            q = 1.0
+            params = params.strip()
+            if params.startswith('q='):
+                try:
+                    q = float(params[2:])
+                except ValueError:
+                    q = 0.0
+            qvalues[name.strip().lower()] = q
+        star = qvalues.get('*', 0.0)
+        best = None
+        for coding in ('gzip', 'deflate'):
+            q = qvalues.get(coding, star)
+            if q > 0 and (best is None or q > best[1]):
+                best = (coding, q)
+        return best[0] if best else None
+
+    def compress(self, data, coding):
+        if coding == 'gzip':
+            return gzip.compress(data, compresslevel=self.compress_level, mtime=0)
+        return zlib.compress(data, self.compress_level)
+
+    def compress_stream(self, stream, coding):
+        """Kompres body stream per potongan; wbits 31 menghasilkan format gzip."""
+        compressor = zlib.compressobj(self.compress_level, zlib.DEFLATED, 31 if coding == 'gzip' else 15)
+        for chunk in stream:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
 
-        response = response_headers.encode() + messagebody
-        return response
+    def compress_response(self, hasil, headers):
+        """Kompres body dinamis (mis. /list_files) bila client menerimanya.
 
-    def proses(self, data_bytes):
-        
-        header_end = data_bytes.find(b"\r\n\r\n")
-        if header_end == -1:
-            return self.response(400, 'Bad Request', 'Malformed request: no end of headers', {})
+        Response file statis (ber-ETag) sudah dikompres serve_file dengan
+        ETag per coding, jadi dilewati.
+        """
+        content_type = hasil.headers.get('Content-type')
+        if (hasil.kode != 200 or hasil.fileobj is not None or content_type is None or 'ETag' in hasil.headers
+                or 'Content-Encoding' in hasil.headers or not self.is_compressible(content_type)):
+            return hasil
+        vary = hasil.headers.get('Vary')
+        if vary is None:
+            hasil.headers['Vary'] = 'Accept-Encoding'
+        elif 'accept-encoding' not in (name.strip().lower() for name in vary.split(',')):
+            hasil.headers['Vary'] = vary + ', Accept-Encoding'
+        if hasil.stream is None and hasil.length < self.compress_min_size:
+            return hasil
+        coding = self.accepted_encoding(headers)
+        if coding is None:
+            return hasil
+        hasil.headers['Content-Encoding'] = coding
+        if hasil.stream is not None:
+            hasil.stream = self.compress_stream(hasil.stream, coding)
+            return hasil
+        hasil.body = self.compress(bytes(hasil.body), coding)
+        hasil.parts = [hasil.body]
+        hasil.length = len(hasil.body)
+        return hasil
+
+    def load_file(self, filepath):
+        try:
+            st = os.stat(filepath)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        if not stat.S_ISREG(st.st_mode):
+            return None
+
+        content_type = self.content_type(filepath)
+        if st.st_size > min(self.cache.max_file_size, self.cache.max_bytes):
+            entry = CacheEntry(None, content_type, st)
+        else:
+            with open(filepath, 'rb') as fp:
+                st = os.fstat(fp.fileno())
+                entry = CacheEntry(fp.read(), content_type, st)
+        self.cache.put(filepath, entry)
+        return entry
+
+    def parse_range(self, value, size):
+        """Daftar (start, end) inklusif dari header Range untuk file sebesar size.
+
+        Mengembalikan [] jika tidak ada range yang bisa dipenuhi (416), atau
+        None jika header tidak valid sehingga harus diabaikan (200 penuh).
+        Range yang tumpang tindih atau bersebelahan digabung.
+        """
+        units, _, spec = value.partition('=')
+        if units.strip().lower() != 'bytes':
+            return None
+        ranges = []
+        for item in spec.split(','):
+            item = item.strip()
+            if not item:
+                continue
+            first, sep, last = item.partition('-')
+            if not sep:
+                return None
+            try:
+                if first.strip() == '':
+                    suffix = int(last)
+                    if suffix <= 0:
+                        continue
+                    start, end = max(size - suffix, 0), size - 1
+                else:
+                    start = int(first)
+                    end = int(last) if last.strip() else None
+                    if end is not None and start > end:
+                        return None
+                    if start >= size:
+                        continue
+                    if end is None:
+                        end = size - 1
+                    end = min(end, size - 1)
+            except ValueError:
+                return None
+            ranges.append((start, end))
+        if len(ranges) > self.max_ranges:
+            return None
+
+        ranges.sort()
+        merged = []
+        for start, end in ranges:
+            if merged and start <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        return merged
+
+    def if_range_matches(self, entry, headers):
+        """If-Range: Range hanya dipakai jika validator sama persis (perbandingan kuat)."""
+        if_range = headers.get('if-range')
+        if if_range is None:
+            return True
+        if if_range.startswith('"'):
+            return if_range == entry.validators['ETag']
+        return if_range == entry.validators['Last-Modified']
+
+    def range_response(self, filepath, entry, ranges, headers):
+        """206 Partial Content; satu range langsung, beberapa range sebagai multipart/byteranges."""
+        content_type = entry.headers['Content-type']
+        #representasi terkompres juga ada untuk resource ini; cache tidak
+        #boleh mencampur potongan identity dengan varian lain
+        vary = {'Vary': 'Accept-Encoding'} if self.is_compressible(content_type) else {}
+        if entry.body is not None:
+            fp = None
+            source = memoryview(entry.body)
+            slices = [source[start:end + 1] for start, end in ranges]
+        else:
+            fp = open(filepath, 'rb')
+            if os.fstat(fp.fileno()).st_size != entry.size:
+                #file berubah setelah di-stat; ulangi dengan stat yang baru
+                fp.close()
+                self.cache.invalidate(filepath)
+                return self.serve_file(filepath, headers)
+            slices = [(start, end - start + 1) for start, end in ranges]
+
+        if len(ranges) == 1:
+            start, end = ranges[0]
+            hdrs = {**entry.headers, **vary}
+            hdrs['Content-Range'] = f"bytes {start}-{end}/{entry.size}"
+            return HttpResponse(self, 206, 'Partial Content', hdrs, fileobj=fp, parts=slices)
+
+        boundary = uuid.uuid4().hex
+        parts = []
+        for (start, end), data in zip(ranges, slices):
+            parts.append(f"\r\n--{boundary}\r\nContent-Type: {content_type}\r\n"
+                         f"Content-Range: bytes {start}-{end}/{entry.size}\r\n\r\n".encode())
+            parts.append(data)
+        parts.append(f"\r\n--{boundary}--\r\n".encode())
+        hdrs = {**entry.headers, **vary}
+        hdrs['Content-type'] = f"multipart/byteranges; boundary={boundary}"
+        return HttpResponse(self, 206, 'Partial Content', hdrs, fileobj=fp, parts=parts)
+
+    def not_modified(self, entry, headers, etag):
+        """Cek If-None-Match (prioritas) lalu If-Modified-Since terhadap entry."""
+        if_none_match = headers.get('if-none-match')
+        if if_none_match is not None:
+            tags = [t.strip() for t in if_none_match.split(',')]
+            return '*' in tags or etag in tags or 'W/' + etag in tags
+
+        if_modified_since = headers.get('if-modified-since')
+        if if_modified_since is not None:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return entry.mtime_ns // 1_000_000_000 <= since
+        return False
 
-        headers_part_bytes = data_bytes[:header_end]
-        raw_body = data_bytes[header_end + 4:]
+    def handle_connection(self, connection, address=None):
+        """Layani satu koneksi blocking (TCP atau TLS) sampai selesai.
 
+        Dipakai oleh semua front-end berbasis thread/proses: satu koneksi
+        membawa banyak request (keep-alive dan pipelining), body dibaca
+        langsung dari socket oleh handler, dan koneksi idle ditutup setelah
+        keepalive_timeout. Dalam mode TLS, socket mentah hasil accept() di-
+        handshake di sini, di thread/proses worker.
+        """
+        if self.ssl_context is not None and not isinstance(connection, ssl.SSLSocket):
+            connection = self.secure(connection, address)
+            if connection is None:
+                return
+        parser = HttpParser(self.max_header_size)
+        buf = bytearray(self.recv_size)
+        view = memoryview(buf)
+        served = 0
+        self.connection_opened()
         try:
-            headers_part_str = headers_part_bytes.decode('utf-8', errors='ignore')
-        except UnicodeDecodeError:
-            return self.response(400, 'Bad Request', 'Malformed request: unreadable headers', {})
-        
-        request_lines = headers_part_str.split("\r\n")
-        
-        if not request_lines:
-            return self.response(400, 'Bad Request', 'Empty request line', {})
-
-        baris = request_lines[0]
-        all_headers_raw = [n for n in request_lines[1:] if n] # All header lines as strings
-        
-        headers = {}
-        for line in all_headers_raw:
-            if ":" in line:
-                key, value = line.split(':', 1)
-                headers[key.strip().lower()] = value.strip()
-                
-        j = baris.split(" ")
+            connection.settimeout(self.keepalive_timeout)
+            #response dikirim utuh per syscall (atau di-cork), jadi Nagle hanya
+            #menahan ekor response sampai ACK tertunda client
+            connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            while True:
+                try:
+                    request = parser.next_request()
+                except HttpParseError as e:
+                    hasil = self.response(e.kode, e.message, e.detail, {})
+                    hasil.client = address
+                    hasil.send(connection)
+                    break
+                if request is None:
+                    n = connection.recv_into(buf)
+                    if not n:
+                        break
+                    parser.feed(view[:n])
+                    continue
+
+                served += 1
+                keep_alive = request.keep_alive and served < self.keepalive_max_requests
+                body = BodyReader(parser, connection)
+                hasil = self.proses(request, body, keep_alive, address)
+                hasil.send(connection)
+                if not hasil.keep_alive:
+                    break
+                body.drain()
+        except socket.timeout:
+            #koneksi idle melebihi keepalive_timeout
+            pass
+        except HttpParseError:
+            #body chunked rusak; stream request tidak bisa disinkronkan lagi
+            pass
+        except OSError as e:
+            logging.error(f"Socket error from {address}: {e}")
+        finally:
+            connection.close()
+            self.connection_closed(parser)
+
+    def secure(self, connection, address=None):
+        """Handshake TLS untuk koneksi hasil accept(); None (dan koneksi ditutup) bila gagal."""
         try:
-            method = j[0].upper().strip()
-            object_address = urllib.parse.unquote(j[1].strip())
+            secure = tls.handshake(self.ssl_context, connection, self.tls_handshake_timeout)
+        except OSError as e:
+            self.metrics.inc('http_tls_handshake_failures_total')
+            logging.info(f"TLS handshake with {address} failed: {e}")
+            connection.close()
+            return None
+        self.tls_handshake_done(secure)
+        return secure
+
+    def tls_handshake_done(self, ssl_object):
+        self.metrics.inc('http_tls_handshakes_total', resumed=str(ssl_object.session_reused).lower())
+
+    def proses(self, request, body=None, keep_alive=False, address=None):
+        """Proses satu HttpRequest yang sudah diparse; body adalah BodyReader.
 
+        address (alamat client) hanya dipakai untuk access log.
+
+        Untuk pengujian, request boleh berupa bytes request mentah lengkap.
+        """
+        if isinstance(request, (bytes, bytearray)):
+            parser = HttpParser(self.max_header_size)
+            parser.feed(request)
+            try:
+                request = parser.next_request()
+            except HttpParseError as e:
+                return self.response(e.kode, e.message, e.detail, {})
+            if request is None:
+                return self.response(400, 'Bad Request', 'Malformed request: no end of headers', {})
+            body = BodyReader(parser)
+        started = time.perf_counter()
+        self.metrics.inc('http_requests_in_flight')
+        hasil = self.dispatch(request, body)
+        hasil.method = request.method
+        hasil.route = self.route_of(request.path)
+        hasil.path = request.target
+        hasil.client = address
+        if self.access_log.debug:
+            hasil.request_headers = request.headers
+        hasil.started = started
+        if hasil.keep_alive is None:
+            hasil.keep_alive = keep_alive
+        if hasil.stream is not None and request.version != 'HTTP/1.1':
+            #HTTP/1.0 tidak mengenal chunked; akhir body ditandai penutupan koneksi
+            hasil.chunked = False
+            hasil.keep_alive = False
+        return hasil
+
+    def dispatch(self, request, body):
+        method = request.method
+        object_address = request.path
+        headers = request.headers
+        try:
             if method == 'GET':
-                return self.http_get(object_address, headers)
+                return self.compress_response(self.http_get(object_address, headers, request.query), headers)
             elif method == 'POST':
-                return self.http_post(object_address, headers, raw_body)
+                return self.http_post(object_address, headers, body)
             elif method == 'DELETE':
                 return self.http_delete(object_address, headers)
             else:
                 return self.response(405, 'Method Not Allowed', '', {})
-        except IndexError:
-            return self.response(400, 'Bad Request', 'Malformed request line', {})
         except Exception as e:
             traceback.print_exc()
             return self.response(500, 'Internal Server Error', f"Server error: {e}", {})
 
-    def http_get(self, object_address, headers):
+    def http_get(self, object_address, headers, query=''):
         if object_address == '/':
             return self.response(200, 'OK', 'Welcome to the HTTP Server! Try /list_files, /upload_file, /delete_file, /download/<filename>', {})
 
         if object_address == '/list_files':
-            return self.list_files()
-        
+            return self.list_files(query, headers)
+
+        if object_address == '/metrics':
+            return self.response(200, 'OK', self.metrics.render(), {'Content-type': 'text/plain; version=0.0.4'})
+
         if object_address.startswith('/download/'):
             filename = object_address.replace('/download/', '', 1)
-            return self.download_file(filename)
+            return self.download_file(filename, headers)
 
         filepath = os.path.join(self.base_dir, object_address.lstrip('/'))
-        if os.path.exists(filepath) and os.path.isfile(filepath):
-            try:
-                with open(filepath, 'rb') as fp: # Read in binary mode
-                    isi = fp.read()
-                
-                fext = os.path.splitext(filepath)[1]
-                content_type = self.types.get(fext, 'application/octet-stream')
-                
-                headers = {'Content-type': content_type}
-                return self.response(200, 'OK', isi, headers)
-            except Exception as e:
-                return self.response(500, 'Internal Server Error', f"Error reading file: {e}", {})
-        else:
+        try:
+            hasil = self.serve_file(filepath, headers)
+        except Exception as e:
+            return self.response(500, 'Internal Server Error', f"Error reading file: {e}", {})
+        if hasil is None:
             return self.response(404, 'Not Found', '', {})
+        return hasil
 
-    def http_post(self, object_address, headers, body): # 'body' is now bytes
+    def http_post(self, object_address, headers, body): # 'body' adalah BodyReader
         if object_address == '/upload_file':
             filename = headers.get('x-filename')
             if not filename:
                 return self.response(400, 'Bad Request', "Missing X-Filename header for upload.", {})
 
             filepath = os.path.join(self.base_dir, filename)
+            #body ditulis bertahap ke file sementara di upload_dir, lalu
+            #di-rename secara atomik, sehingga memori per upload hanya satu chunk
+            #dan client lain tidak pernah melihat file yang setengah jadi
+            fd, tmppath = tempfile.mkstemp(dir=self.upload_dir, prefix='.upload-')
             try:
-                with open(filepath, 'wb') as f:
-                    f.write(body) # Write the raw bytes directly
+                buf = bytearray(self.upload_chunk_size)
+                view = memoryview(buf)
+                with os.fdopen(fd, 'wb') as f:
+                    while True:
+                        n = body.readinto(buf)
+                        if not n:
+                            break
+                        f.write(view[:n])
+                self.index.replace(tmppath, filename)
+                self.cache.invalidate(os.path.normpath(filepath))
                 return self.response(200, 'OK', f"File '{filename}' uploaded successfully.", {})
+            except HttpParseError as e:
+                #body chunked rusak di tengah upload
+                if os.path.exists(tmppath):
+                    os.remove(tmppath)
+                hasil = self.response(e.kode, e.message, e.detail, {})
+                hasil.keep_alive = False
+                return hasil
             except Exception as e:
+                if os.path.exists(tmppath):
+                    os.remove(tmppath)
                 return self.response(500, 'Internal Server Error', f"Error uploading file: {e}", {})
         else:
             return self.response(404, 'Not Found', '', {})
@@ -135,7 +1126,8 @@ class HttpServer:
 
             if os.path.exists(filepath) and os.path.isfile(filepath):
                 try:
-                    os.remove(filepath)
+                    self.index.remove(filename)
+                    self.cache.invalidate(os.path.normpath(filepath))
                     return self.response(200, 'OK', f"File '{filename}' deleted successfully.", {})
                 except Exception as e:
                     return self.response(500, 'Internal Server Error', f"Error deleting file: {e}", {})
@@ -144,34 +1136,124 @@ class HttpServer:
         else:
             return self.response(404, 'Not Found', '', {})
 
-    def list_files(self):
+    def list_files(self, query='', headers={}):
+        """Satu halaman daftar file dari self.index, sebagai HTML atau JSON.
+
+        Parameter query: sort (name, size, mtime), order (asc, desc), offset,
+        limit, cursor (dari next_cursor halaman sebelumnya) dan format (html,
+        json); tanpa format, JSON dipilih bila Accept memintanya.
+        """
+        params = urllib.parse.parse_qs(query)
+        def param(name, default=None):
+            values = params.get(name)
+            return values[-1] if values else default
+
+        sort = param('sort', 'name')
+        order = param('order', 'asc')
+        if sort not in DirectoryIndex.SORT_KEYS or order not in ('asc', 'desc'):
+            return self.response(400, 'Bad Request', "sort must be name, size or mtime and order asc or desc", {})
         try:
-            files = os.listdir(self.base_dir)
-            file_list_html = "<h1>Files on Server:</h1><ul>"
-            for f in files:
-                file_list_html += f"<li><a href='/download/{urllib.parse.quote(f)}'>{f}</a></li>"
-            file_list_html += "</ul>"
-            return self.response(200, 'OK', file_list_html, {'Content-type': 'text/html'})
-        except Exception as e:
+            offset = int(param('offset', 0))
+            limit = int(param('limit', self.list_default_limit))
+        except ValueError:
+            return self.response(400, 'Bad Request', "offset and limit must be integers", {})
+        if offset < 0 or limit < 1:
+            return self.response(400, 'Bad Request', "offset must be >= 0 and limit >= 1", {})
+        limit = min(limit, self.list_max_limit)
+        cursor = param('cursor')
+        if cursor is not None:
+            cursor = self.decode_cursor(cursor, sort)
+            if cursor is None:
+                return self.response(400, 'Bad Request', "Invalid cursor", {})
+
+        fmt = param('format')
+        vary = {}
+        if fmt is None:
+            fmt = 'json' if 'application/json' in headers.get('accept', '') else 'html'
+            vary = {'Vary': 'Accept'}
+        if fmt not in ('html', 'json'):
+            return self.response(400, 'Bad Request', "format must be html or json", {})
+
+        try:
+            entries, total, next_key = self.index.page(sort, order == 'desc', offset, limit, cursor)
+        except OSError as e:
             return self.response(500, 'Internal Server Error', f"Error listing files: {e}", {})
+        next_cursor = None if next_key is None else self.encode_cursor(next_key)
+
+        if fmt == 'json':
+            body = json.dumps({
+                'total': total, 'sort': sort, 'order': order, 'offset': offset, 'limit': limit,
+                'next_cursor': next_cursor,
+                'files': [{'name': name, 'size': size, 'mtime': mtime_ns / 1e9} for name, size, mtime_ns in entries],
+            })
+            return self.response(200, 'OK', body, {'Content-type': 'application/json', **vary})
+
+        next_url = None
+        if next_cursor is not None:
+            next_url = '/list_files?' + urllib.parse.urlencode(
+                {'sort': sort, 'order': order, 'limit': limit, 'cursor': next_cursor, 'format': 'html'})
+        #HTML dibangkitkan per kelompok entry dan dikirim chunked, sehingga
+        #byte pertama keluar tanpa menunggu seluruh halaman selesai dibuat
+        return HttpResponse(self, 200, 'OK', {'Content-type': 'text/html', **vary},
+                            stream=self.list_files_html(entries, next_url))
+
+    def list_files_html(self, entries, next_url=None, batch=256):
+        yield b"<h1>Files on Server:</h1><ul>"
+        for i in range(0, len(entries), batch):
+            yield ''.join(f"<li><a href='/download/{urllib.parse.quote(name)}'>{html.escape(name)}</a></li>"
+                          for name, _, _ in entries[i:i + batch]).encode()
+        yield b"</ul>"
+        if next_url is not None:
+            yield f"<a href='{html.escape(next_url)}'>Next</a>".encode()
+
+    def encode_cursor(self, key):
+        return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
 
-    def download_file(self, filename):
+    def decode_cursor(self, cursor, sort):
+        """Kunci sort dari cursor, atau None bila cursor tidak valid untuk sort ini."""
+        try:
+            key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except ValueError:
+            return None
+        if not isinstance(key, list) or not key or not isinstance(key[-1], str):
+            return None
+        if sort == 'name':
+            return tuple(key) if len(key) == 1 else None
+        if len(key) != 2 or type(key[0]) is not int:
+            return None
+        return tuple(key)
+
+    def download_file(self, filename, headers={}):
         filepath = os.path.join(self.base_dir, filename)
-        if os.path.exists(filepath) and os.path.isfile(filepath):
-            try:
-                with open(filepath, 'rb') as f:
-                    content = f.read()
-                fext = os.path.splitext(filepath)[1]
-                content_type = self.types.get(fext, 'application/octet-stream')
-                return self.response(200, 'OK', content, {'Content-type': content_type})
-            except Exception as e:
-                return self.response(500, 'Internal Server Error', f"Error reading file for download: {e}", {})
-        else:
+        try:
+            hasil = self.serve_file(filepath, headers)
+        except Exception as e:
+            return self.response(500, 'Internal Server Error', f"Error reading file for download: {e}", {})
+        if hasil is None:
             return self.response(404, 'Not Found', f"File '{filename}' not found.", {})
+        return hasil
 
 if __name__ == "__main__":
     httpserver = HttpServer()
     d = httpserver.proses(b'GET testing.txt HTTP/1.0\r\nHost: localhost\r\n\r\n')
-    print(d)
+    print(bytes(d))
     d = httpserver.proses(b'GET donalbebek.jpg HTTP/1.0\r\nHost: localhost\r\n\r\n')
-    print(d)
\ No newline at end of file
+    print(bytes(d))
+
+    #Range yang diabaikan (tidak valid) dijawab 200 penuh: tetap varian gzip
+    #yang di-cache dengan ETag-nya sendiri, bukan ETag identity
+    with tempfile.TemporaryDirectory() as docroot:
+        with open(os.path.join(docroot, 'teks.txt'), 'w') as f:
+            f.write('ini testing file\n' * 100)
+        httpserver = HttpServer(ServerConfig(base_dir=docroot, access_log='off'))
+        plain = httpserver.proses(b'GET /teks.txt HTTP/1.1\r\nHost: localhost\r\n\r\n')
+        for value in (b'bytes=5-2', b'items=0-9'):
+            d = httpserver.proses(b'GET /teks.txt HTTP/1.1\r\nHost: localhost\r\nAccept-Encoding: gzip\r\n'
+                                  b'Range: ' + value + b'\r\n\r\n')
+            assert d.kode == 200 and d.headers['Content-Encoding'] == 'gzip', d.headers
+            assert d.headers['ETag'] == plain.headers['ETag'][:-1] + '-gzip"', d.headers
+            assert gzip.decompress(bytes(d).split(b'\r\n\r\n', 1)[1]) == b'ini testing file\n' * 100
+        d = httpserver.proses(b'GET /teks.txt HTTP/1.1\r\nHost: localhost\r\nAccept-Encoding: gzip\r\n'
+                              b'Range: bytes=0-2\r\n\r\n')
+        assert d.kode == 206 and 'Content-Encoding' not in d.headers and d.headers['ETag'] == plain.headers['ETag']
+        print('range + gzip ok')
@@ -0,0 +1,299 @@
+import urllib.parse
+
+
+class HttpParseError(Exception):
+    """Request tidak bisa diparse; kode dan message dipakai untuk response error."""
+    def __init__(self, kode, message, detail=''):
+        Exception.__init__(self, detail or message)
+        self.kode = kode
+        self.message = message
+        self.detail = detail or message
+
+
+class HttpRequest:
+    """Request yang header-nya sudah diparse; nama header dalam huruf kecil.
+
+    Untuk body chunked, content_length bernilai None dan trailers diisi
+    parser setelah chunk terakhir diterima.
+    """
+    __slots__ = ('method', 'target', 'path', 'query', 'version', 'headers',
+                 'content_length', 'chunked', 'trailers', 'keep_alive')
+
+    def __init__(self, method, target, version, headers, content_length, chunked=False):
+        self.method = method
+        self.target = target
+        path, _, self.query = target.partition('?')
+        self.path = urllib.parse.unquote(path)
+        self.version = version
+        self.headers = headers
+        self.content_length = content_length
+        self.chunked = chunked
+        self.trailers = {}
+        connection = headers.get('connection', '').lower()
+        if version == 'HTTP/1.1':
+            self.keep_alive = 'close' not in connection
+        else:
+            self.keep_alive = 'keep-alive' in connection
+
+
+class HttpParser:
+    """Parser request HTTP/1.x incremental berbasis push.
+
+    Front-end memanggil feed() dengan byte apa pun yang diterimanya, lalu
+    next_request() untuk mengambil request berikutnya (None jika header
+    belum lengkap). Header setiap request dicari dan diparse tepat sekali;
+    body request yang baru diparse diambil lewat read_body() sebelum
+    next_request() berikutnya, sehingga request pipelined tetap berurutan.
+    Body Transfer-Encoding: chunked didekode di read_body(), termasuk
+    trailer-nya. Data disimpan dalam satu bytearray dengan offset baca, tanpa
+    penyambungan bytes berulang.
+    """
+    COMPACT_THRESHOLD = 64 * 1024
+
+    def __init__(self, max_header_size=16 * 1024, max_headers=100):
+        self.max_header_size = max_header_size
+        self.max_headers = max_headers
+        self.buffer = bytearray()
+        self.pos = 0
+        self.scan = 0
+        self.request = None
+        #total byte dari socket, termasuk yang dibaca langsung lewat body_received()
+        self.bytes_received = 0
+        #identity: sisa byte body; chunked: sisa byte chunk yang sedang dibaca
+        self.body_remaining = 0
+        #None, atau state decoder chunked: 'size', 'data', 'data_crlf', 'trailer'
+        self.chunk_state = None
+
+    @property
+    def body_done(self):
+        return self.body_remaining == 0 and self.chunk_state is None
+
+    def feed(self, data):
+        if self.pos == len(self.buffer):
+            del self.buffer[:]
+            self.pos = self.scan = 0
+        self.buffer += data
+        self.bytes_received += len(data)
+
+    def buffered(self):
+        """Jumlah byte yang sudah diterima tapi belum dikonsumsi."""
+        return len(self.buffer) - self.pos
+
+    def buffered_body(self):
+        """Jumlah byte body identity request saat ini yang sudah ada di buffer."""
+        return min(self.body_remaining, self.buffered())
+
+    def next_request(self):
+        if not self.body_done:
+            raise RuntimeError("body of the previous request has not been consumed")
+
+        #CRLF kosong di antara request pipelined diabaikan (RFC 7230 3.5)
+        while self.buffer.startswith(b"\r\n", self.pos):
+            self.pos += 2
+        self.scan = max(self.scan, self.pos)
+
+        end = self.buffer.find(b"\r\n\r\n", self.scan)
+        if end == -1:
+            if self.buffered() > self.max_header_size:
+                raise HttpParseError(431, 'Request Header Fields Too Large')
+            self.scan = max(len(self.buffer) - 3, self.pos)
+            return None
+        if end - self.pos > self.max_header_size:
+            raise HttpParseError(431, 'Request Header Fields Too Large')
+
+        with memoryview(self.buffer) as view:
+            head = str(view[self.pos:end], 'latin-1')
+        self.pos = end + 4
+        self.scan = self.pos
+        request = self.parse_head(head)
+        self.request = request
+        if request.chunked:
+            self.chunk_state = 'size'
+        else:
+            self.body_remaining = request.content_length
+        self.compact()
+        return request
+
+    def parse_head(self, head):
+        lines = head.split('\r\n')
+        if len(lines) - 1 > self.max_headers:
+            raise HttpParseError(431, 'Request Header Fields Too Large', 'Too many header fields')
+
+        request_line = lines[0].split(' ')
+        if len(request_line) != 3 or not request_line[2].startswith('HTTP/'):
+            raise HttpParseError(400, 'Bad Request', 'Malformed request line')
+        method, target, version = request_line
+        if not method or not target:
+            raise HttpParseError(400, 'Bad Request', 'Malformed request line')
+
+        headers = {}
+        for line in lines[1:]:
+            name, sep, value = line.partition(':')
+            name = name.strip().lower()
+            if not sep or not name:
+                raise HttpParseError(400, 'Bad Request', 'Malformed header line')
+            value = value.strip()
+            if name in headers:
+                if name == 'content-length':
+                    if headers[name] != value:
+                        raise HttpParseError(400, 'Bad Request', 'Conflicting Content-Length headers')
+                    continue
+                value = headers[name] + ', ' + value
+            headers[name] = value
+
+        transfer_encoding = headers.get('transfer-encoding')
+        if transfer_encoding is not None:
+            if 'content-length' in headers:
+                #kombinasi ini adalah pola request smuggling, tolak saja
+                raise HttpParseError(400, 'Bad Request', 'Both Transfer-Encoding and Content-Length given')
+            if transfer_encoding.lower() != 'chunked':
+                raise HttpParseError(501, 'Not Implemented', f"Transfer-Encoding '{transfer_encoding}' is not supported")
+            return HttpRequest(method.upper(), target, version.upper(), headers, None, chunked=True)
+        content_length = headers.get('content-length', '0')
+        if not content_length.isdigit():
+            raise HttpParseError(400, 'Bad Request', 'Invalid Content-Length')
+        return HttpRequest(method.upper(), target, version.upper(), headers, int(content_length))
+
+    def read_body(self, buf):
+        """Salin body (sudah didekode) yang ada di buffer ke buf.
+
+        Mengembalikan 0 jika body selesai atau data di buffer belum cukup;
+        bedakan keduanya dengan body_done.
+        """
+        if self.chunk_state is not None:
+            return self.read_chunked(buf)
+        n = min(len(buf), self.buffered_body())
+        if n:
+            with memoryview(self.buffer) as view:
+                buf[:n] = view[self.pos:self.pos + n]
+            self.pos += n
+            self.body_remaining -= n
+            self.compact()
+        return n
+
+    def read_chunked(self, buf):
+        total = 0
+        while total < len(buf) and self.chunk_state is not None:
+            if self.chunk_state == 'data':
+                n = min(len(buf) - total, self.body_remaining, self.buffered())
+                if not n:
+                    break
+                with memoryview(self.buffer) as view:
+                    buf[total:total + n] = view[self.pos:self.pos + n]
+                self.pos += n
+                total += n
+                self.body_remaining -= n
+                if not self.body_remaining:
+                    self.chunk_state = 'data_crlf'
+                continue
+
+            if self.chunk_state == 'data_crlf':
+                if self.buffered() < 2:
+                    break
+                if not self.buffer.startswith(b"\r\n", self.pos):
+                    raise HttpParseError(400, 'Bad Request', 'Missing CRLF after chunk data')
+                self.pos += 2
+                self.chunk_state = 'size'
+                continue
+
+            eol = self.buffer.find(b"\r\n", self.pos)
+            if eol == -1:
+                if self.buffered() > self.max_header_size:
+                    raise HttpParseError(400, 'Bad Request', 'Chunk header or trailer too long')
+                break
+            with memoryview(self.buffer) as view:
+                line = str(view[self.pos:eol], 'latin-1')
+            self.pos = eol + 2
+
+            if self.chunk_state == 'size':
+                #ekstensi chunk (setelah ';') diabaikan
+                size = line.partition(';')[0].strip()
+                try:
+                    size = int(size, 16)
+                except ValueError:
+                    raise HttpParseError(400, 'Bad Request', 'Malformed chunk size')
+                if size < 0:
+                    raise HttpParseError(400, 'Bad Request', 'Malformed chunk size')
+                if size:
+                    self.body_remaining = size
+                    self.chunk_state = 'data'
+                else:
+                    self.chunk_state = 'trailer'
+            elif line:
+                name, sep, value = line.partition(':')
+                if not sep:
+                    raise HttpParseError(400, 'Bad Request', 'Malformed trailer line')
+                self.request.trailers[name.strip().lower()] = value.strip()
+            else:
+                self.chunk_state = None
+        self.compact()
+        return total
+
+    def body_received(self, n):
+        """Catat n byte body yang dibaca front-end langsung dari socket, melewati buffer."""
+        self.body_remaining -= n
+        self.bytes_received += n
+
+    def compact(self):
+        if self.pos >= self.COMPACT_THRESHOLD and self.pos * 2 >= len(self.buffer):
+            del self.buffer[:self.pos]
+            self.scan -= self.pos
+            self.pos = 0
+
+
+class BodyReader:
+    """Body request yang sedang diparse, dibaca bertahap oleh handler.
+
+    Byte body yang sudah ada di buffer parser dipakai lebih dulu. Sisa body
+    identity diambil dengan recv_into langsung ke buffer milik pemanggil,
+    dibatasi Content-Length; body chunked diterima lewat parser agar bisa
+    didekode. Tanpa sock (front-end non-blocking), seluruh body harus sudah
+    ada di buffer parser. readinto() mengembalikan 0 di akhir body.
+    """
+    def __init__(self, parser, sock=None):
+        self.parser = parser
+        self.sock = sock
+
+    @property
+    def done(self):
+        return self.parser.body_done
+
+    def readinto(self, buf):
+        parser = self.parser
+        while not parser.body_done:
+            n = parser.read_body(buf)
+            if n:
+                return n
+            if parser.body_done:
+                break
+            if self.sock is None:
+                raise ConnectionError("request body incomplete")
+            if parser.chunk_state is None:
+                n = self.sock.recv_into(buf, min(len(buf), parser.body_remaining))
+                if n == 0:
+                    raise ConnectionError(f"client closed connection with {parser.body_remaining} body bytes outstanding")
+                parser.body_received(n)
+                return n
+            data = self.sock.recv(len(buf))
+            if not data:
+                raise ConnectionError("client closed connection in the middle of a chunked body")
+            parser.feed(data)
+        return 0
+
+    def read(self):
+        """Seluruh sisa body sebagai bytes, hanya untuk body kecil."""
+        data = bytearray()
+        buf = bytearray(64 * 1024)
+        view = memoryview(buf)
+        while True:
+            n = self.readinto(buf)
+            if not n:
+                return bytes(data)
+            data += view[:n]
+
+    def drain(self):
+        """Buang body yang tidak dibaca handler agar request berikutnya tetap sinkron."""
+        if not self.done:
+            buf = bytearray(64 * 1024)
+            while self.readinto(buf):
+                pass
@@ -0,0 +1,594 @@
+import time
+import signal
+import asyncio
+import logging
+import urllib.parse
+from http_parser import HttpParser, HttpParseError
+from access_log import AccessLog
+from proxy_cache import (CachedResponse, request_cacheable, request_wants_revalidation,
+                         freshness_lifetime, parse_seconds)
+
+#mode reverse proxy HTTP dengan cache untuk socket_proxy (--cache). Berbeda
+#dengan relay TCP, mode ini memparse setiap request dan response: GET yang
+#bisa di-cache dilayani dari proxy_cache.ResponseCache, miss bersamaan untuk
+#key yang sama digabung menjadi satu fetch ke backend, entry yang basi
+#divalidasi ulang dengan If-None-Match/If-Modified-Since, dan POST/DELETE
+#yang berhasil membuang entry untuk path yang diubahnya. Backend dipilih per
+#request oleh balancer.Balancer, lewat pool koneksi keep-alive.
+
+HOP_BY_HOP = {'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization', 'proxy-connection',
+              'te', 'trailer', 'transfer-encoding', 'upgrade'}
+#header validator milik client; diganti validator entry saat proxy merevalidasi
+CONDITIONAL = {'if-none-match', 'if-modified-since', 'if-match', 'if-unmodified-since', 'if-range'}
+UNSAFE_METHODS = {'POST', 'PUT', 'DELETE', 'PATCH'}
+#header yang dikirim bersama 304 ke client (RFC 7232 4.1)
+NOT_MODIFIED_HEADERS = {'cache-control', 'content-location', 'date', 'etag', 'expires', 'last-modified', 'vary'}
+READ_SIZE = 64 * 1024
+MAX_HEADER_SIZE = 16 * 1024
+KEEPALIVE_TIMEOUT = 15
+UPSTREAM_TIMEOUT = 30
+
+
+class UpstreamError(Exception):
+    """Backend gagal sebelum response apa pun terkirim ke client; dijawab 502."""
+
+
+class Upstream:
+    """Satu koneksi ke backend yang sedang dipakai sebuah request."""
+    __slots__ = ('backend', 'reader', 'writer', 'reused')
+
+    def __init__(self, backend, reader, writer, reused):
+        self.backend = backend
+        self.reader = reader
+        self.writer = writer
+        self.reused = reused
+
+
+class UpstreamPool:
+    """Koneksi keep-alive ke backend, dipakai ulang antar request.
+
+    Backend dipilih balancer untuk setiap request (key consistent-hash adalah
+    path). Connect yang gagal dicatat ke backend dan dicoba ke backend lain.
+    Koneksi terbuka (dipakai + idle) per backend dibatasi max_connections:
+    backend thread/process pool menahan satu worker untuk setiap koneksi
+    keep-alive, jadi pool yang lebih besar dari jumlah worker membuat
+    koneksi baru (dan health check) antre sampai keepalive_timeout backend.
+    Request yang tidak kebagian koneksi menunggu koneksi dilepas.
+    """
+    def __init__(self, balancer, max_connections=16):
+        self.balancer = balancer
+        self.max_connections = max_connections
+        self.idle = {}
+        self.opened = {}
+        self.waiters = {}
+
+    async def acquire(self, key, fresh=False):
+        tried = set()
+        while True:
+            backend = self.balancer.choose(key, tried)
+            if backend is None:
+                raise UpstreamError("no backend available")
+            tried.add(backend)
+            conns = self.idle.setdefault(backend, [])
+            while True:
+                while conns and not fresh:
+                    reader, writer = conns.pop()
+                    if writer.is_closing() or reader.at_eof():
+                        self.discard(backend, writer)
+                        continue
+                    backend.active += 1
+                    backend.total += 1
+                    return Upstream(backend, reader, writer, True)
+                if fresh and conns:
+                    #beri tempat untuk koneksi baru
+                    self.discard(backend, conns.pop(0)[1])
+                if self.opened.get(backend, 0) < self.max_connections:
+                    break
+                waiter = asyncio.get_running_loop().create_future()
+                self.waiters.setdefault(backend, []).append(waiter)
+                try:
+                    await waiter
+                except asyncio.CancelledError:
+                    if waiter.done() and not waiter.cancelled():
+                        #giliran yang sudah diberikan diteruskan ke penunggu berikutnya
+                        self.wake(backend)
+                    raise
+            self.opened[backend] = self.opened.get(backend, 0) + 1
+            try:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(*backend.address, limit=MAX_HEADER_SIZE * 4), UPSTREAM_TIMEOUT)
+            except (OSError, asyncio.TimeoutError) as e:
+                self.discard(backend, None)
+                logging.warning("connect to {} failed: {}".format(backend.name, e))
+                backend.connect_failures += 1
+                backend.record_failure(self.balancer.fall)
+                continue
+            backend.record_success(self.balancer.rise)
+            backend.active += 1
+            backend.total += 1
+            return Upstream(backend, reader, writer, False)
+
+    def release(self, upstream, reusable):
+        backend = upstream.backend
+        backend.active -= 1
+        if reusable and not upstream.writer.is_closing():
+            self.idle.setdefault(backend, []).append((upstream.reader, upstream.writer))
+            self.wake(backend)
+        else:
+            self.discard(backend, upstream.writer)
+
+    def discard(self, backend, writer):
+        if writer is not None:
+            writer.close()
+        self.opened[backend] -= 1
+        self.wake(backend)
+
+    def wake(self, backend):
+        waiters = self.waiters.get(backend)
+        while waiters:
+            waiter = waiters.pop(0)
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+
+class UpstreamResponse:
+    """Status line dan header response backend; body dibaca lewat body_chunks()."""
+    def __init__(self, reader, status, reason, headers, method):
+        self.reader = reader
+        self.status = status
+        self.reason = reason
+        #list (nama, nilai) apa adanya, dan dict nama huruf kecil -> nilai gabungan
+        self.headers = headers
+        self.values = {}
+        for name, value in headers:
+            name = name.lower()
+            self.values[name] = self.values[name] + ', ' + value if name in self.values else value
+        self.chunked = False
+        self.length = 0
+        self.keep_alive = 'close' not in self.values.get('connection', '').lower()
+        if method == 'HEAD' or status in (204, 304):
+            return
+        if 'chunked' in self.values.get('transfer-encoding', '').lower():
+            self.chunked = True
+            self.length = None
+        elif 'content-length' in self.values:
+            self.length = int(self.values['content-length'])
+        else:
+            #body diakhiri penutupan koneksi
+            self.length = None
+            self.keep_alive = False
+
+    @classmethod
+    async def read(cls, reader, method):
+        while True:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), UPSTREAM_TIMEOUT)
+            lines = head[:-4].decode('latin-1').split('\r\n')
+            status_line = lines[0].split(' ', 2)
+            if len(status_line) < 2 or not status_line[1].isdigit():
+                raise UpstreamError(f"malformed status line {lines[0]!r}")
+            status = int(status_line[1])
+            if 100 <= status < 200:
+                #response interim (mis. 100 Continue) dilewati
+                continue
+            headers = []
+            for line in lines[1:]:
+                name, sep, value = line.partition(':')
+                if sep:
+                    headers.append((name.strip(), value.strip()))
+            return cls(reader, status, status_line[2] if len(status_line) > 2 else '', headers, method)
+
+    async def body_chunks(self):
+        reader = self.reader
+        if self.chunked:
+            while True:
+                size = int((await reader.readuntil(b"\r\n")).split(b';', 1)[0], 16)
+                if size == 0:
+                    #trailer dibuang sampai baris kosong
+                    while await reader.readuntil(b"\r\n") != b"\r\n":
+                        pass
+                    return
+                while size:
+                    data = await reader.read(min(size, READ_SIZE))
+                    if not data:
+                        raise ConnectionError("backend closed connection in the middle of a chunk")
+                    size -= len(data)
+                    yield data
+                await reader.readexactly(2)
+        elif self.length is not None:
+            remaining = self.length
+            while remaining:
+                data = await reader.read(min(remaining, READ_SIZE))
+                if not data:
+                    raise ConnectionError(f"backend closed connection with {remaining} body bytes outstanding")
+                remaining -= len(data)
+                yield data
+        else:
+            while True:
+                data = await reader.read(READ_SIZE)
+                if not data:
+                    return
+                yield data
+
+
+class ProcessTheClient:
+    """Satu koneksi client: parser request incremental dan writer-nya."""
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.address = writer.get_extra_info('peername')
+        self.parser = HttpParser(MAX_HEADER_SIZE)
+        self.eof = False
+        #untuk access log: status, hasil cache dan byte response yang terakhir
+        self.status = 0
+        self.cache = None
+        self.sent = 0
+
+    def write(self, data):
+        self.sent += len(data)
+        self.writer.write(data)
+
+    async def fill(self):
+        data = await asyncio.wait_for(self.reader.read(READ_SIZE), KEEPALIVE_TIMEOUT)
+        if data:
+            self.parser.feed(data)
+        else:
+            self.eof = True
+
+    async def next_request(self):
+        while True:
+            request = self.parser.next_request()
+            if request is not None or self.eof:
+                return request
+            await self.fill()
+
+    async def body_chunks(self):
+        """Body request (sudah didekode) per potongan, dibaca sesuai kebutuhan."""
+        buf = bytearray(READ_SIZE)
+        while not self.parser.body_done:
+            n = self.parser.read_body(buf)
+            if n:
+                yield bytes(buf[:n])
+                continue
+            if self.parser.body_done:
+                break
+            if self.eof:
+                raise ConnectionError("client closed connection before the request body was complete")
+            await self.fill()
+
+
+class Proxy:
+    def __init__(self, balancer, cache, heuristic_max=60, upstream_connections=16, access_log=None):
+        self.balancer = balancer
+        self.access_log = access_log or AccessLog(None)
+        self.cache = cache
+        self.heuristic_max = heuristic_max
+        self.pool = UpstreamPool(balancer, upstream_connections)
+        #key cache -> future berisi CachedResponse (atau None) dari fetch yang sedang berjalan
+        self.inflight = {}
+        self.collapsed = 0
+
+    async def accept(self, reader, writer):
+        client = ProcessTheClient(reader, writer)
+        try:
+            while True:
+                try:
+                    request = await client.next_request()
+                except HttpParseError as e:
+                    await self.send_error(client, e.kode, e.message)
+                    self.access_log.log(client.address, None, None, e.kode, client.sent, 0.0)
+                    break
+                if request is None:
+                    break
+                started = time.perf_counter()
+                client.status, client.cache, client.sent = 0, None, 0
+                try:
+                    keep_alive = await self.handle(client, request)
+                except UpstreamError as e:
+                    logging.warning("upstream error for {} {}: {}".format(request.method, request.target, e))
+                    await self.send_error(client, 502, 'Bad Gateway')
+                    keep_alive = False
+                finally:
+                    self.access_log.log(client.address, request.method, request.target, client.status,
+                                        client.sent, time.perf_counter() - started, {'cache': client.cache})
+                if not keep_alive:
+                    break
+                #body yang tidak diteruskan dibuang agar request berikutnya sinkron
+                async for _ in client.body_chunks():
+                    pass
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, HttpParseError):
+            pass
+        except Exception as e:
+            logging.error("Error serving {}: {}".format(client.address, e))
+        finally:
+            writer.close()
+
+    async def handle(self, client, request):
+        """Layani satu request; kembalikan apakah koneksi client tetap hidup."""
+        if not request_cacheable(request):
+            return await self.forward(client, request)
+        key = self.cache.key(request.target, request.headers)
+        entry = self.cache.get(key)
+        if entry is not None and entry.fresh() and not request_wants_revalidation(request):
+            return await self.send_entry(client, request, entry, 'HIT')
+        if request.method == 'HEAD':
+            return await self.forward(client, request)
+
+        waiter = self.inflight.get(key)
+        if waiter is not None:
+            #fetch untuk key ini sedang berjalan; tunggu hasilnya, jangan ke origin
+            self.collapsed += 1
+            shared = await asyncio.shield(waiter)
+            if shared is None:
+                return await self.forward(client, request)
+            if self.cache.key(request.target, request.headers, shared.vary) == shared.key:
+                return await self.send_entry(client, request, shared, 'HIT')
+            #response ternyata Vary pada header yang nilainya berbeda untuk
+            #request ini; cari lagi dengan Vary yang sekarang sudah diketahui
+            return await self.handle(client, request)
+
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        result = None
+        try:
+            result, keep_alive = await self.fetch(client, request, entry)
+            return keep_alive
+        finally:
+            del self.inflight[key]
+            future.set_result(result)
+
+    async def fetch(self, client, request, stale):
+        """Ambil GET dari backend untuk disimpan; kembalikan (entry atau None, keep_alive)."""
+        conditional = {}
+        if stale is not None:
+            if stale.etag:
+                conditional['If-None-Match'] = stale.etag
+            if stale.last_modified:
+                conditional['If-Modified-Since'] = stale.last_modified
+        upstream, response = await self.exchange(request, skip=CONDITIONAL, extra=conditional.items())
+
+        if response.status == 304 and stale is not None:
+            self.pool.release(upstream, response.keep_alive)
+            updated = {name: value for name, value in response.headers if name.lower() not in HOP_BY_HOP}
+            values = {name.lower(): value for name, value in stale.headers}
+            values.update((name.lower(), value) for name, value in updated.items())
+            lifetime = freshness_lifetime(stale.status, values, self.heuristic_max)
+            stale.refresh(list(updated.items()), lifetime or 0)
+            return stale, await self.send_entry(client, request, stale, 'REVALIDATED')
+
+        lifetime = freshness_lifetime(response.status, response.values, self.heuristic_max)
+        if lifetime is None or (response.length or 0) > self.cache.max_object_size:
+            return None, await self.relay(client, request, upstream, response, 'MISS')
+
+        body = bytearray()
+        chunks = response.body_chunks()
+        try:
+            async for data in chunks:
+                body += data
+                if len(body) > self.cache.max_object_size:
+                    #body chunked ternyata terlalu besar: kirim apa adanya tanpa disimpan
+                    return None, await self.relay(client, request, upstream, response, 'MISS', bytes(body), chunks)
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError) as e:
+            upstream.writer.close()
+            self.pool.release(upstream, False)
+            raise UpstreamError(e)
+        self.pool.release(upstream, response.keep_alive)
+
+        headers = [(name, value) for name, value in response.headers
+                   if name.lower() not in HOP_BY_HOP and name.lower() != 'content-length']
+        key = self.cache.vary_key(request.target, request.path, response.values, request.headers)
+        entry = CachedResponse(key, request.path, response.status, response.reason, headers, bytes(body),
+                               lifetime, parse_seconds(response.values.get('age')) or 0)
+        #tier disk menulis file, jadi tidak di thread event loop
+        await asyncio.get_running_loop().run_in_executor(None, self.cache.put, entry)
+        return entry, await self.send_entry(client, request, entry, 'MISS')
+
+    async def forward(self, client, request):
+        """Teruskan request apa adanya (termasuk body) tanpa cache."""
+        upstream, response = await self.exchange(request, client)
+        if request.method in UNSAFE_METHODS and response.status < 400:
+            loop = asyncio.get_running_loop()
+            for path in invalidation_paths(request, response.values):
+                #invalidasi bisa menghapus file tier disk, jadi tidak di thread event loop
+                await loop.run_in_executor(None, self.cache.invalidate, path)
+        return await self.relay(client, request, upstream, response, 'BYPASS')
+
+    async def exchange(self, request, client=None, skip=(), extra=()):
+        """Kirim request ke backend dan baca header response-nya.
+
+        Request tanpa body yang gagal di koneksi keep-alive lama diulang sekali
+        di koneksi baru (backend mungkin sudah menutup koneksi idle).
+        """
+        has_body = request.chunked or bool(request.content_length)
+        fresh = False
+        while True:
+            upstream = await self.pool.acquire(request.path, fresh)
+            try:
+                upstream.writer.write(request_head(request, client, has_body, skip, extra))
+                if has_body:
+                    async for data in client.body_chunks():
+                        upstream.writer.write(b"%x\r\n%s\r\n" % (len(data), data) if request.chunked else data)
+                        await upstream.writer.drain()
+                    if request.chunked:
+                        upstream.writer.write(b"0\r\n\r\n")
+                await upstream.writer.drain()
+                response = await UpstreamResponse.read(upstream.reader, request.method)
+                return upstream, response
+            except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, UpstreamError) as e:
+                upstream.writer.close()
+                self.pool.release(upstream, False)
+                if isinstance(e, ConnectionError) and client is not None and not client.parser.body_done:
+                    #client sendiri yang putus di tengah body
+                    raise
+                if upstream.reused and not has_body:
+                    fresh = True
+                    continue
+                raise UpstreamError(e)
+
+    async def relay(self, client, request, upstream, response, label, prefix=b'', chunks=None):
+        """Kirim response backend ke client sambil dibaca (streaming, tanpa disimpan)."""
+        length = response.length if not response.chunked else None
+        body_allowed = request.method != 'HEAD' and response.status not in (204, 304)
+        if not body_allowed and 'content-length' in response.values:
+            length = int(response.values['content-length'])
+        keep_alive, chunked = self.write_head(client, request, response.status, response.reason,
+                                              response.headers, length, [('X-Cache', label)], body_allowed)
+        if prefix:
+            client.write(frame(prefix, chunked))
+        ok = False
+        try:
+            if body_allowed:
+                async for data in (chunks or response.body_chunks()):
+                    client.write(frame(data, chunked))
+                    await client.writer.drain()
+                if chunked:
+                    client.write(b"0\r\n\r\n")
+            ok = True
+        finally:
+            self.pool.release(upstream, ok and response.keep_alive)
+        await client.writer.drain()
+        return keep_alive
+
+    async def send_entry(self, client, request, entry, label):
+        """Layani entry cache, termasuk 304 untuk validator milik client."""
+        if not_modified(request.headers, entry):
+            headers = [(name, value) for name, value in entry.headers if name.lower() in NOT_MODIFIED_HEADERS]
+            keep_alive, _ = self.write_head(client, request, 304, 'Not Modified', headers, None,
+                                            [('Age', str(entry.age())), ('X-Cache', label)], False)
+            await client.writer.drain()
+            return keep_alive
+
+        body, filename = entry.body, entry.filename
+        fileobj = None
+        if body is None:
+            try:
+                fileobj = open(filename, 'rb')
+            except OSError:
+                #entry baru saja tergusur dari disk
+                return await self.forward(client, request)
+        try:
+            keep_alive, _ = self.write_head(client, request, entry.status, entry.reason, entry.headers, entry.size,
+                                            [('Age', str(entry.age())), ('X-Cache', label)],
+                                            request.method != 'HEAD')
+            if request.method != 'HEAD':
+                if fileobj is None:
+                    client.write(body)
+                else:
+                    await client.writer.drain()
+                    await asyncio.get_running_loop().sendfile(client.writer.transport, fileobj, 0, entry.size)
+                    client.sent += entry.size
+            await client.writer.drain()
+        finally:
+            if fileobj is not None:
+                fileobj.close()
+        return keep_alive
+
+    def write_head(self, client, request, status, reason, headers, length, extra, body_allowed):
+        """Tulis status line dan header ke client; kembalikan (keep_alive, chunked)."""
+        keep_alive = request.keep_alive
+        chunked = False
+        if length is None and body_allowed:
+            if request.version == 'HTTP/1.1':
+                chunked = True
+            else:
+                #HTTP/1.0 tidak mengenal chunked; akhir body ditandai penutupan koneksi
+                keep_alive = False
+        lines = [f"HTTP/1.1 {status} {reason}"]
+        for name, value in headers:
+            lowered = name.lower()
+            if lowered not in HOP_BY_HOP and lowered != 'content-length':
+                lines.append(f"{name}: {value}")
+        for name, value in extra:
+            lines.append(f"{name}: {value}")
+        if length is not None:
+            lines.append(f"Content-Length: {length}")
+        elif chunked:
+            lines.append("Transfer-Encoding: chunked")
+        lines.append("Connection: keep-alive" if keep_alive else "Connection: close")
+        client.status = status
+        client.cache = dict(extra).get('X-Cache')
+        client.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1'))
+        return keep_alive, chunked
+
+    async def send_error(self, client, kode, message):
+        body = f"{kode} {message}\n".encode()
+        client.status = kode
+        client.write(f"HTTP/1.1 {kode} {message}\r\nContent-Type: text/plain\r\n"
+                            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+        try:
+            await client.writer.drain()
+        except ConnectionError:
+            pass
+
+    def log_stats(self):
+        stats = self.cache.stats()
+        stats['collapsed'] = self.collapsed
+        logging.warning("cache: " + ' '.join(f"{name}={value}" for name, value in stats.items()))
+        for stats in self.balancer.stats():
+            logging.warning("backend {backend}: healthy={healthy} active={active} total={total} "
+                            "connect_failures={connect_failures}".format(**stats))
+
+
+def frame(data, chunked):
+    return b"%x\r\n%s\r\n" % (len(data), data) if chunked else data
+
+
+def request_head(request, client, has_body, skip=(), extra=()):
+    lines = [f"{request.method} {request.target} HTTP/1.1"]
+    for name, value in request.headers.items():
+        if name in HOP_BY_HOP or name == 'content-length' or name in skip:
+            continue
+        lines.append(f"{name}: {value}")
+    for name, value in extra:
+        lines.append(f"{name}: {value}")
+    if client is not None and client.address:
+        lines.append(f"X-Forwarded-For: {client.address[0]}")
+    if has_body:
+        lines.append("Transfer-Encoding: chunked" if request.chunked else f"Content-Length: {request.content_length}")
+    lines.append("Connection: keep-alive")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode('latin-1')
+
+
+def not_modified(headers, entry):
+    """Validator client cocok dengan entry (If-None-Match didahulukan, RFC 7232 6)."""
+    if_none_match = headers.get('if-none-match')
+    if if_none_match is not None:
+        if not entry.etag:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        #perbandingan lemah: W/ diabaikan
+        return '*' in tags or entry.etag.removeprefix('W/') in (tag.removeprefix('W/') for tag in tags)
+    if_modified_since = headers.get('if-modified-since')
+    return if_modified_since is not None and if_modified_since == entry.last_modified
+
+
+def invalidation_paths(request, values):
+    """Path yang entry-nya basi setelah request unsafe berhasil (RFC 7234 4.4)."""
+    paths = {request.path}
+    for name in ('location', 'content-location'):
+        if name in values:
+            path = urllib.parse.unquote(urllib.parse.urlsplit(values[name]).path)
+            if path:
+                paths.add(path)
+    #HttpServer mengubah file lewat path lain dari path GET-nya
+    filename = None
+    if request.path == '/upload_file':
+        filename = request.headers.get('x-filename')
+    elif request.path.startswith('/delete_file/'):
+        filename = request.path[len('/delete_file/'):]
+    if filename:
+        paths.update(('/' + filename, '/download/' + filename, '/list_files'))
+    return paths
+
+
+async def Server(portnumber, balancer, cache, heuristic_max=60, upstream_connections=16, access_log=None,
+                 host='0.0.0.0'):
+    proxy = Proxy(balancer, cache, heuristic_max, upstream_connections, access_log)
+    server = await asyncio.start_server(proxy.accept, host, portnumber, backlog=1024,
+                                        reuse_address=True, limit=MAX_HEADER_SIZE * 4)
+    #kill -USR1 <pid> mencetak statistik cache dan counter per backend
+    asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, proxy.log_stats)
+    logging.warning("caching proxy on port {} -> {} ({})".format(
+        portnumber, ', '.join(b.name for b in balancer.backends), balancer.strategy))
+    async with server:
+        await server.serve_forever()
@@ -0,0 +1,312 @@
+import os
+import sys
+import ssl
+import csv
+import json
+import time
+import random
+import shutil
+import signal
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+#load generator berbasis asyncio untuk membandingkan semua front-end server.
+#Setiap varian server dijalankan sebagai subprocess di port ephemeral dengan
+#direktori kerja sementara (server_files berisi testing.txt dan rfc2616.pdf),
+#lalu setiap skenario dijalankan dengan N koneksi konkuren. Hasil berupa
+#requests/sec, throughput dan latensi p50/p90/p99/max, dicetak sebagai tabel
+#dan bisa disimpan sebagai JSON/CSV untuk dilacak antar commit.
+#
+#contoh:
+#   python3 loadgen.py
+#   python3 loadgen.py --servers thread-pool,asyncio --scenarios small-get -c 100 -n 5000
+#   python3 loadgen.py --target localhost:8887 --scenarios small-get --json hasil.json
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+#nama -> (argumen server.py, pakai TLS)
+SERVERS = {
+    'thread': (['--model', 'thread'], False),
+    'thread-pool': (['--model', 'thread-pool'], False),
+    'process': (['--model', 'process'], False),
+    'process-pool': (['--model', 'process-pool'], False),
+    'prefork': (['--model', 'prefork'], False),
+    'asyncio': (['--model', 'asyncio'], False),
+    'selectors': (['--model', 'selectors'], False),
+    'tls': (['--model', 'thread', '--tls'], True),
+    'tls-thread-pool': (['--model', 'thread-pool', '--tls'], True),
+    'tls-asyncio': (['--model', 'asyncio', '--tls'], True),
+}
+
+#nama -> (daftar (bobot, jenis request), keep-alive)
+SCENARIOS = {
+    'small-get': ([(1, 'small')], True),
+    'small-get-close': ([(1, 'small')], False),
+    'large-download': ([(1, 'large')], True),
+    'upload': ([(1, 'upload')], True),
+    'mixed': ([(8, 'small'), (1, 'large'), (1, 'upload')], True),
+}
+
+SMALL_FILE = 'testing.txt'
+LARGE_FILE = 'rfc2616.pdf'
+RESULT_FIELDS = ['server', 'scenario', 'concurrency', 'requests', 'errors', 'duration',
+                 'rps', 'mib_per_sec', 'p50_ms', 'p90_ms', 'p99_ms', 'max_ms']
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.bytes = 0
+
+
+async def read_response(reader):
+    """Baca satu response; kembalikan (status, jumlah byte body, koneksi tetap hidup)."""
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode('latin-1').split("\r\n")
+    status = int(lines[0].split(' ', 2)[1])
+    headers = {}
+    for line in lines[1:]:
+        name, sep, value = line.partition(':')
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+
+    size = 0
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            chunk_size = int((await reader.readuntil(b"\r\n")).split(b';')[0], 16)
+            if chunk_size == 0:
+                #lewati trailer sampai baris kosong
+                while await reader.readuntil(b"\r\n") != b"\r\n":
+                    pass
+                break
+            await reader.readexactly(chunk_size + 2)
+            size += chunk_size
+    elif 'content-length' in headers:
+        remaining = int(headers['content-length'])
+        size = remaining
+        while remaining:
+            data = await reader.read(min(remaining, 256 * 1024))
+            if not data:
+                raise ConnectionError("connection closed in the middle of a response body")
+            remaining -= len(data)
+    else:
+        #body diakhiri penutupan koneksi
+        while True:
+            data = await reader.read(256 * 1024)
+            if not data:
+                break
+            size += len(data)
+        return status, size, False
+    return status, size, headers.get('connection', '').lower() != 'close'
+
+
+def build_request(kind, host, keep_alive, worker, upload_body):
+    connection = 'keep-alive' if keep_alive else 'close'
+    if kind == 'upload':
+        return (f"POST /upload_file HTTP/1.1\r\nHost: {host}\r\nConnection: {connection}\r\n"
+                f"X-Filename: bench-{worker}.bin\r\nContent-Length: {len(upload_body)}\r\n\r\n").encode() + upload_body
+    path = SMALL_FILE if kind == 'small' else LARGE_FILE
+    return f"GET /{path} HTTP/1.1\r\nHost: {host}\r\nConnection: {connection}\r\n\r\n".encode()
+
+
+async def worker_loop(worker, host, port, ssl_context, scenario, counter, total, stats, upload_body, timeout):
+    mix, keep_alive = SCENARIOS[scenario]
+    kinds = [kind for weight, kind in mix for _ in range(weight)]
+    rng = random.Random(worker)
+    reader = writer = None
+    try:
+        while counter[0] < total:
+            counter[0] += 1
+            kind = rng.choice(kinds)
+            request = build_request(kind, host, keep_alive, worker, upload_body)
+            start = time.perf_counter()
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.wait_for(
+                        asyncio.open_connection(host, port, ssl=ssl_context, limit=1024 * 1024), timeout)
+                writer.write(request)
+                status, size, alive = await asyncio.wait_for(read_response(reader), timeout)
+            except (OSError, EOFError, ValueError, asyncio.IncompleteReadError,
+                    asyncio.LimitOverrunError, asyncio.TimeoutError):
+                stats.errors += 1
+                alive = False
+            else:
+                stats.latencies.append(time.perf_counter() - start)
+                stats.bytes += size + (len(upload_body) if kind == 'upload' else 0)
+                if status >= 400:
+                    stats.errors += 1
+            if not (alive and keep_alive):
+                if writer is not None:
+                    writer.close()
+                reader = writer = None
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))]
+
+
+async def run_scenario(host, port, tls, scenario, concurrency, requests, upload_size, timeout):
+    ssl_context = None
+    if tls:
+        #sertifikat di certs/ self-signed, jadi verifikasi dimatikan
+        ssl_context = ssl.create_default_context()
+        ssl_context.check_hostname = False
+        ssl_context.verify_mode = ssl.CERT_NONE
+    stats = Stats()
+    counter = [0]
+    upload_body = os.urandom(upload_size)
+    start = time.perf_counter()
+    await asyncio.gather(*(worker_loop(i, host, port, ssl_context, scenario, counter, requests,
+                                       stats, upload_body, timeout) for i in range(concurrency)))
+    duration = time.perf_counter() - start
+
+    latencies = sorted(stats.latencies)
+    return {
+        'scenario': scenario,
+        'concurrency': concurrency,
+        'requests': requests,
+        'errors': stats.errors,
+        'duration': round(duration, 3),
+        'rps': round(len(latencies) / duration, 1),
+        'mib_per_sec': round(stats.bytes / duration / (1024 * 1024), 2),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p90_ms': round(percentile(latencies, 90) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'max_ms': round((latencies[-1] if latencies else 0) * 1000, 2),
+    }
+
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def make_workdir():
+    """Direktori kerja sementara untuk server: server_files dengan file uji dan certs."""
+    workdir = tempfile.mkdtemp(prefix='loadgen-')
+    files = os.path.join(workdir, 'server_files')
+    os.makedirs(files)
+    for name in (SMALL_FILE, LARGE_FILE):
+        shutil.copy(os.path.join(REPO_DIR, name), files)
+    os.symlink(os.path.join(REPO_DIR, 'certs'), os.path.join(workdir, 'certs'))
+    return workdir
+
+
+def start_server(name, workdir, server_args=(), startup_timeout=15):
+    model_args, tls = SERVERS[name]
+    port = free_port()
+    #session sendiri agar seluruh proses anak (worker, pool) ikut dihentikan
+    proc = subprocess.Popen([sys.executable, os.path.join(REPO_DIR, 'server.py'), *model_args,
+                             '--port', str(port), *server_args],
+                            cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                            start_new_session=True)
+    deadline = time.monotonic() + startup_timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server {name} exited with code {proc.returncode}")
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return proc, port, tls
+        except OSError:
+            time.sleep(0.1)
+    stop_server(proc)
+    raise RuntimeError(f"server {name} did not start listening on port {port}")
+
+
+def stop_server(proc):
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+        proc.wait(timeout=5)
+    except ProcessLookupError:
+        pass
+    except subprocess.TimeoutExpired:
+        os.killpg(proc.pid, signal.SIGKILL)
+        proc.wait()
+
+
+def print_row(values):
+    print(' '.join(f"{str(value):>14}" for value in values), flush=True)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark semua front-end HTTP server di repo ini.")
+    parser.add_argument('--servers', default=','.join(SERVERS),
+                        help="daftar varian server, dipisah koma (default: semua)")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help="daftar skenario, dipisah koma (default: semua)")
+    parser.add_argument('-c', '--concurrency', type=int, default=50)
+    parser.add_argument('-n', '--requests', type=int, default=1000, help="jumlah request per skenario")
+    parser.add_argument('--upload-size', type=int, default=64 * 1024)
+    parser.add_argument('--timeout', type=float, default=30.0, help="timeout per request (detik)")
+    parser.add_argument('--target', help="HOST:PORT server yang sudah berjalan; tidak menjalankan server sendiri")
+    parser.add_argument('--tls', action='store_true', help="pakai TLS ke --target")
+    parser.add_argument('--server-args', default='',
+                        help="argumen tambahan untuk server.py, mis. \"--workers 50 --backlog 4096\"")
+    parser.add_argument('--json', help="simpan hasil sebagai JSON ke file ini")
+    parser.add_argument('--csv', help="simpan hasil sebagai CSV ke file ini")
+    args = parser.parse_args(argv)
+    args.servers = [s for s in args.servers.split(',') if s]
+    args.scenarios = [s for s in args.scenarios.split(',') if s]
+    for name in args.servers:
+        if name not in SERVERS:
+            parser.error(f"unknown server '{name}', choose from {', '.join(SERVERS)}")
+    for name in args.scenarios:
+        if name not in SCENARIOS:
+            parser.error(f"unknown scenario '{name}', choose from {', '.join(SCENARIOS)}")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = []
+    print_row(RESULT_FIELDS)
+
+    def run(server, host, port, tls):
+        for scenario in args.scenarios:
+            result = asyncio.run(run_scenario(host, port, tls, scenario, args.concurrency,
+                                              args.requests, args.upload_size, args.timeout))
+            result = {'server': server, **result}
+            results.append(result)
+            print_row(result[field] for field in RESULT_FIELDS)
+
+    if args.target:
+        host, _, port = args.target.rpartition(':')
+        run(args.target, host or 'localhost', int(port), args.tls)
+    else:
+        workdir = make_workdir()
+        try:
+            for server in args.servers:
+                try:
+                    proc, port, tls = start_server(server, workdir, args.server_args.split())
+                except RuntimeError as e:
+                    print(e, file=sys.stderr)
+                    continue
+                try:
+                    run(server, '127.0.0.1', port, tls)
+                finally:
+                    stop_server(proc)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.csv:
+        with open(args.csv, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+            writer.writeheader()
+            writer.writerows(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+import os
+import json
+import time
+import fcntl
+import bisect
+import tempfile
+import threading
+
+#bucket latensi tetap (detik) untuk semua histogram
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def merge_into(values, hists, other_values, other_hists, skip=()):
+    for key, value in other_values.items():
+        if key[0] not in skip:
+            values[key] = values.get(key, 0) + value
+    for key, counts in other_hists.items():
+        mine = hists.get(key)
+        if mine is None:
+            hists[key] = list(counts)
+        else:
+            for i, count in enumerate(counts):
+                mine[i] += count
+
+
+class Metrics:
+    """Counter, gauge dan histogram dengan output format teks Prometheus.
+
+    Setiap thread menulis ke shard miliknya sendiri tanpa lock; shard baru
+    digabung saat scrape, dan shard milik thread yang sudah selesai dilipat
+    ke satu shard pensiun. Gauge ditulis sebagai penambahan (+1/-1), jadi
+    nilainya adalah jumlah seluruh shard.
+
+    Dalam mode multi-proses (enable_multiprocess() di proses induk, diwariskan
+    lewat env HTTP_METRICS_DIR) setiap proses menulis snapshot ke
+    <dir>/<pid>.json dan scrape menggabungkan snapshot semua proses. Counter
+    dan histogram milik proses yang sudah mati dilipat ke archive.json;
+    gauge-nya dibuang.
+    """
+    FLUSH_INTERVAL = 1.0
+
+    def __init__(self):
+        self.multiprocess_dir = os.environ.get('HTTP_METRICS_DIR')
+        self.types = {}
+        self.collectors = []
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        #proses anak hasil fork mulai dari nol; data induk tetap milik induk
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.shards = []
+        self.retired = ({}, {})
+        self.static = {}
+        self.flushed = 0.0
+
+    def describe(self, name, kind, text):
+        self.types[name] = (kind, text)
+
+    def add_collector(self, collector):
+        """collector() dipanggil saat scrape, mengembalikan iterable (name, labels, value)."""
+        self.collectors.append(collector)
+
+    def enable_multiprocess(self):
+        """Aktifkan agregasi antar proses; dipanggil proses induk sebelum membuat worker."""
+        if self.multiprocess_dir is None:
+            self.multiprocess_dir = tempfile.mkdtemp(prefix='http-metrics-')
+        os.environ['HTTP_METRICS_DIR'] = self.multiprocess_dir
+
+    def shard(self):
+        shard = getattr(self.local, 'shard', None)
+        if shard is None:
+            shard = ({}, {})
+            self.local.shard = shard
+            with self.lock:
+                self._fold_dead()
+                self.shards.append((threading.current_thread(), shard))
+        return shard
+
+    def _fold_dead(self):
+        alive = []
+        for thread, shard in self.shards:
+            if thread.is_alive():
+                alive.append((thread, shard))
+            else:
+                merge_into(*self.retired, *shard)
+        self.shards = alive
+
+    def inc(self, name, value=1, **labels):
+        values = self.shard()[0]
+        key = (name, label_key(labels))
+        values[key] = values.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        """Gauge milik proses (mis. ukuran pool), ditulis jarang."""
+        with self.lock:
+            self.static[(name, label_key(labels))] = value
+
+    def observe(self, name, value, **labels):
+        hists = self.shard()[1]
+        key = (name, label_key(labels))
+        counts = hists.get(key)
+        if counts is None:
+            #satu slot per bucket, satu untuk +Inf, lalu jumlah nilai
+            counts = hists[key] = [0] * (len(LATENCY_BUCKETS) + 2)
+        counts[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+        counts[-1] += value
+
+    def snapshot(self):
+        """Gabungan data proses ini: (values, histograms)."""
+        values, hists = {}, {}
+        with self.lock:
+            self._fold_dead()
+            merge_into(values, hists, *self.retired)
+            for _, (shard_values, shard_hists) in self.shards:
+                merge_into(values, hists, shard_values.copy(), {k: list(v) for k, v in shard_hists.copy().items()})
+            values.update(self.static)
+        for collector in self.collectors:
+            for name, labels, value in collector():
+                values[(name, label_key(labels))] = value
+        return values, hists
+
+    def gauges(self):
+        return {name for name, (kind, _) in self.types.items() if kind == 'gauge'}
+
+    @staticmethod
+    def dump(path, values, hists):
+        data = {'values': [[name, labels, value] for (name, labels), value in values.items()],
+                'hists': [[name, labels, counts] for (name, labels), counts in hists.items()]}
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def load(path):
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}, {}
+        values = {(name, tuple(map(tuple, labels))): value for name, labels, value in data['values']}
+        hists = {(name, tuple(map(tuple, labels))): counts for name, labels, counts in data['hists']}
+        return values, hists
+
+    def flush(self, force=True):
+        """Tulis snapshot proses ini untuk scrape di proses lain (mode multi-proses saja)."""
+        if self.multiprocess_dir is None:
+            return
+        now = time.monotonic()
+        if not force and now - self.flushed < self.FLUSH_INTERVAL:
+            return
+        self.flushed = now
+        self.dump(os.path.join(self.multiprocess_dir, f"{os.getpid()}.json"), *self.snapshot())
+
+    def retire(self):
+        """Lipat counter proses ini ke archive; untuk proses yang akan segera selesai."""
+        if self.multiprocess_dir is None:
+            return
+        values, hists = self.snapshot()
+        with self.locked_dir():
+            archive = os.path.join(self.multiprocess_dir, 'archive.json')
+            archived = self.load(archive)
+            merge_into(*archived, values, hists, skip=self.gauges())
+            self.dump(archive, *archived)
+            try:
+                os.remove(os.path.join(self.multiprocess_dir, f"{os.getpid()}.json"))
+            except FileNotFoundError:
+                pass
+
+    def locked_dir(self):
+        lock = open(os.path.join(self.multiprocess_dir, '.lock'), 'w')
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        return lock
+
+    def collect(self):
+        """Data seluruh proses (atau proses ini saja di mode single-proses)."""
+        values, hists = self.snapshot()
+        if self.multiprocess_dir is None:
+            return values, hists
+        gauges = self.gauges()
+        with self.locked_dir():
+            archive = os.path.join(self.multiprocess_dir, 'archive.json')
+            archived = self.load(archive)
+            changed = False
+            for name in os.listdir(self.multiprocess_dir):
+                pid, ext = os.path.splitext(name)
+                if ext != '.json' or not pid.isdigit() or int(pid) == os.getpid():
+                    continue
+                path = os.path.join(self.multiprocess_dir, name)
+                other = self.load(path)
+                try:
+                    os.kill(int(pid), 0)
+                except ProcessLookupError:
+                    merge_into(*archived, *other, skip=gauges)
+                    os.remove(path)
+                    changed = True
+                    continue
+                except PermissionError:
+                    pass
+                merge_into(values, hists, *other)
+            if changed:
+                self.dump(archive, *archived)
+        merge_into(values, hists, *archived)
+        return values, hists
+
+    def render(self):
+        """Semua metric dalam format teks Prometheus (versi 0.0.4)."""
+        values, hists = self.collect()
+        series = {}
+        for (name, labels), value in values.items():
+            series.setdefault(name, []).append((labels, value))
+        for (name, labels), counts in hists.items():
+            series.setdefault(name, []).append((labels, counts))
+
+        lines = []
+        for name in sorted(series):
+            kind, text = self.types.get(name, ('untyped', ''))
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in sorted(series[name]):
+                if kind != 'histogram':
+                    lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), value):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{format_labels(labels + (('le', str(bound)),))} {cumulative}")
+                lines.append(f"{name}_sum{format_labels(labels)} {format_value(value[-1])}")
+                lines.append(f"{name}_count{format_labels(labels)} {cumulative}")
+        lines.append('')
+        return '\n'.join(lines)
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+
+
+def format_value(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
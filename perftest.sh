@@ -1,5 +1,10 @@
-#ab -n jumlah_request -c jumlah_konkuren http://localhost:8887/testingab -n jumlah_request -c jumlah_konkuren http://localhost:8887/testing.txt
+#benchmark semua varian server dengan load generator di loadgen.py;
+#setiap server dijalankan sendiri di port ephemeral, hasil disimpan per commit
+#python3 loadgen.py --help untuk daftar server, skenario dan opsi lainnya
 
+#ab -n jumlah_request -c jumlah_konkuren http://localhost:8887/testing.txt
 
-ab -n 100 -c 50 http://localhost:8887/testing.txt
-
+mkdir -p bench
+rev=$(git rev-parse --short HEAD 2>/dev/null || echo local)
+python3 loadgen.py -n "${REQUESTS:-1000}" -c "${CONCURRENCY:-50}" "$@" \
+	--json "bench/$rev.json" --csv "bench/$rev.csv"
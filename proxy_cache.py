@@ -0,0 +1,352 @@
+import os
+import re
+import time
+import hashlib
+import itertools
+import tempfile
+import threading
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+
+#nama file yang ditulis tier disk: <sha1 key>-<nomor>, .tmp selama ditulis
+CACHE_FILE = re.compile(r'[0-9a-f]{40}-[0-9]+(\.tmp)?')
+#status yang boleh disimpan (RFC 7231 6.1, cacheable by default)
+CACHEABLE_STATUS = {200, 203, 204, 300, 301, 404, 405, 410, 414, 501}
+
+
+def parse_cache_control(value):
+    """Directive Cache-Control sebagai dict; directive tanpa nilai bernilai True."""
+    directives = {}
+    for part in (value or '').split(','):
+        name, sep, arg = part.strip().partition('=')
+        if name:
+            directives[name.lower()] = arg.strip().strip('"') if sep else True
+    return directives
+
+
+def parse_seconds(value):
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_http_date(value):
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+
+def vary_names(value):
+    """Nama header (huruf kecil, terurut) yang disebut header Vary."""
+    return tuple(sorted({name.strip().lower() for name in (value or '').split(',') if name.strip()}))
+
+
+def request_cacheable(request):
+    """Request GET/HEAD yang boleh dilayani dari cache."""
+    headers = request.headers
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if 'authorization' in headers or 'range' in headers:
+        return False
+    return 'no-store' not in parse_cache_control(headers.get('cache-control'))
+
+
+def request_wants_revalidation(request):
+    """Client meminta respons yang divalidasi ulang ke origin (reload)."""
+    directives = parse_cache_control(request.headers.get('cache-control'))
+    if 'no-cache' in directives or parse_seconds(directives.get('max-age')) == 0:
+        return True
+    return 'no-cache' in request.headers.get('pragma', '').lower()
+
+
+def freshness_lifetime(status, headers, heuristic_max):
+    """Umur segar response (detik), atau None bila response tidak boleh disimpan.
+
+    headers adalah dict nama huruf kecil. Urutan: s-maxage, max-age, Expires
+    dikurangi Date, lalu heuristik 10% umur sejak Last-Modified (RFC 7234
+    4.2.2) dibatasi heuristic_max. Response tanpa umur segar tapi dengan
+    validator tetap disimpan dengan umur 0 dan selalu divalidasi ulang.
+    """
+    if status not in CACHEABLE_STATUS:
+        return None
+    directives = parse_cache_control(headers.get('cache-control'))
+    if 'no-store' in directives or 'private' in directives:
+        return None
+    if 'set-cookie' in headers or headers.get('vary', '').strip() == '*':
+        return None
+    if 'no-cache' in directives:
+        return 0 if 'etag' in headers or 'last-modified' in headers else None
+    for name in ('s-maxage', 'max-age'):
+        if name in directives:
+            lifetime = parse_seconds(directives[name])
+            if lifetime is not None:
+                return lifetime
+    date = parse_http_date(headers.get('date')) or time.time()
+    expires = headers.get('expires')
+    if expires is not None:
+        #Expires yang tidak valid (mis. "0") berarti sudah kedaluwarsa
+        expires_at = parse_http_date(expires)
+        return max(0, int(expires_at - date)) if expires_at is not None else 0
+    last_modified = parse_http_date(headers.get('last-modified'))
+    if last_modified is not None:
+        return min(heuristic_max, max(0, int((date - last_modified) / 10)))
+    if 'etag' in headers:
+        return 0
+    return None
+
+
+class CachedResponse:
+    """Satu response yang disimpan: status, header end-to-end dan body.
+
+    Body ada di memori (body) atau di file tier disk (filename). stored
+    adalah waktu response diterima dan initial_age nilai header Age-nya;
+    keduanya dipakai menghitung Age saat dilayani.
+    """
+    __slots__ = ('key', 'path', 'status', 'reason', 'headers', 'body', 'filename', 'size',
+                 'stored', 'initial_age', 'lifetime', 'etag', 'last_modified', 'vary')
+
+    def __init__(self, key, path, status, reason, headers, body, lifetime, initial_age=0):
+        self.key = key
+        self.path = path
+        self.status = status
+        self.reason = reason
+        #list (nama, nilai) tanpa header hop-by-hop dan framing body
+        self.headers = headers
+        self.body = body
+        self.filename = None
+        self.size = len(body)
+        self.lifetime = lifetime
+        self.initial_age = initial_age
+        self.stored = time.time()
+        values = {name.lower(): value for name, value in headers}
+        self.etag = values.get('etag')
+        self.last_modified = values.get('last-modified')
+        self.vary = vary_names(values.get('vary'))
+
+    def age(self, now=None):
+        return int(self.initial_age + max(0.0, (now or time.time()) - self.stored))
+
+    def fresh(self, now=None):
+        return self.age(now) < self.lifetime
+
+    def refresh(self, headers, lifetime):
+        """Perbarui dari response 304: header baru menggantikan yang lama (RFC 7234 4.3.4)."""
+        updated = {name.lower(): (name, value) for name, value in headers}
+        merged = []
+        for name, value in self.headers:
+            merged.append(updated.pop(name.lower(), (name, value)))
+        self.headers = merged + list(updated.values())
+        values = {name.lower(): value for name, value in self.headers}
+        self.etag = values.get('etag')
+        self.last_modified = values.get('last-modified')
+        self.vary = vary_names(values.get('vary'))
+        self.lifetime = lifetime
+        self.initial_age = 0
+        self.stored = time.time()
+
+
+class ResponseCache:
+    """Cache response HTTP dua tier: memori lalu disk, masing-masing LRU dengan batas byte.
+
+    Object kecil (<= memory_object_size) masuk tier memori; object yang
+    tergusur dari memori, atau yang lebih besar, ditulis ke file di
+    directory. Key menyertakan nilai header yang disebut Vary response
+    terakhir untuk target yang sama. File cache lama di directory dihapus
+    saat start karena index-nya hanya ada di memori. Aman dipakai banyak thread; lock hanya
+    menjaga index, penulisan dan penghapusan file dikerjakan di luar lock
+    agar get() di thread event loop tidak ikut menunggu disk.
+    """
+    def __init__(self, memory_bytes=64 * 1024 * 1024, disk_bytes=1024 * 1024 * 1024, directory=None,
+                 max_object_size=16 * 1024 * 1024, memory_object_size=1024 * 1024):
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.max_object_size = max_object_size
+        self.memory_object_size = min(memory_object_size, memory_bytes)
+        if disk_bytes and directory is None:
+            directory = tempfile.mkdtemp(prefix='proxy-cache-')
+        elif disk_bytes:
+            os.makedirs(directory, exist_ok=True)
+            self._clear(directory)
+        self.directory = directory
+        self.memory = OrderedDict()
+        self.disk = OrderedDict()
+        #entry yang sedang ditulis ke disk; tetap bisa dilayani dari body-nya
+        self.pending = {}
+        self.memory_used = 0
+        self.disk_used = 0
+        #target -> nama header Vary (huruf kecil), path -> key untuk invalidasi
+        self.vary = {}
+        self.keys_by_path = {}
+        self.hits = 0
+        self.misses = 0
+        #nama file unik per penulisan, agar dua versi key yang sama tidak bertabrakan
+        self.serial = itertools.count()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _clear(directory):
+        """Hapus file tier disk sisa proses sebelumnya; file lain di directory tidak disentuh."""
+        for name in os.listdir(directory):
+            if CACHE_FILE.fullmatch(name):
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:
+                    pass
+
+    def key(self, target, headers, names=None):
+        """Key untuk request; names (Vary sebuah entry) menggantikan Vary terakhir untuk target."""
+        if names is None:
+            with self.lock:
+                names = self.vary.get(target, ())
+        return '\0'.join([target] + [headers.get(name, '').strip().lower() for name in names])
+
+    def get(self, key):
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                self.memory.move_to_end(key)
+            else:
+                entry = self.disk.get(key)
+                if entry is not None:
+                    self.disk.move_to_end(key)
+                else:
+                    entry = self.pending.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return entry
+
+    def vary_key(self, target, path, headers, request_headers):
+        """Catat Vary response untuk target dan kembalikan key entry-nya."""
+        names = vary_names(headers.get('vary'))
+        with self.lock:
+            self.vary[target] = names
+        return self.key(target, request_headers, names)
+
+    def put(self, entry):
+        """Simpan entry baru; body lebih besar dari max_object_size tidak disimpan.
+
+        Bisa menulis file, jadi front-end asinkron memanggilnya di executor.
+        """
+        if entry.size > self.max_object_size:
+            return False
+        with self.lock:
+            unlink = self._remove(entry.key)
+            self.keys_by_path.setdefault(entry.path, set()).add(entry.key)
+            if entry.size <= self.memory_object_size:
+                self.memory[entry.key] = entry
+                self.memory_used += entry.size
+                evicted = []
+                while self.memory_used > self.memory_bytes:
+                    _, old = self.memory.popitem(last=False)
+                    self.memory_used -= old.size
+                    evicted.append(old)
+            else:
+                evicted = [entry]
+            #yang dipindah ke disk hanya dipilih di sini; file-nya ditulis setelah lock dilepas
+            demote = []
+            for old in evicted:
+                if self.disk_bytes and old.size <= self.disk_bytes:
+                    self.pending[old.key] = old
+                    demote.append(old)
+                else:
+                    self._forget(old)
+        self._unlink(unlink)
+        for evicted in demote:
+            self._demote(evicted)
+        return True
+
+    def _demote(self, entry):
+        """Tulis entry (sudah di pending) ke file lalu pindahkan ke tier disk, di luar lock."""
+        name = hashlib.sha1(entry.key.encode('utf-8', 'surrogateescape')).hexdigest()
+        filename = os.path.join(self.directory, f"{name}-{next(self.serial)}")
+        #ditulis ke nama sementara lalu di-rename agar pembaca tidak pernah
+        #membuka file yang setengah jadi
+        tmp = filename + '.tmp'
+        try:
+            with open(tmp, 'wb') as f:
+                f.write(entry.body)
+            os.replace(tmp, filename)
+        except OSError:
+            self._unlink(tmp)
+            filename = None
+        unlink = []
+        with self.lock:
+            if self.pending.get(entry.key) is not entry:
+                #entry sudah diganti atau diinvalidasi selama ditulis
+                unlink.append(filename)
+            elif filename is None:
+                del self.pending[entry.key]
+                self._forget(entry)
+            else:
+                del self.pending[entry.key]
+                #filename diisi sebelum body dilepas: pembaca yang melihat
+                #body None selalu mendapati filename
+                entry.filename = filename
+                entry.body = None
+                self.disk[entry.key] = entry
+                self.disk_used += entry.size
+                while self.disk_used > self.disk_bytes:
+                    _, evicted = self.disk.popitem(last=False)
+                    self.disk_used -= evicted.size
+                    unlink.append(evicted.filename)
+                    self._forget(evicted)
+        for filename in unlink:
+            self._unlink(filename)
+
+    def _remove(self, key):
+        """Lepas key dari index; kembalikan file yang harus dihapus (di luar lock)."""
+        filename = None
+        entry = self.memory.pop(key, None)
+        if entry is not None:
+            self.memory_used -= entry.size
+        else:
+            entry = self.pending.pop(key, None)
+            if entry is None:
+                entry = self.disk.pop(key, None)
+                if entry is None:
+                    return None
+                self.disk_used -= entry.size
+                filename = entry.filename
+        self._forget(entry)
+        return filename
+
+    def _forget(self, entry):
+        keys = self.keys_by_path.get(entry.path)
+        if (keys is not None and entry.key not in self.memory and entry.key not in self.disk
+                and entry.key not in self.pending):
+            keys.discard(entry.key)
+            if not keys:
+                del self.keys_by_path[entry.path]
+
+    @staticmethod
+    def _unlink(filename):
+        #pembaca yang sudah membuka file tetap bisa menyelesaikan kirimannya
+        if filename is None:
+            return
+        try:
+            os.remove(filename)
+        except OSError:
+            pass
+
+    def invalidate(self, path):
+        """Buang semua entry (semua query dan varian) untuk path.
+
+        Menghapus file, jadi front-end asinkron memanggilnya di executor.
+        """
+        with self.lock:
+            unlink = [self._remove(key) for key in list(self.keys_by_path.get(path, ()))]
+        for filename in unlink:
+            self._unlink(filename)
+
+    def stats(self):
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'memory_entries': len(self.memory), 'memory_bytes': self.memory_used,
+                    'disk_entries': len(self.disk), 'disk_bytes': self.disk_used,
+                    'pending_entries': len(self.pending)}
@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import argparse
+import importlib
+from config import ServerConfig
+
+#satu titik masuk untuk semua model konkurensi:
+#   python3 server.py --model asyncio --port 8080
+#   python3 -m server --model prefork --processes 4 --workers 32 --docroot /srv/files
+#semua pengaturan masuk ke satu ServerConfig yang dibaca HttpServer di setiap
+#proses, jadi model yang berbeda bisa dibandingkan tanpa mengubah kode.
+
+MODELS = {
+    'thread': 'server_thread_http',
+    'thread-pool': 'server_thread_pool_http',
+    'process': 'server_process_http',
+    'process-pool': 'server_process_pool_http',
+    'prefork': 'server_prefork_http',
+    'asyncio': 'server_asyncio_stream_http',
+    'selectors': 'server_async_http',
+}
+
+#model yang bisa melayani TLS (handshake di worker, lihat HttpServer.secure);
+#reactor selectors belum mendukung socket TLS non-blocking
+TLS_MODELS = set(MODELS) - {'selectors'}
+
+
+def parse_size(text):
+    """Ukuran byte dengan sufiks opsional K, M atau G (basis 1024)."""
+    units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+    text = text.strip().upper().rstrip('B')
+    try:
+        if text and text[-1] in units:
+            return int(float(text[:-1]) * units[text[-1]])
+        return int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size '{text}'")
+
+
+def parse_args(argv=None):
+    d = ServerConfig.DEFAULTS
+    parser = argparse.ArgumentParser(description="Jalankan HTTP server dengan model konkurensi pilihan.")
+    parser.add_argument('--model', choices=sorted(MODELS), default=d['model'])
+    parser.add_argument('--host', default=d['host'])
+    parser.add_argument('--port', type=int, default=d['port'])
+    parser.add_argument('--tls', action='store_true', help="layani HTTPS dengan --certfile/--keyfile")
+    parser.add_argument('--certfile', default=d['certfile'])
+    parser.add_argument('--keyfile', default=d['keyfile'])
+    parser.add_argument('--tls-handshake-timeout', type=float, default=d['tls_handshake_timeout'])
+    parser.add_argument('--tls-ciphers', default=d['tls_ciphers'], help="suite TLS 1.2 (format OpenSSL)")
+    parser.add_argument('--tls-ecdh-curve', default=d['tls_ecdh_curve'], help="mis. prime256v1; default: grup bawaan OpenSSL")
+    parser.add_argument('--tls-session-tickets', type=int, default=d['tls_session_tickets'],
+                        help="session ticket TLS 1.3 per handshake, 0 untuk mematikan")
+    parser.add_argument('--workers', type=int, default=d['workers'],
+                        help="ukuran pool thread/proses (per proses untuk prefork)")
+    parser.add_argument('--processes', type=int, default=d['processes'], help="jumlah proses worker prefork")
+    parser.add_argument('--backlog', dest='listen_backlog', type=int, default=d['listen_backlog'])
+    parser.add_argument('--max-connections', type=int, default=d['max_connections'])
+    parser.add_argument('--max-pending', type=int, default=d['max_pending'],
+                        help="koneksi yang boleh menunggu worker sebelum dijawab 503")
+    parser.add_argument('--retry-after', type=int, default=d['retry_after'])
+    parser.add_argument('--recv-size', type=parse_size, default=d['recv_size'])
+    parser.add_argument('--upload-chunk-size', type=parse_size, default=d['upload_chunk_size'])
+    parser.add_argument('--max-header-size', type=parse_size, default=d['max_header_size'])
+    parser.add_argument('--docroot', dest='base_dir', default=d['base_dir'])
+    parser.add_argument('--cache-size', dest='cache_max_bytes', type=parse_size, default=d['cache_max_bytes'])
+    parser.add_argument('--cache-max-file-size', type=parse_size, default=d['cache_max_file_size'])
+    parser.add_argument('--keepalive-timeout', type=float, default=d['keepalive_timeout'])
+    parser.add_argument('--keepalive-max-requests', type=int, default=d['keepalive_max_requests'])
+    parser.add_argument('--access-log', default=d['access_log'], help="'-' untuk stderr, path file, atau 'off'")
+    parser.add_argument('--access-log-format', choices=['logfmt', 'json'], default=d['access_log_format'])
+    parser.add_argument('--access-log-sample', type=float, default=d['access_log_sample'],
+                        help="peluang request dicatat (0..1); 5xx selalu dicatat")
+    parser.add_argument('--access-log-debug', action='store_true',
+                        help="sertakan header request dan awal body response")
+    args = parser.parse_args(argv)
+    if args.tls and args.model not in TLS_MODELS:
+        parser.error(f"--tls is supported with --model {', '.join(sorted(TLS_MODELS))}")
+    for name in ('workers', 'processes', 'listen_backlog', 'max_connections', 'recv_size',
+                 'upload_chunk_size', 'max_header_size'):
+        if getattr(args, name) < 1:
+            parser.error(f"--{name.replace('_', '-')} must be at least 1")
+    if not 0 <= args.access_log_sample <= 1:
+        parser.error("--access-log-sample must be between 0 and 1")
+    return ServerConfig(**vars(args))
+
+
+def run(config):
+    #diekspor sebelum modul front-end diimpor: HttpServer di tingkat modul
+    #dan di setiap worker membaca config ini
+    config.export()
+    module = importlib.import_module(MODELS[config.model])
+    logging.warning("starting {} model on {}:{}".format(config.model, config.host, config.port))
+    if config.model in ('thread', 'process'):
+        svr = module.Server(config.port)
+        svr.start()
+        svr.join()
+    elif config.model == 'prefork':
+        module.Server(config.port, config.processes)
+    elif config.model == 'asyncio':
+        asyncio.run(module.Server(config.port))
+    elif config.model == 'selectors':
+        module.Server(config.port).run()
+    else:
+        module.Server(config.port)
+
+
+def main(argv=None):
+    run(parse_args(argv))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,51 +1,312 @@
+import os
 import socket
 import time
 import sys
-import asyncore
 import logging
-from http import HttpServer
+import selectors
+import tempfile
+from collections import deque
+from http import HttpServer, IOV_MAX
+from http_parser import HttpParser, HttpParseError, BodyReader
+
+#reactor single-thread berbasis selectors (epoll di Linux) pengganti asyncore,
+#yang sudah dihapus sejak Python 3.12. Semua socket non-blocking; HttpServer
+#dipanggil langsung dari loop ini.
 
 httpserver = HttpServer()
-rcv = ""
-
-class ProcessTheClient(asyncore.dispatcher_with_send):
-	def handle_read(self):
-		global rcv
-		data = self.recv(1024)
-		if data:
-			d = data.decode()
-			rcv = rcv + d
-			if rcv[-2:] == '\r\n':
-				# end of command, proses string
-				logging.warning("data dari client: {}".format(rcv))
-				hasil = httpserver.proses(rcv)
-				#hasil sudah dalam bentuk bytes
-				hasil = hasil + "\r\n\r\n".encode()
-				#agar bisa dioperasikan dengan string \r\n\r\n maka harus diencode dulu => bytes
-				logging.warning("balas ke  client: {}".format(hasil))
-				self.send(hasil) #hasil sudah dalam bentuk bytes, kirimkan balik ke client
-				rcv = ""
-				self.close()
-
-		#self.send('HTTP/1.1 200 OK \r\n\r\n'.encode())
-			#self.send("{}" . format(httpserver.proses(d)))
-		self.close()
-
-class Server(asyncore.dispatcher):
-	def __init__(self,portnumber):
-		asyncore.dispatcher.__init__(self)
-		self.create_socket(socket.AF_INET, socket.SOCK_STREAM)
-		self.set_reuse_addr()
-		self.bind(('',portnumber))
-		self.listen(1)
+
+#body yang lebih besar dari ini ditampung di file sementara, bukan di memori
+SPOOL_THRESHOLD = 256 * 1024
+#berhenti membaca dari client selama buffer-nya melebihi batas ini
+READ_HIGH_WATER = 1024 * 1024
+
+
+class FileBodyReader:
+	"""Body request yang sudah lengkap ditampung di file sementara."""
+	def __init__(self, fileobj, length):
+		self.fileobj = fileobj
+		self.remaining = length
+
+	def readinto(self, buf):
+		if self.remaining <= 0:
+			return 0
+		n = self.fileobj.readinto(memoryview(buf)[:min(len(buf), self.remaining)])
+		self.remaining -= n
+		return n
+
+	def read(self):
+		data = self.fileobj.read(self.remaining)
+		self.remaining = 0
+		return data
+
+	def drain(self):
+		self.remaining = 0
+
+
+class ProcessTheClient:
+	"""State satu koneksi: parser, request yang sedang dibaca dan antrian output.
+
+	Antrian output berisi potongan ('data', memoryview), ('file', fileobj,
+	offset, count), ('stream', iterator) untuk body yang panjangnya tidak
+	diketahui, dan ('done', response) yang dikirim sebanyak yang bisa
+	diterima socket; sisa kiriman parsial dilanjutkan saat socket writable.
+	"""
+	__slots__ = ('sock', 'address', 'parser', 'request', 'spool', 'out', 'served',
+				 'keep_alive', 'read_closed', 'closing', 'events', 'last_active')
+
+	def __init__(self, sock, address):
+		self.sock = sock
+		self.address = address
+		self.parser = HttpParser(httpserver.max_header_size)
+		self.request = None
+		self.spool = None
+		self.out = deque()
+		self.served = 0
+		self.keep_alive = True
+		self.read_closed = False
+		self.closing = False
+		self.events = 0
+		self.last_active = time.monotonic()
+
+
+class Server:
+	def __init__(self, portnumber):
+		self.selector = selectors.DefaultSelector()
+		self.my_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+		self.my_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+		self.my_socket.bind((httpserver.config.host, portnumber))
+		self.my_socket.listen(httpserver.listen_backlog)
+		self.my_socket.setblocking(False)
+		self.selector.register(self.my_socket, selectors.EVENT_READ, None)
+		self.the_clients = {}
+		self.recv_buffer = bytearray(httpserver.recv_size)
+		self.recv_view = memoryview(self.recv_buffer)
+		self.body_buffer = bytearray(httpserver.upload_chunk_size)
 		logging.warning("running on port {}" . format(portnumber))
 
+	def run(self):
+		last_sweep = time.monotonic()
+		while True:
+			for key, mask in self.selector.select(timeout=1.0):
+				if key.data is None:
+					self.handle_accept()
+					continue
+				client = key.data
+				try:
+					if mask & selectors.EVENT_READ:
+						self.handle_read(client)
+					if mask & selectors.EVENT_WRITE and not client.closing:
+						self.handle_write(client)
+				except OSError as e:
+					logging.error("Socket error from {}: {}".format(client.address, e))
+					self.close(client)
+			now = time.monotonic()
+			if now - last_sweep >= 1.0:
+				last_sweep = now
+				self.close_idle(now)
+
 	def handle_accept(self):
-		pair = self.accept()
-		if pair is not None:
-			sock, addr = pair
-			logging.warning("connection from {}" . format(repr(addr)))
-			handler = ProcessTheClient(sock)
+		while True:
+			try:
+				sock, addr = self.my_socket.accept()
+			except BlockingIOError:
+				return
+			if len(self.the_clients) >= httpserver.max_connections:
+				httpserver.reject(sock)
+				continue
+			sock.setblocking(False)
+			sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+			client = ProcessTheClient(sock, addr)
+			self.the_clients[sock.fileno()] = client
+			httpserver.connection_opened()
+			self.update_interest(client)
+
+	def handle_read(self, client):
+		try:
+			n = client.sock.recv_into(self.recv_buffer)
+		except (BlockingIOError, InterruptedError):
+			return
+		client.last_active = time.monotonic()
+		if n == 0:
+			#half-close: client selesai mengirim, tapi response yang
+			#tertunda tetap dikirim sebelum koneksi ditutup
+			client.read_closed = True
+		else:
+			client.parser.feed(self.recv_view[:n])
+		self.process(client)
+
+	def process(self, client):
+		"""Jalankan request yang sudah lengkap selama tidak ada output yang tertunda."""
+		while not client.out and not client.closing:
+			if client.request is None:
+				try:
+					client.request = client.parser.next_request()
+				except HttpParseError as e:
+					client.keep_alive = False
+					hasil = httpserver.response(e.kode, e.message, e.detail, {})
+					hasil.client = client.address
+					self.enqueue(client, hasil)
+					self.flush(client)
+					break
+				if client.request is None:
+					break
+				#body chunked tidak diketahui panjangnya, selalu ditampung ke file
+				if client.request.chunked or client.request.content_length > SPOOL_THRESHOLD:
+					client.spool = tempfile.TemporaryFile()
+
+			request = client.request
+			if client.spool is not None:
+				try:
+					while not client.parser.body_done:
+						n = client.parser.read_body(self.body_buffer)
+						if not n:
+							break
+						client.spool.write(memoryview(self.body_buffer)[:n])
+				except HttpParseError as e:
+					client.keep_alive = False
+					hasil = httpserver.response(e.kode, e.message, e.detail, {})
+					hasil.client = client.address
+					self.enqueue(client, hasil)
+					self.flush(client)
+					break
+				if not client.parser.body_done:
+					break
+				length = client.spool.tell()
+				client.spool.seek(0)
+				body = FileBodyReader(client.spool, length)
+			else:
+				if client.parser.buffered_body() < request.content_length:
+					break
+				body = BodyReader(client.parser)
+
+			client.served += 1
+			client.keep_alive = request.keep_alive and client.served < httpserver.keepalive_max_requests
+			hasil = httpserver.proses(request, body, client.keep_alive, client.address)
+			client.keep_alive = hasil.keep_alive
+			body.drain()
+			if client.spool is not None:
+				client.spool.close()
+				client.spool = None
+			client.request = None
+			self.enqueue(client, hasil)
+			self.flush(client)
+
+		if (client.closing or client.read_closed) and not client.out:
+			self.close(client)
+			return
+		self.update_interest(client)
+
+	def enqueue(self, client, hasil):
+		if hasil.stream is not None:
+			client.out.append(('data', memoryview(hasil.head())))
+			client.out.append(('stream', hasil.body_chunks()))
+		else:
+			#header dan body bytes tidak digabung; flush() mengirim potongan
+			#'data' yang berurutan dengan satu sendmsg
+			client.out.append(('data', memoryview(hasil.head())))
+			for part in hasil.parts:
+				if isinstance(part, tuple):
+					client.out.append(('file', hasil.fileobj, part[0], part[1]))
+				elif part:
+					client.out.append(('data', memoryview(part).cast('B')))
+		client.out.append(('done', hasil))
+
+	def handle_write(self, client):
+		self.flush(client)
+		if client.closing and not client.out:
+			self.close(client)
+		elif not client.out:
+			#response selesai; request pipelined berikutnya mungkin sudah di buffer
+			self.process(client)
+		else:
+			self.update_interest(client)
+
+	def flush(self, client):
+		"""Kirim antrian output sebanyak yang diterima socket tanpa memblok."""
+		out = client.out
+		try:
+			while out:
+				item = out[0]
+				if item[0] == 'data':
+					views = []
+					for entry in out:
+						if entry[0] != 'data' or len(views) == IOV_MAX:
+							break
+						views.append(entry[1])
+					sent = client.sock.sendmsg(views)
+					for view in views:
+						if sent < len(view):
+							out[0] = ('data', view[sent:])
+							break
+						sent -= len(view)
+						out.popleft()
+					else:
+						continue
+					break
+				elif item[0] == 'file':
+					_, fileobj, offset, count = item
+					if count:
+						sent = os.sendfile(client.sock.fileno(), fileobj.fileno(), offset, count)
+						if sent == 0:
+							raise ConnectionError("file shrank while sending")
+						if sent < count:
+							out[0] = ('file', fileobj, offset + sent, count - sent)
+							break
+				elif item[0] == 'stream':
+					#ambil potongan berikutnya hanya setelah potongan sebelumnya terkirim
+					chunk = next(item[1], None)
+					if chunk is not None:
+						out.appendleft(('data', memoryview(chunk)))
+						continue
+				else:
+					item[1].close()
+					if not client.keep_alive:
+						client.closing = True
+				out.popleft()
+		except (BlockingIOError, InterruptedError):
+			pass
+		client.last_active = time.monotonic()
+
+	def update_interest(self, client):
+		if client.closing and not client.out:
+			return
+		events = 0
+		if not client.read_closed and client.parser.buffered() < READ_HIGH_WATER:
+			events |= selectors.EVENT_READ
+		if client.out:
+			events |= selectors.EVENT_WRITE
+		if events == client.events:
+			return
+		if client.events == 0:
+			self.selector.register(client.sock, events, client)
+		elif events == 0:
+			self.selector.unregister(client.sock)
+		else:
+			self.selector.modify(client.sock, events, client)
+		client.events = events
+
+	def close_idle(self, now):
+		for client in list(self.the_clients.values()):
+			if now - client.last_active > httpserver.keepalive_timeout:
+				self.close(client)
+
+	def close(self, client):
+		fd = client.sock.fileno()
+		if fd == -1 or self.the_clients.get(fd) is not client:
+			return
+		del self.the_clients[fd]
+		httpserver.connection_closed(client.parser)
+		if client.events:
+			self.selector.unregister(client.sock)
+			client.events = 0
+		for item in client.out:
+			if item[0] == 'done':
+				item[1].close()
+		client.out.clear()
+		if client.spool is not None:
+			client.spool.close()
+		client.closing = True
+		client.sock.close()
 
 def main():
 	portnumber=8887
@@ -54,8 +315,7 @@ def main():
 	except:
 		pass
 	svr = Server(portnumber)
-	asyncore.loop()
+	svr.run()
 
 if __name__=="__main__":
 	main()
-
@@ -1,46 +1,244 @@
-from socket import *
 import socket
-import time
 import sys
 import logging
-import multiprocessing
-from concurrent.futures import ProcessPoolExecutor
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from http import HttpServer
+from http_parser import HttpParser, HttpParseError, BodyReader
 
 httpserver = HttpServer()
 
+#semua kerja filesystem yang blocking (open/stat/read/write/remove di http.py)
+#dijalankan di executor berukuran tetap, bukan di thread event loop
+FS_WORKERS = httpserver.config.workers
+#batas buffer baca per koneksi sebelum transport.pause_reading()
+READ_HIGH_WATER = 1024 * 1024
+READ_LOW_WATER = 256 * 1024
+WRITE_HIGH_WATER = 256 * 1024
+
+executor = ThreadPoolExecutor(FS_WORKERS, thread_name_prefix='fs')
+
+
+class AsyncioBodyReader(BodyReader):
+	"""BodyReader untuk handler yang berjalan di executor.
+
+	Setiap readinto() meminta event loop menyalin potongan body berikutnya
+	langsung ke buffer milik handler, jadi parser hanya disentuh dari thread
+	event loop dan memori per upload tetap satu chunk.
+	"""
+	def __init__(self, client, loop):
+		BodyReader.__init__(self, client.parser)
+		self.client = client
+		self.loop = loop
+
+	def readinto(self, buf):
+		if self.parser.body_done:
+			return 0
+		return asyncio.run_coroutine_threadsafe(self.client.read_body_into(buf), self.loop).result()
+
+
 class ProcessTheClient(asyncio.Protocol):
+		#dihitung di thread event loop saja, jadi tidak perlu lock
+		active = 0
+		in_executor = 0
+
 		def connection_made(self, transport):
-			peername = transport.get_extra_info('peername')
-			print('Connection from {}'.format(peername))
+			self.loop = asyncio.get_running_loop()
 			self.transport = transport
-			self.rcv = ""
+			self.address = transport.get_extra_info('peername')
+			transport.set_write_buffer_limits(high=WRITE_HIGH_WATER)
+			ssl_object = transport.get_extra_info('ssl_object')
+			if ssl_object is not None:
+				httpserver.tls_handshake_done(ssl_object)
+			sock = transport.get_extra_info('socket')
+			if sock is not None:
+				sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+			self.parser = HttpParser(httpserver.max_header_size)
+			self.eof = False
+			self.reading = True
+			self.data_waiter = None
+			self.write_waiter = None
+			self.admitted = ProcessTheClient.active < httpserver.max_connections
+			if not self.admitted:
+				transport.write(bytes(httpserver.overload_response()))
+				transport.close()
+				return
+			ProcessTheClient.active += 1
+			httpserver.connection_opened()
+			self.task = self.loop.create_task(self.serve())
+
 		def data_received(self, data: bytes) -> None:
+			self.parser.feed(data)
+			if self.reading and self.parser.buffered() > READ_HIGH_WATER:
+				#backpressure: berhenti membaca sampai handler mengonsumsi buffer
+				self.reading = False
+				self.transport.pause_reading()
+			self.wake_reader()
+
+		def eof_received(self):
+			self.eof = True
+			self.wake_reader()
+			#half-close (tetap bisa mengirim response) hanya untuk TCP biasa;
+			#transport SSL mengabaikan True dan memperingatkannya tiap koneksi
+			if self.transport.get_extra_info('sslcontext') is None:
+				return True
+			return None
+
+		def connection_lost(self, exc):
+			if self.admitted:
+				ProcessTheClient.active -= 1
+				httpserver.connection_closed(self.parser)
+			self.eof = True
+			self.wake_reader()
+			if self.write_waiter is not None and not self.write_waiter.done():
+				self.write_waiter.set_exception(ConnectionError("connection lost"))
+
+		def pause_writing(self):
+			self.write_waiter = self.loop.create_future()
+
+		def resume_writing(self):
+			if self.write_waiter is not None and not self.write_waiter.done():
+				self.write_waiter.set_result(None)
+			self.write_waiter = None
+
+		def wake_reader(self):
+			if self.data_waiter is not None and not self.data_waiter.done():
+				self.data_waiter.set_result(None)
+
+		async def wait_data(self):
+			if not self.reading and self.parser.buffered() < READ_LOW_WATER:
+				self.reading = True
+				self.transport.resume_reading()
+			self.data_waiter = self.loop.create_future()
+			try:
+				await asyncio.wait_for(self.data_waiter, httpserver.keepalive_timeout)
+			finally:
+				self.data_waiter = None
+
+		async def drain(self):
+			if self.write_waiter is not None:
+				await self.write_waiter
+			if self.transport.is_closing():
+				raise ConnectionError("connection closed while sending")
+
+		async def read_body_into(self, buf):
+			while True:
+				n = self.parser.read_body(buf)
+				if n or self.parser.body_done:
+					return n
+				if self.eof:
+					raise ConnectionError("client closed connection before the request body was complete")
+				await self.wait_data()
+
+		async def next_request(self):
+			while True:
+				try:
+					request = self.parser.next_request()
+				except HttpParseError as e:
+					hasil = httpserver.response(e.kode, e.message, e.detail, {})
+					hasil.client = self.address
+					await self.send(hasil)
+					return None
+				if request is not None or self.eof:
+					return request
+				await self.wait_data()
+
+		async def send(self, hasil):
+			try:
+				if hasil.stream is not None:
+					#body dibangkitkan di executor, dikirim per potongan begitu siap
+					self.transport.write(hasil.head())
+					chunks = hasil.body_chunks()
+					while True:
+						chunk = await self.loop.run_in_executor(executor, next, chunks, None)
+						if chunk is None:
+							break
+						self.transport.write(chunk)
+						await self.drain()
+					return
+				if hasil.fileobj is None:
+					#writelines: transport bisa mengirimnya dengan sendmsg tanpa menggabung
+					self.transport.writelines([hasil.head()] + hasil.parts)
+					await self.drain()
+					return
+				self.transport.write(hasil.head())
+				for part in hasil.parts:
+					if isinstance(part, tuple):
+						if not part[1]:
+							#loop.sendfile menolak count 0
+							continue
+						#loop.sendfile memakai os.sendfile bila bisa, fallback ke
+						#baca-tulis berpotongan (mis. TLS), keduanya menghormati flow control
+						await self.drain()
+						await self.loop.sendfile(self.transport, hasil.fileobj, part[0], part[1])
+					else:
+						self.transport.write(part)
+						await self.drain()
+			finally:
+				hasil.close()
+
+		async def serve(self):
+			served = 0
 			try:
-				d = data.decode()
-				self.rcv=self.rcv+d
-				if self.rcv[-2:]=='\r\n':
-					hasil = httpserver.proses(self.rcv)
-					hasil=hasil+"\r\n\r\n".encode()
-					self.transport.write(hasil)
-					self.transport.close()
-					self.rcv=""
-			except OSError as e:
+				while True:
+					request = await self.next_request()
+					if request is None:
+						break
+					served += 1
+					keep_alive = request.keep_alive and served < httpserver.keepalive_max_requests
+					if ProcessTheClient.in_executor >= FS_WORKERS + httpserver.max_pending:
+						#executor penuh: tolak cepat daripada menumpuk antrian tanpa batas
+						await self.send(httpserver.overload_response())
+						break
+					body = AsyncioBodyReader(self, self.loop)
+					ProcessTheClient.in_executor += 1
+					httpserver.metrics.inc('http_pool_busy_workers', pool='fs')
+					try:
+						hasil = await self.loop.run_in_executor(executor, httpserver.proses, request, body, keep_alive, self.address)
+					finally:
+						ProcessTheClient.in_executor -= 1
+						httpserver.metrics.inc('http_pool_busy_workers', -1, pool='fs')
+					await self.send(hasil)
+					if not hasil.keep_alive:
+						break
+					#body yang tidak dibaca handler dibuang agar request berikutnya sinkron
+					buf = bytearray(httpserver.upload_chunk_size)
+					while not self.parser.body_done:
+						await self.read_body_into(buf)
+			except asyncio.TimeoutError:
+				#koneksi idle melebihi keepalive_timeout
+				pass
+			except (ConnectionError, HttpParseError):
 				pass
+			except Exception as e:
+				logging.error(f"Error serving {self.address}: {e}")
+			finally:
+				self.transport.close()
 
 
 
-async def Server():
+async def Server(portnumber=8886):
 	loop = asyncio.get_running_loop()
+	httpserver.metrics.set('http_pool_workers', FS_WORKERS, pool='fs')
 
+	#dengan TLS, handshake berjalan di event loop per koneksi dan dibatasi
+	#ssl_handshake_timeout, jadi tidak pernah memblok accept
+	tls_options = {}
+	if httpserver.ssl_context is not None:
+		tls_options = {'ssl': httpserver.ssl_context, 'ssl_handshake_timeout': httpserver.tls_handshake_timeout}
 	server = await loop.create_server(
 		lambda: ProcessTheClient(),
-		'0.0.0.0', 8886)
+		httpserver.config.host, portnumber, backlog=httpserver.listen_backlog, reuse_address=True,
+		**tls_options)
+	logging.warning("running on port {}".format(portnumber))
 
 	async with server:
 		await server.serve_forever()
 
 if __name__=="__main__":
-	asyncio.run(Server())
-
+	portnumber = 8886
+	try:
+		portnumber = int(sys.argv[1])
+	except (IndexError, ValueError):
+		pass
+	asyncio.run(Server(portnumber))
@@ -0,0 +1,90 @@
+import os
+import socket
+import time
+import sys
+import logging
+import threading
+import multiprocessing
+from multiprocessing.connection import wait
+from concurrent.futures import ThreadPoolExecutor
+from server_thread_pool_http import ProcessTheClient, httpserver
+
+#mode pre-fork: N proses worker (default satu per core) yang masing-masing
+#menjalankan accept loop sendiri. Tidak ada socket yang dipickle antar proses
+#dan parent tidak menjadi titik serialisasi; parent hanya mengawasi worker
+#dan menjalankan ulang worker yang mati.
+
+WORKER_THREADS = httpserver.config.workers
+
+
+def make_listener(port, reuseport):
+    my_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    my_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuseport:
+        #setiap worker punya antrian accept sendiri, kernel yang membagi koneksi
+        my_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    my_socket.bind((httpserver.config.host, port))
+    my_socket.listen(httpserver.listen_backlog)
+    return my_socket
+
+
+def Worker(port, listener):
+    if listener is None:
+        listener = make_listener(port, True)
+    logging.warning("worker {} accepting on port {}".format(os.getpid(), port))
+
+    #thread pool per worker supaya koneksi keep-alive tidak memblok accept;
+    #antriannya dibatasi seperti server thread pool
+    slots = threading.BoundedSemaphore(min(httpserver.max_connections, WORKER_THREADS + httpserver.max_pending))
+    httpserver.metrics.set('http_pool_workers', WORKER_THREADS, pool='connections')
+    with ThreadPoolExecutor(WORKER_THREADS) as executor:
+        while True:
+            connection, client_address = listener.accept()
+            if not slots.acquire(blocking=False):
+                httpserver.reject(connection)
+                continue
+            httpserver.metrics.inc('http_connections_queued')
+            p = executor.submit(ProcessTheClient, connection, client_address)
+            p.add_done_callback(lambda f: slots.release())
+
+
+def Server(port, workers):
+    reuseport = hasattr(socket, 'SO_REUSEPORT')
+    #tanpa SO_REUSEPORT, semua worker mewarisi satu listening socket dari parent
+    listener = None if reuseport else make_listener(port, False)
+    #/metrics di worker mana pun menggabungkan snapshot semua worker
+    httpserver.metrics.enable_multiprocess()
+    the_workers = {}
+
+    def spawn(slot):
+        p = multiprocessing.Process(target=Worker, args=(port, listener), daemon=True)
+        p.start()
+        the_workers[p.sentinel] = (slot, p, time.monotonic())
+
+    for slot in range(workers):
+        spawn(slot)
+    logging.warning("pre-fork server running on port {} with {} workers".format(port, workers))
+
+    while True:
+        for sentinel in wait(list(the_workers)):
+            slot, p, started = the_workers.pop(sentinel)
+            p.join()
+            logging.warning("worker {} (pid {}) exited with code {}, restarting".format(slot, p.pid, p.exitcode))
+            #hindari restart beruntun jika worker langsung mati (mis. port dipakai)
+            if time.monotonic() - started < 1:
+                time.sleep(1)
+            spawn(slot)
+
+
+def main():
+    portnumber = 8888
+    workers = httpserver.config.processes
+    try:
+        portnumber = int(sys.argv[1])
+        workers = int(sys.argv[2])
+    except (IndexError, ValueError):
+        pass
+    Server(portnumber, workers)
+
+if __name__=="__main__":
+    main()
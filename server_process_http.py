@@ -2,7 +2,6 @@ from socket import *
 import socket
 import time
 import sys
-import logging
 import multiprocessing
 from http import HttpServer
 
@@ -10,63 +9,60 @@ httpserver = HttpServer()
 
 
 class ProcessTheClient(multiprocessing.Process):
-	def __init__(self, connection, address):
+	def __init__(self, connection, address, slots=None):
 		self.connection = connection
 		self.address = address
+		self.slots = slots
 		multiprocessing.Process.__init__(self)
 
 	def run(self):
-		rcv=""
-		while True:
-			try:
-				data = self.connection.recv(32)
-				if data:
-					#merubah input dari socket (berupa bytes) ke dalam string
-					#agar bisa mendeteksi \r\n
-					d = data.decode()
-					rcv=rcv+d
-					if rcv[-2:]=='\r\n':
-						#end of command, proses string
-						#logging.warning("data dari client: {}" . format(rcv))
-						hasil = httpserver.proses(rcv)
-						#hasil akan berupa bytes
-						#untuk bisa ditambahi dengan string, maka string harus di encode
-						hasil=hasil+"\r\n\r\n".encode()
-						#logging.warning("balas ke  client: {}" . format(hasil))
-						#hasil sudah dalam bentuk bytes
-						self.connection.sendall(hasil)
-						rcv=""
-						self.connection.close()
-				else:
-					break
-			except OSError as e:
-				pass
-		self.connection.close()
+		#parser incremental bersama (bytes, bukan str) ada di HttpServer.handle_connection
+		try:
+			httpserver.handle_connection(self.connection, self.address)
+			#proses ini selesai setelah satu koneksi; counter-nya dilipat ke archive
+			httpserver.metrics.retire()
+			#proses multiprocessing keluar lewat os._exit tanpa atexit
+			httpserver.access_log.stop()
+		finally:
+			if self.slots is not None:
+				self.slots.release()
 
 
 
 class Server(multiprocessing.Process):
-	def __init__(self):
-		self.the_clients = []
+	def __init__(self,portnumber=8889):
+		self.portnumber = portnumber
+		#semaphore di shared memory: proses anak melepas slot-nya sendiri saat
+		#selesai, dan multiprocessing sendiri yang me-reap proses yang sudah keluar
+		self.slots = multiprocessing.BoundedSemaphore(httpserver.max_connections)
 		self.my_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
 		self.my_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
 		multiprocessing.Process.__init__(self)
 
 	def run(self):
-		self.my_socket.bind(('0.0.0.0', 8889))
-		self.my_socket.listen(1)
+		httpserver.metrics.enable_multiprocess()
+		self.my_socket.bind((httpserver.config.host, self.portnumber))
+		self.my_socket.listen(httpserver.listen_backlog)
 		while True:
 			self.connection, self.client_address = self.my_socket.accept()
-			logging.warning("connection from {}".format(self.client_address))
-
-			clt = ProcessTheClient(self.connection, self.client_address)
+			if not self.slots.acquire(block=False):
+				httpserver.reject(self.connection)
+				continue
+			clt = ProcessTheClient(self.connection, self.client_address, self.slots)
 			clt.start()
-			self.the_clients.append(clt)
+			#proses anak sudah punya salinan socket; salinan di parent harus
+			#ditutup agar koneksi benar-benar tertutup saat anak selesai
+			self.connection.close()
 
 
 
 def main():
-	svr = Server()
+	portnumber = 8889
+	try:
+		portnumber = int(sys.argv[1])
+	except (IndexError, ValueError):
+		pass
+	svr = Server(portnumber)
 	svr.start()
 
 if __name__=="__main__":
@@ -3,70 +3,57 @@ import socket
 import threading
 import time
 import sys
-import logging
 from http import HttpServer
 
 httpserver = HttpServer()
 
 
 class ProcessTheClient(threading.Thread):
-	def __init__(self, connection, address):
+	def __init__(self, connection, address, slots=None):
 		self.connection = connection
 		self.address = address
+		self.slots = slots
 		threading.Thread.__init__(self)
 
 	def run(self):
-		rcv=""
-		while True:
-			try:
-				data = self.connection.recv(32)
-				if data:
-					#merubah input dari socket (berupa bytes) ke dalam string
-					#agar bisa mendeteksi \r\n
-					d = data.decode()
-					rcv=rcv+d
-					if rcv[-2:]=='\r\n':
-						#end of command, proses string
-						logging.warning("data dari client: {}" . format(rcv))
-						hasil = httpserver.proses(rcv)
-						#hasil akan berupa bytes
-						#untuk bisa ditambahi dengan string, maka string harus di encode
-						hasil=hasil+"\r\n\r\n".encode()
-						logging.warning("balas ke  client: {}" . format(hasil))
-						#hasil sudah dalam bentuk bytes
-						self.connection.sendall(hasil)
-						rcv=""
-						self.connection.close()
-				else:
-					break
-			except OSError as e:
-				pass
-		self.connection.close()
+		#parser incremental bersama (bytes, bukan str) ada di HttpServer.handle_connection
+		try:
+			httpserver.handle_connection(self.connection, self.address)
+		finally:
+			if self.slots is not None:
+				self.slots.release()
 
 
 
 class Server(threading.Thread):
-	def __init__(self):
-		self.the_clients = []
+	def __init__(self,portnumber=8889):
+		self.portnumber = portnumber
+		#satu slot per koneksi aktif; thread yang selesai melepas slot-nya sendiri
+		self.slots = threading.BoundedSemaphore(httpserver.max_connections)
 		self.my_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
 		self.my_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
 		threading.Thread.__init__(self)
 
 	def run(self):
-		self.my_socket.bind(('0.0.0.0', 8889))
-		self.my_socket.listen(1)
+		self.my_socket.bind((httpserver.config.host, self.portnumber))
+		self.my_socket.listen(httpserver.listen_backlog)
 		while True:
 			self.connection, self.client_address = self.my_socket.accept()
-			logging.warning("connection from {}".format(self.client_address))
-
-			clt = ProcessTheClient(self.connection, self.client_address)
+			if not self.slots.acquire(blocking=False):
+				httpserver.reject(self.connection)
+				continue
+			clt = ProcessTheClient(self.connection, self.client_address, self.slots)
 			clt.start()
-			self.the_clients.append(clt)
 
 
 
 def main():
-	svr = Server()
+	portnumber = 8889
+	try:
+		portnumber = int(sys.argv[1])
+	except (IndexError, ValueError):
+		pass
+	svr = Server(portnumber)
 	svr.start()
 
 if __name__=="__main__":
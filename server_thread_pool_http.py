@@ -1,105 +1,67 @@
 from socket import *
 import socket
 import time
+import threading
 import sys
-import logging
 import multiprocessing
 from concurrent.futures import ThreadPoolExecutor
 from http import HttpServer
 
 httpserver = HttpServer()
 
+POOL_WORKERS = httpserver.config.workers
+
 #untuk menggunakan threadpool executor, karena tidak mendukung subclassing pada process,
 #maka class ProcessTheClient dirubah dulu menjadi function, tanpda memodifikasi behaviour didalamnya
 
 def ProcessTheClient(connection,address):
-    rcv_buffer = b""
-    content_length = 0
-    headers_parsed = False
-
-    while True:
-        try:
-            data = connection.recv(4096)
-            if not data:
-                break
-
-            rcv_buffer += data
-
-            if not headers_parsed:
-                eoh_marker = b"\r\n\r\n"
-                eoh_pos = rcv_buffer.find(eoh_marker)
-
-                if eoh_pos != -1:
-                    headers_part_bytes = rcv_buffer[:eoh_pos]
-                    
-                    try:
-                        headers_part_str = headers_part_bytes.decode('utf-8', errors='ignore')
-                        
-                        for line in headers_part_str.split('\r\n'):
-                            if line.lower().startswith('content-length:'):
-                                try:
-                                    content_length = int(line.split(':', 1)[1].strip())
-                                    break
-                                except ValueError:
-                                    logging.error("Invalid Content-Length header.")
-                                    connection.sendall(b"HTTP/1.0 400 Bad Request\r\nContent-Length: 26\r\n\r\nInvalid Content-Length\r\n\r\n")
-                                    connection.close()
-                                    return
-                        headers_parsed = True
-                    except UnicodeDecodeError:
-                        logging.error("Could not decode headers part.")
-                        connection.sendall(b"HTTP/1.0 400 Bad Request\r\nContent-Length: 23\r\n\r\nMalformed headers\r\n\r\n")
-                        connection.close()
-                        return
-
-            if headers_parsed:
-                expected_total_len = eoh_pos + len(eoh_marker) + content_length
-                
-                if len(rcv_buffer) >= expected_total_len:
-                    
-                    hasil = httpserver.proses(rcv_buffer)
-                    connection.sendall(hasil)
-                    connection.close()
-                    return
-
-        except OSError as e:
-            logging.error(f"Socket error in ProcessTheClient: {e}")
-            break
-        except Exception as e:
-            logging.error(f"General error in ProcessTheClient: {e}")
-            import traceback
-            traceback.print_exc()
-            break
-    
-    connection.close()
-    return
-
-
-
-def Server():
-	the_clients = []
+    #parsing request, keep-alive dan pipelining ditangani bersama oleh
+    #HttpServer.handle_connection untuk semua front-end
+    httpserver.metrics.inc('http_connections_queued', -1)
+    httpserver.metrics.inc('http_pool_busy_workers', pool='connections')
+    try:
+        httpserver.handle_connection(connection, address)
+    finally:
+        httpserver.metrics.inc('http_pool_busy_workers', -1, pool='connections')
+        #hanya menulis snapshot bila berjalan sebagai worker multi-proses (pre-fork)
+        httpserver.metrics.flush()
+
+
+
+def Server(portnumber=8885):
 	my_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
 	my_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
 
-	my_socket.bind(('0.0.0.0', 8885))
-	my_socket.listen(1)
+	my_socket.bind((httpserver.config.host, portnumber))
+	my_socket.listen(httpserver.listen_backlog)
+
+	#antrian executor dibatasi: koneksi yang sedang dilayani ditambah paling
+	#banyak max_pending yang menunggu worker; sisanya langsung dijawab 503
+	slots = threading.BoundedSemaphore(min(httpserver.max_connections, POOL_WORKERS + httpserver.max_pending))
 
-	with ThreadPoolExecutor(20) as executor:
+	#jumlah koneksi aktif/antri dan utilisasi pool ada di /metrics
+	httpserver.metrics.set('http_pool_workers', POOL_WORKERS, pool='connections')
+	with ThreadPoolExecutor(POOL_WORKERS) as executor:
 		while True:
 				connection, client_address = my_socket.accept()
-				logging.warning("connection from {}".format(client_address))
+				if not slots.acquire(blocking=False):
+					httpserver.reject(connection)
+					continue
+				httpserver.metrics.inc('http_connections_queued')
 				p = executor.submit(ProcessTheClient, connection, client_address)
-				the_clients.append(p)
-				#menampilkan jumlah process yang sedang aktif
-				jumlah = ['x' for i in the_clients if i.running()==True]
-				print(jumlah)
+				p.add_done_callback(lambda f: slots.release())
 
 
 
 
 
 def main():
-	Server()
+	portnumber = 8885
+	try:
+		portnumber = int(sys.argv[1])
+	except (IndexError, ValueError):
+		pass
+	Server(portnumber)
 
 if __name__=="__main__":
 	main()
@@ -1,66 +1,418 @@
-from socket import *
+import os
+import fcntl
+import errno
 import socket
-import threading
-import time
-import sys
 import logging
+import argparse
+import signal
+import asyncio
+import resource
+import selectors
+from balancer import Backend, Balancer, HealthChecker, STRATEGIES
+from proxy_cache import ResponseCache
+from access_log import AccessLog
+from server import parse_size
+import http_proxy
 
+#relay TCP dua arah berbasis reactor selectors (epoll di Linux), seperti
+#server_async_http.py. Setiap arah (client -> backend dan backend -> client)
+#dipompa sendiri: data hanya dibaca selama buffer arah itu masih punya ruang,
+#jadi sisi tujuan yang lambat menahan pengirimnya (backpressure) tanpa
+#menumpuk memori. Di Linux data dipindah dengan os.splice lewat pipe, tanpa
+#disalin ke userspace; tanpa splice dipakai buffer tetap per arah dengan
+#recv_into/memoryview. Half-close diteruskan: EOF dari satu sisi menjadi
+#shutdown(SHUT_WR) ke sisi lain setelah semua datanya terkirim.
+#
+#Koneksi dibagi ke beberapa backend lewat balancer.Balancer (round-robin,
+#least-connections atau consistent-hash). Balancing per koneksi TCP: untuk
+#consistent-hash, path request pertama diintip dengan MSG_PEEK sebelum
+#backend dipilih, dan request keep-alive berikutnya ikut ke backend yang sama.
+#
+#Dengan --cache proxy berjalan sebagai reverse proxy HTTP yang memparse
+#request dan menyimpan response GET (lihat http_proxy.py); backend lalu
+#dipilih per request, bukan per koneksi.
 
+BUFFER_SIZE = 256 * 1024
+#batas byte yang diintip untuk mencari request line
+PEEK_SIZE = 8192
+SPLICE_FLAGS = getattr(os, 'SPLICE_F_MOVE', 0) | getattr(os, 'SPLICE_F_NONBLOCK', 0)
 
-class ProcessTheClient(threading.Thread):
-	def __init__(self, connection, address, destination_sock_address):
-		self.destination_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-		self.destination_sock.connect(destination_sock_address)
-		self.connection = connection
-		self.address = address
-		threading.Thread.__init__(self)
 
-	def run(self):
-		rcv=""
-		while True:
+class Pump:
+	"""Satu arah relay, dari src ke dst, lewat pipe splice atau buffer userspace."""
+	__slots__ = ('src', 'dst', 'pipe', 'buf', 'view', 'start', 'end', 'capacity',
+				 'pending', 'full', 'eof', 'shut')
+
+	def __init__(self, src, dst, use_splice, buffer_size):
+		self.src = src
+		self.dst = dst
+		self.pipe = None
+		self.buf = self.view = None
+		self.start = self.end = 0
+		#byte yang sudah dibaca dari src tapi belum terkirim ke dst
+		self.pending = 0
+		#pipe menolak splice (slot penuh) walau pending < capacity
+		self.full = False
+		#src sudah EOF / dst sudah di-shutdown(SHUT_WR)
+		self.eof = False
+		self.shut = False
+		if use_splice:
+			self.pipe = os.pipe2(os.O_NONBLOCK | os.O_CLOEXEC)
 			try:
-				data = self.connection.recv(8192)
-				if data:
-					self.destination_sock.sendall(data)
-					data_balasan = self.destination_sock.recv(8192)
-					self.connection.sendall(data_balasan)
-					logging.warning(data)
-					logging.warning(data_balasan)
+				self.capacity = fcntl.fcntl(self.pipe[1], fcntl.F_SETPIPE_SZ, buffer_size)
+			except OSError:
+				#melebihi /proc/sys/fs/pipe-max-size, pakai ukuran default
+				self.capacity = fcntl.fcntl(self.pipe[1], fcntl.F_GETPIPE_SZ)
+		else:
+			self.buf = bytearray(buffer_size)
+			self.view = memoryview(self.buf)
+			self.capacity = buffer_size
+
+	def wants_read(self):
+		if self.eof or self.full:
+			return False
+		if self.pipe is not None:
+			return self.pending < self.capacity
+		return self.end < self.capacity
 
+	def fill(self):
+		"""Baca dari src sebanyak ruang yang ada; EOF menandai eof."""
+		try:
+			if self.pipe is not None:
+				n = os.splice(self.src.fileno(), self.pipe[1], self.capacity - self.pending, flags=SPLICE_FLAGS)
+			else:
+				n = self.src.recv_into(self.view[self.end:])
+				self.end += n
+		except (BlockingIOError, InterruptedError):
+			if self.pending:
+				self.full = True
+			return
+		if n == 0:
+			self.eof = True
+		self.pending += n
+
+	def flush(self):
+		"""Kirim data tertunda ke dst tanpa memblok; shutdown dst setelah EOF src."""
+		try:
+			while self.pending:
+				if self.pipe is not None:
+					n = os.splice(self.pipe[0], self.dst.fileno(), self.pending, flags=SPLICE_FLAGS)
 				else:
-					break
-			except OSError as e:
-				pass
-		self.connection.close()
+					n = self.dst.send(self.view[self.start:self.end])
+					self.start += n
+				self.pending -= n
+				self.full = False
+		except (BlockingIOError, InterruptedError):
+			pass
+		if not self.pending:
+			self.start = self.end = 0
+			if self.eof and not self.shut:
+				self.shut = True
+				self.dst.shutdown(socket.SHUT_WR)
+
+	def close(self):
+		if self.pipe is not None:
+			os.close(self.pipe[0])
+			os.close(self.pipe[1])
+			self.pipe = None
 
 
+class ProcessTheClient:
+	"""Satu tunnel: socket client, socket backend dan dua Pump.
 
-class Server(threading.Thread):
-	def __init__(self):
-		self.the_clients = []
+	upstream bernilai None selama backend belum dipilih; saat connect ke
+	satu backend gagal, upstream diganti socket ke backend lain (tried).
+	"""
+	__slots__ = ('client', 'upstream', 'address', 'forward', 'backward', 'connected',
+				 'backend', 'key', 'tried', 'client_events', 'upstream_events')
+
+	def __init__(self, client, address, use_splice, buffer_size):
+		self.client = client
+		self.address = address
+		self.upstream = None
+		self.forward = Pump(client, None, use_splice, buffer_size)
+		self.backward = Pump(None, client, use_splice, buffer_size)
+		self.connected = False
+		self.backend = None
+		#key consistent-hash (path request pertama)
+		self.key = None
+		self.tried = set()
+		self.client_events = 0
+		self.upstream_events = 0
+
+	def attach(self, upstream, backend):
+		"""Pasang socket backend; belum ada data yang mengalir ke upstream sebelumnya."""
+		self.upstream = self.forward.dst = self.backward.src = upstream
+		self.backend = backend
+		self.tried.add(backend)
+		self.connected = False
+
+	@property
+	def finished(self):
+		return self.forward.shut and self.backward.shut
+
+	def handle(self, sock, mask):
+		if mask & selectors.EVENT_READ:
+			pump = self.forward if sock is self.client else self.backward
+			pump.fill()
+			#langsung coba kirim, biasanya tujuan writable dan satu putaran
+			#select bisa dihemat
+			pump.flush()
+		if mask & selectors.EVENT_WRITE:
+			(self.backward if sock is self.client else self.forward).flush()
+
+	def events(self):
+		"""Interest (client, upstream) sesuai ruang buffer dan data tertunda."""
+		if self.upstream is None:
+			#menunggu request line untuk memilih backend
+			return selectors.EVENT_READ, 0
+		if not self.connected:
+			return 0, selectors.EVENT_WRITE
+		client = upstream = 0
+		if self.forward.wants_read():
+			client |= selectors.EVENT_READ
+		if self.backward.pending:
+			client |= selectors.EVENT_WRITE
+		if self.backward.wants_read():
+			upstream |= selectors.EVENT_READ
+		if self.forward.pending:
+			upstream |= selectors.EVENT_WRITE
+		return client, upstream
+
+	def close(self):
+		self.forward.close()
+		self.backward.close()
+		self.client.close()
+		if self.upstream is not None:
+			self.upstream.close()
+
+
+class Server:
+	def __init__(self, portnumber=18000, balancer=None, use_splice=True,
+				 buffer_size=BUFFER_SIZE, max_tunnels=10000, host='0.0.0.0'):
+		self.balancer = balancer or Balancer([Backend(('localhost', 8889))])
+		self.use_splice = use_splice and hasattr(os, 'splice')
+		self.buffer_size = buffer_size
+		self.max_tunnels = max_tunnels
+		self.selector = selectors.DefaultSelector()
 		self.my_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
 		self.my_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-
-		self.destination_sock_address = ('localhost',8889)
-		threading.Thread.__init__(self)
+		self.my_socket.bind((host, portnumber))
+		self.my_socket.listen(1024)
+		self.my_socket.setblocking(False)
+		self.selector.register(self.my_socket, selectors.EVENT_READ, None)
+		self.the_tunnels = set()
+		logging.warning("proxy on port {} -> {} ({}, {})".format(
+			portnumber, ', '.join(b.name for b in self.balancer.backends), self.balancer.strategy,
+			'splice' if self.use_splice else 'buffered'))
 
 	def run(self):
-		self.my_socket.bind(('0.0.0.0', 18000))
-		self.my_socket.listen(1)
 		while True:
-			self.connection, self.client_address = self.my_socket.accept()
-			logging.warning("connection from {}".format(self.client_address))
+			for key, mask in self.selector.select():
+				if key.data is None:
+					self.handle_accept()
+					continue
+				tunnel = key.data
+				if tunnel not in self.the_tunnels:
+					#sudah ditutup oleh event sebelumnya di putaran ini
+					continue
+				try:
+					if tunnel.upstream is None:
+						self.route(tunnel)
+					elif key.fileobj is tunnel.upstream and not tunnel.connected:
+						self.handle_connect(tunnel)
+					else:
+						tunnel.handle(key.fileobj, mask)
+				except OSError as e:
+					if e.errno not in (errno.ECONNRESET, errno.EPIPE, errno.ENOTCONN):
+						logging.error("Tunnel error from {}: {}".format(tunnel.address, e))
+					self.close(tunnel)
+					continue
+				if tunnel.finished:
+					self.close(tunnel)
+				elif tunnel in self.the_tunnels:
+					self.update_interest(tunnel)
 
-			clt = ProcessTheClient(self.connection, self.client_address,self.destination_sock_address)
-			clt.start()
-			self.the_clients.append(clt)
+	def handle_accept(self):
+		while True:
+			try:
+				sock, addr = self.my_socket.accept()
+			except BlockingIOError:
+				return
+			except OSError as e:
+				#mis. EMFILE: biarkan koneksi di backlog sampai ada fd bebas
+				logging.error("accept failed: {}".format(e))
+				return
+			if len(self.the_tunnels) >= self.max_tunnels:
+				sock.close()
+				continue
+			sock.setblocking(False)
+			sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+			try:
+				tunnel = ProcessTheClient(sock, addr, self.use_splice, self.buffer_size)
+			except OSError as e:
+				#mis. pipe tidak bisa dibuat karena fd habis
+				logging.error("cannot open tunnel for {}: {}".format(addr, e))
+				sock.close()
+				continue
+			self.the_tunnels.add(tunnel)
+			if self.balancer.needs_key:
+				#backend dipilih setelah request line terbaca, lihat route()
+				self.update_interest(tunnel)
+			else:
+				self.connect(tunnel)
+
+	def route(self, tunnel):
+		"""Intip request line tanpa mengonsumsinya, lalu pilih backend dari path-nya."""
+		data = tunnel.client.recv(PEEK_SIZE, socket.MSG_PEEK)
+		if not data:
+			self.close(tunnel)
+			return
+		line = data.split(b"\r\n", 1)[0].split(b" ")
+		tunnel.key = (line[1] if len(line) >= 2 else line[0]).split(b"?", 1)[0].decode('latin-1')
+		self.connect(tunnel)
+
+	def connect(self, tunnel):
+		"""Mulai connect non-blocking ke backend berikutnya; tutup tunnel bila semua gagal."""
+		if tunnel.backend is not None:
+			tunnel.backend.active -= 1
+		while True:
+			backend = self.balancer.choose(tunnel.key, tunnel.tried)
+			if backend is None:
+				logging.error("no backend available for {}".format(tunnel.address))
+				tunnel.backend = None
+				self.close(tunnel)
+				return
+			upstream = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+			upstream.setblocking(False)
+			upstream.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+			err = upstream.connect_ex(backend.address)
+			if err in (0, errno.EINPROGRESS):
+				break
+			upstream.close()
+			tunnel.tried.add(backend)
+			self.connect_failed(backend)
+		self.set_upstream(tunnel, upstream, backend)
+		backend.active += 1
+		backend.total += 1
+		self.update_interest(tunnel)
+
+	def handle_connect(self, tunnel):
+		#connect non-blocking selesai saat socket writable
+		err = tunnel.upstream.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+		if not err:
+			tunnel.connected = True
+			tunnel.backend.record_success(self.balancer.rise)
+			return
+		logging.warning("connect to {} failed: {}".format(tunnel.backend.name, os.strerror(err)))
+		self.connect_failed(tunnel.backend)
+		#coba backend lain; belum ada byte client yang terkirim ke backend ini
+		self.connect(tunnel)
+
+	def connect_failed(self, backend):
+		backend.connect_failures += 1
+		backend.record_failure(self.balancer.fall)
 
+	def set_upstream(self, tunnel, upstream, backend):
+		if tunnel.upstream is not None:
+			if tunnel.upstream_events:
+				self.selector.unregister(tunnel.upstream)
+				tunnel.upstream_events = 0
+			tunnel.upstream.close()
+		tunnel.attach(upstream, backend)
 
+	def update_interest(self, tunnel):
+		client, upstream = tunnel.events()
+		tunnel.client_events = self.set_interest(tunnel.client, tunnel.client_events, client, tunnel)
+		if tunnel.upstream is not None:
+			tunnel.upstream_events = self.set_interest(tunnel.upstream, tunnel.upstream_events, upstream, tunnel)
 
-def main():
-	svr = Server()
-	svr.start()
+	def set_interest(self, sock, current, events, tunnel):
+		if events == current:
+			return events
+		if current == 0:
+			self.selector.register(sock, events, tunnel)
+		elif events == 0:
+			self.selector.unregister(sock)
+		else:
+			self.selector.modify(sock, events, tunnel)
+		return events
+
+	def close(self, tunnel):
+		if tunnel not in self.the_tunnels:
+			return
+		self.the_tunnels.discard(tunnel)
+		if tunnel.backend is not None:
+			tunnel.backend.active -= 1
+		if tunnel.client_events:
+			self.selector.unregister(tunnel.client)
+		if tunnel.upstream_events:
+			self.selector.unregister(tunnel.upstream)
+		tunnel.client_events = tunnel.upstream_events = 0
+		tunnel.close()
+
+	def log_stats(self, *args):
+		for stats in self.balancer.stats():
+			logging.warning("backend {backend}: healthy={healthy} active={active} total={total} "
+							"connect_failures={connect_failures}".format(**stats))
+
+
+def raise_fd_limit():
+	"""Naikkan batas fd ke batas hard: setiap tunnel butuh 2 socket (+4 fd pipe dengan splice)."""
+	soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+	if soft != hard:
+		try:
+			resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+		except (ValueError, OSError):
+			pass
+
+
+def parse_address(text):
+	host, _, port = text.rpartition(':')
+	return host or 'localhost', int(port)
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Relay TCP ke satu atau beberapa HttpServer di belakangnya.")
+	parser.add_argument('port', nargs='?', type=int, default=18000)
+	parser.add_argument('--backend', dest='backends', type=parse_address, action='append',
+						help="HOST:PORT, boleh diulang (default: localhost:8889)")
+	parser.add_argument('--strategy', choices=STRATEGIES, default='round-robin')
+	parser.add_argument('--health-path', default='/', help="path GET untuk health check")
+	parser.add_argument('--health-interval', type=float, default=2.0, help="detik, 0 mematikan health check aktif")
+	parser.add_argument('--fall', type=int, default=2, help="kegagalan berturut-turut sebelum backend dikeluarkan")
+	parser.add_argument('--rise', type=int, default=2, help="keberhasilan berturut-turut sebelum backend diterima lagi")
+	parser.add_argument('--buffer-size', type=int, default=BUFFER_SIZE, help="buffer/pipe per arah")
+	parser.add_argument('--no-splice', dest='splice', action='store_false')
+	parser.add_argument('--max-tunnels', type=int, default=10000)
+	parser.add_argument('--cache', action='store_true', help="jalankan sebagai reverse proxy HTTP dengan cache")
+	parser.add_argument('--cache-memory', type=parse_size, default=64 * 1024 * 1024, help="batas tier memori")
+	parser.add_argument('--cache-disk', type=parse_size, default=1024 * 1024 * 1024, help="batas tier disk, 0 mematikan")
+	parser.add_argument('--cache-dir', help="direktori tier disk (file cache lama dihapus saat start); default: direktori sementara")
+	parser.add_argument('--cache-max-object', type=parse_size, default=16 * 1024 * 1024)
+	parser.add_argument('--cache-heuristic-max', type=int, default=60,
+						help="batas umur segar (detik) untuk response yang hanya punya Last-Modified")
+	parser.add_argument('--upstream-connections', type=int, default=16,
+						help="batas koneksi keep-alive per backend di mode --cache; jaga di bawah jumlah worker backend")
+	parser.add_argument('--access-log', default='-', help="access log mode --cache: '-' stderr, path file, atau 'off'")
+	parser.add_argument('--access-log-format', choices=['logfmt', 'json'], default='logfmt')
+	parser.add_argument('--access-log-sample', type=float, default=1.0, help="peluang request dicatat; 5xx selalu dicatat")
+	args = parser.parse_args(argv)
+	raise_fd_limit()
+	backends = [Backend(address) for address in args.backends or [('localhost', 8889)]]
+	balancer = Balancer(backends, args.strategy, args.fall, args.rise)
+	if args.health_interval > 0:
+		HealthChecker(balancer, args.health_path, args.health_interval).start()
+	if args.cache:
+		cache = ResponseCache(args.cache_memory, args.cache_disk, args.cache_dir, args.cache_max_object)
+		access_log = AccessLog(args.access_log, args.access_log_sample, style=args.access_log_format)
+		asyncio.run(http_proxy.Server(args.port, balancer, cache, args.cache_heuristic_max,
+									  args.upstream_connections, access_log))
+		return
+	svr = Server(args.port, balancer, args.splice, args.buffer_size, args.max_tunnels)
+	#kill -USR1 <pid> mencetak counter per backend
+	signal.signal(signal.SIGUSR1, svr.log_stats)
+	svr.run()
 
 if __name__=="__main__":
 	main()
-
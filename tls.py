@@ -0,0 +1,45 @@
+import ssl
+
+
+def server_context(config):
+    """SSLContext server dari ServerConfig.
+
+    Context dibuat sekali per proses, sebelum worker di-fork bila bisa: kunci
+    session ticket dan cache session id milik context ini, jadi client yang
+    kembali ke proses yang sama (atau ke saudara hasil fork) melanjutkan
+    session tanpa full handshake.
+    """
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.minimum_version = ssl.TLSVersion.TLSv1_2
+    context.load_cert_chain(certfile=config.certfile, keyfile=config.keyfile)
+    context.set_ciphers(config.tls_ciphers)
+    context.options |= ssl.OP_NO_COMPRESSION | ssl.OP_CIPHER_SERVER_PREFERENCE | ssl.OP_SINGLE_ECDH_USE
+    if config.tls_ecdh_curve:
+        #tanpa ini OpenSSL menawarkan daftar grup default (X25519, P-256, ...)
+        context.set_ecdh_curve(config.tls_ecdh_curve)
+    if config.tls_session_tickets:
+        context.options &= ~ssl.OP_NO_TICKET
+        context.num_tickets = config.tls_session_tickets
+    else:
+        #tinggal cache session id TLS 1.2, yang tidak bertahan bila koneksi
+        #ditutup tanpa close_notify; praktis setiap koneksi full handshake
+        context.options |= ssl.OP_NO_TICKET
+        context.num_tickets = 0
+    return context
+
+
+def handshake(context, connection, timeout):
+    """Bungkus socket hasil accept() dan selesaikan handshake dalam timeout.
+
+    Dipanggil di worker, bukan di accept loop, agar client yang lambat atau
+    jahat hanya menahan worker-nya sendiri. Melempar OSError (termasuk
+    ssl.SSLError dan socket.timeout) bila handshake gagal.
+    """
+    connection.settimeout(timeout)
+    secure = context.wrap_socket(connection, server_side=True, do_handshake_on_connect=False)
+    try:
+        secure.do_handshake()
+    except BaseException:
+        secure.close()
+        raise
+    return secure